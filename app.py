@@ -1,8 +1,16 @@
+import time
+
+_import_started = time.perf_counter()
+
 import os
+import io
+import sys
+import json
+import uuid
+import threading
 import traceback
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
-import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,118 +26,855 @@ app.secret_key = 'radiology_to_speech_secret_key'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs('static/audio', exist_ok=True)
 
-# Import utility classes
-try:
-    from utils.nlp import RadiologyTextSimplifier
-    from utils.tts import TextToSpeechConverter
-except ImportError:
-    RadiologyTextSimplifier = None
-    TextToSpeechConverter = None
-
-# OCR setup
-ocr_available = False
-missing_deps = []
-try:
-    import fitz
-    import pytesseract
-    from PIL import Image
-    import io
-
-    for path in [
-        r'D:\Program Files\Tesseract-OCR\tesseract.exe',
-        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe']:
-        if os.path.exists(path):
-            pytesseract.pytesseract.tesseract_cmd = path
-            break
-    pytesseract.get_tesseract_version()
-    ocr_available = True
-except Exception:
-    missing_deps = ["PyMuPDF", "pytesseract", "pillow"]
+# Import utility classes (heavy dependencies are imported by the service factories below)
+from utils.cache import MemoryCache, SQLiteCache, TieredCache
+from utils.jobs import JobManager, QueueFullError
+from utils.audio_store import AudioStore
+from utils.batch import BatchProcessor
+from utils.segmenter import is_long_report
+from utils.glossary import GlossaryEngine
+from utils.uploads import read_upload
+from utils.classifier import DEFAULT_MODEL_PATH
+from utils.capabilities import probe_ocr
+from utils.compaction import compact_text
+from utils.services import ServiceRegistry
+from utils.pdf_processor import extract_pdf_text_with_ocr
+from utils.metrics import (AUDIO_SECONDS, HTTP_IN_FLIGHT, HTTP_SECONDS, REPORT_CHARACTERS, TOKENS_SAVED,
+                           UPLOAD_BYTES, record_stage, registry as metrics_registry, stage, start_request)
+from utils.profiling import SlowRequestProfiler
 
 # Services initialization
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
-text_simplifier = RadiologyTextSimplifier(api_key=GEMINI_API_KEY) if RadiologyTextSimplifier else None
-tts_converter = TextToSpeechConverter(output_dir='static/audio') if TextToSpeechConverter else None
+SIMPLIFY_CACHE_DB = os.environ.get('SIMPLIFY_CACHE_DB', '')
+simplify_cache = TieredCache(
+    memory=MemoryCache(
+        max_entries=int(os.environ.get('SIMPLIFY_CACHE_SIZE', 256)),
+        ttl=float(os.environ.get('SIMPLIFY_CACHE_TTL', 3600))
+    ),
+    disk=SQLiteCache(SIMPLIFY_CACHE_DB) if SIMPLIFY_CACHE_DB else None
+)
+gemini_options = {
+    'rate': float(os.environ.get('GEMINI_RPS', 5)),
+    'burst': int(os.environ.get('GEMINI_BURST', 10)),
+    'max_in_flight': int(os.environ.get('GEMINI_MAX_IN_FLIGHT', 8)),
+    'timeout': float(os.environ.get('GEMINI_TIMEOUT', 60)),
+    'stream_timeout': float(os.environ.get('GEMINI_STREAM_TIMEOUT', 300)),
+    'max_retries': int(os.environ.get('GEMINI_MAX_RETRIES', 3))
+}
+GLOSSARY_FILE = os.environ.get('GLOSSARY_FILE', '')
+glossary = None
+if os.environ.get('GLOSSARY_ENABLED', '1') != '0':
+    glossary = GlossaryEngine.from_file(GLOSSARY_FILE) if GLOSSARY_FILE else GlossaryEngine()
+SEGMENT_MIN_CHARS = int(os.environ.get('SEGMENT_MIN_CHARS', 1500))
+SKIP_SECTIONS = frozenset(
+    section.strip().lower()
+    for section in os.environ.get('SIMPLIFY_SKIP_SECTIONS', 'technique').split(',')
+    if section.strip()
+)
+TTS_CHUNKED = os.environ.get('TTS_CHUNKED', '1') != '0'
+# Synthesize sentences while the model is still writing the rest
+PIPELINED_SPEECH = os.environ.get('PIPELINED_SPEECH', '1') != '0'
+# Strip repeated headers and footers and OCR noise before simplification
+COMPACT_PROMPTS = os.environ.get('COMPACT_PROMPTS', '1') != '0'
+audio_store = AudioStore(
+    'static/audio',
+    max_bytes=int(float(os.environ.get('AUDIO_CACHE_MAX_MB', 500)) * 1024 * 1024),
+    max_age=float(os.environ.get('AUDIO_CACHE_MAX_AGE_HOURS', 168)) * 3600
+)
+BATCH_ROOT = os.environ.get('BATCH_ROOT', 'batches')
+BATCH_OUTPUT_ROOT = os.environ.get('BATCH_OUTPUT_ROOT', 'batch_output')
+BATCH_EXTRACT_WORKERS = int(os.environ.get('BATCH_EXTRACT_WORKERS', 2))
+BATCH_SIMPLIFY_WORKERS = int(os.environ.get('BATCH_SIMPLIFY_WORKERS', 4))
+BATCH_SPEECH_WORKERS = int(os.environ.get('BATCH_SPEECH_WORKERS', 4))
+BATCH_ZIP_MAX_BYTES = int(float(os.environ.get('BATCH_ZIP_MAX_MB', 200)) * 1024 * 1024)
+BATCH_ZIP_MAX_FILES = int(os.environ.get('BATCH_ZIP_MAX_FILES', 5000))
+job_manager = JobManager(
+    max_workers=int(os.environ.get('JOB_WORKERS', 4)),
+    max_queued=int(os.environ.get('JOB_QUEUE_DEPTH', 32))
+)
+UPLOAD_SPILL_BYTES = int(float(os.environ.get('UPLOAD_SPILL_MB', 4)) * 1024 * 1024)
+SCAN_MODEL_PATH = os.environ.get('SCAN_MODEL_PATH', DEFAULT_MODEL_PATH)
+# Local stand-ins for Gemini and the speech engine, for load tests
+FAKE_UPSTREAMS = os.environ.get('FAKE_UPSTREAMS', '0') != '0'
+SHUTDOWN_DRAIN_SECONDS = float(os.environ.get('SHUTDOWN_DRAIN_SECONDS', 30))
+
+def create_simplifier():
+    from utils.nlp import RadiologyTextSimplifier
+
+    model = None
+    if FAKE_UPSTREAMS:
+        from utils.fakes import FakeGenerativeModel
+        model = FakeGenerativeModel()
+    return RadiologyTextSimplifier(
+        api_key=GEMINI_API_KEY,
+        cache=simplify_cache,
+        model=model,
+        client_options=gemini_options,
+        segment_workers=int(os.environ.get('SEGMENT_WORKERS', 4)),
+        glossary=glossary
+    )
+
+def create_tts():
+    from utils.tts import TextToSpeechConverter
+    from utils.tts_backends import create_backend
+
+    if FAKE_UPSTREAMS:
+        from utils.fakes import FakeSpeechBackend
+        backend = FakeSpeechBackend()
+    else:
+        backend = create_backend()
+    return TextToSpeechConverter(
+        output_dir='static/audio',
+        max_workers=int(os.environ.get('TTS_WORKERS', 4)),
+        store=audio_store,
+        backend=backend
+    )
+
+def create_ocr_engine():
+    if not probe_ocr()['available']:
+        return None
+    from utils.ocr import get_ocr_engine
+
+    return get_ocr_engine()
+
+def create_classifier():
+    if not os.path.exists(SCAN_MODEL_PATH):
+        return None
+    from utils.classifier import ScanClassifier
+
+    # Concurrent requests share batched predictions
+    return ScanClassifier(
+        SCAN_MODEL_PATH,
+        max_batch=int(os.environ.get('CLASSIFY_MAX_BATCH', 16)),
+        max_latency=float(os.environ.get('CLASSIFY_MAX_LATENCY_MS', 10)) / 1000,
+        preprocess_workers=int(os.environ.get('CLASSIFY_PREPROCESS_WORKERS', 4))
+    ).load()
+
+# Heavy services are created on first use; WARM_UP_SERVICES (or a server
+# hook calling services.warm_up) creates and warms them ahead of traffic
+services = ServiceRegistry()
+services.register('simplifier', create_simplifier)
+services.register('tts', create_tts, shutdown=lambda tts: tts.backend.close())
+services.register('ocr', create_ocr_engine, warm_up=lambda engine: engine.warm_up(),
+                  shutdown=lambda engine: engine.shutdown(wait=False))
+services.register('classifier', create_classifier, shutdown=lambda classifier: classifier.shutdown())
+
+def warm_up_services(names=None):
+    """Create and warm the named services (WARM_UP_SERVICES by default)."""
+    if names is None:
+        names = [name.strip() for name in os.environ.get('WARM_UP_SERVICES', '').split(',') if name.strip()]
+    return services.warm_up(names)
+
+def start_worker(background=True):
+    """
+    Per-process startup: start the audio cache sweeper and the metrics
+    flusher, and warm up WARM_UP_SERVICES. Runs at import for the dev
+    server; gunicorn.conf.py runs it in each worker after fork, before the
+    worker takes requests.
+    """
+    audio_store.start_sweeper(interval=float(os.environ.get('AUDIO_CACHE_SWEEP_SECONDS', 600)))
+    metrics_registry.start_flusher(interval=float(os.environ.get('METRICS_FLUSH_SECONDS', 1)))
+    if background:
+        threading.Thread(target=warm_up_services, name='warm-up', daemon=True).start()
+    else:
+        warm_up_services()
+
+def stop_worker(timeout=SHUTDOWN_DRAIN_SECONDS):
+    """
+    Graceful shutdown: stop accepting jobs, wait up to timeout seconds for
+    running ones to finish, then release the services.
+
+    Returns:
+        Number of jobs that did not finish in time
+    """
+    unfinished = job_manager.drain(timeout)
+    if unfinished:
+        print(f"⚠️ Shutting down with {unfinished} unfinished job(s)")
+    job_manager.shutdown(wait=False)
+    audio_store.stop_sweeper()
+    metrics_registry.stop_flusher()
+    services.shutdown()
+    return unfinished
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'txt', 'pdf', 'doc', 'docx'}
 
-def extract_pdf_with_ocr(file_path):
-    doc = fitz.open(file_path)
-    text = ""
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        img = Image.open(io.BytesIO(pix.tobytes("png")))
-        text += pytesseract.image_to_string(img, lang='eng') + "\n"
-    doc.close()
-    return text.strip()
-
-def extract_text_from_file(file_path):
-    extension = file_path.rsplit('.', 1)[1].lower()
+def extract_text(source, extension):
+    """Extract report text from a file path or from the file's bytes."""
+    in_memory = isinstance(source, bytes)
     if extension == 'pdf':
-        return extract_pdf_with_ocr(file_path)
+        ocr = probe_ocr()
+        if 'PyMuPDF' in ocr['missing_dependencies']:
+            raise ValueError("PDF support not available: install PyMuPDF")
+        return extract_pdf_text_with_ocr(source, ocr=ocr['available'])
     elif extension == 'txt':
-        with open(file_path, 'r', encoding='utf-8') as f:
+        if in_memory:
+            return source.decode('utf-8').strip()
+        with open(source, 'r', encoding='utf-8') as f:
             return f.read().strip()
     elif extension in ['doc', 'docx']:
         import docx
-        doc = docx.Document(file_path)
+        doc = docx.Document(io.BytesIO(source) if in_memory else source)
         return '\n'.join([p.text for p in doc.paragraphs]).strip()
     raise ValueError("Unsupported file format")
 
+def extract_text_from_file(file_path):
+    with stage('extract'):
+        return extract_text(file_path, file_path.rsplit('.', 1)[1].lower())
+
+def compact_report(text):
+    """
+    Strip page markers, repeated headers and footers and OCR noise from
+    report text before it reaches the model.
+
+    Returns:
+        The text and a summary of what was removed (None when disabled)
+    """
+    if not COMPACT_PROMPTS or not text:
+        return text, None
+    with stage('compact'):
+        compaction = compact_text(text)
+    TOKENS_SAVED.observe(compaction['tokens_saved'])
+    return compaction.pop('text'), compaction
+
+def extract_upload(upload):
+    """Extract the text of an Upload, then release it."""
+    try:
+        with stage('extract'):
+            return extract_text(upload.source, upload.extension)
+    finally:
+        upload.discard()
+
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') != '0'
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+# Profile a sample of requests and keep the stacks of those slower than PROFILE_SLOW_MS
+profiler = SlowRequestProfiler(
+    threshold=PROFILE_SLOW_MS / 1000,
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0.1)),
+    output_dir=os.environ.get('PROFILE_DIR', 'profiles')
+) if PROFILE_SLOW_MS else None
+
+@app.before_request
+def start_request_metrics():
+    g.timing = start_request()
+    g.profile = profiler.start() if profiler else None
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def finish_request_metrics(response):
+    timing = g.timing
+    profile = g.profile
+    endpoint = request.endpoint or 'unmatched'
+    method = request.method
+    if SERVER_TIMING:
+        # Streamed responses only include the stages finished before the body starts
+        response.headers['Server-Timing'] = timing.header()
+
+    def done():
+        # Runs once the body, streamed or not, has been sent
+        seconds = timing.elapsed()
+        HTTP_IN_FLIGHT.dec()
+        HTTP_SECONDS.observe(seconds, endpoint=endpoint, method=method, status=str(response.status_code))
+        path = profiler.finish(profile, seconds, endpoint) if profiler else None
+        if path:
+            print(f"🐢 Slow request to {endpoint} ({seconds:.2f}s), profile saved to {path}")
+
+    response.call_on_close(done)
+    return response
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+PIPELINE_STAGES = ['extract', 'simplify', 'translate', 'speech']
+# Speech language codes for the languages offered on the form
+LANGUAGE_CODES = {
+    'English': 'en',
+    'Spanish': 'es',
+    'French': 'fr',
+    'German': 'de',
+    'Hindi': 'hi',
+    'Chinese': 'zh-CN'
+}
+
+class ReportInputError(ValueError):
+    pass
+
+def _form_list(form, name):
+    # Repeated form fields, a JSON list or a comma-separated string
+    values = form.getlist(name) if hasattr(form, 'getlist') else form.get(name) or []
+    if isinstance(values, str):
+        values = [values]
+    return [item.strip() for value in values for item in str(value).split(',')]
+
+def read_languages(form):
+    """
+    Read the output languages: 'languages' with optional matching
+    'language_codes', else the single 'language'. The first language is
+    the one the report is simplified in.
+    """
+    names = _form_list(form, 'languages')
+    if not any(names):
+        return [{'language': form.get('language', 'English'), 'language_code': form.get('language_code', 'en')}]
+    codes = _form_list(form, 'language_codes')
+    languages = {}
+    for index, name in enumerate(names):
+        if name and name not in languages:
+            code = codes[index] if index < len(codes) and codes[index] else LANGUAGE_CODES.get(name)
+            languages[name] = {'language': name, 'language_code': code}
+    return list(languages.values())
+
+def read_options(form):
+    languages = read_languages(form)
+    return {
+        'target_audience': form.get('target_audience', 'general'),
+        'grade_level': int(form.get('grade_level', 6)),
+        'language': languages[0]['language'],
+        'language_code': languages[0]['language_code'],
+        'languages': languages
+    }
+
+def receive_upload(files):
+    """
+    Read an allowed uploaded file into memory (or a unique spill file when
+    large) and return it as an Upload.
+    """
+    file = files.get('file')
+    if not file or not allowed_file(file.filename):
+        return None
+    with stage('upload'):
+        upload = read_upload(file, spill_bytes=UPLOAD_SPILL_BYTES, spill_dir=app.config['UPLOAD_FOLDER'])
+    UPLOAD_BYTES.observe(upload.size)
+    return upload
+
+def run_pipeline(on_stage, text, upload, options):
+    """
+    Extract, simplify and synthesize one report, reporting stage progress
+    through on_stage(name, status, **info).
+    """
+    if upload:
+        on_stage('extract', 'running')
+        text = extract_upload(upload)
+    text, compaction = compact_report(text)
+    if upload:
+        on_stage('extract', 'done', characters=len(text),
+                 tokens_saved=compaction['tokens_saved'] if compaction else 0)
+    else:
+        on_stage('extract', 'skipped')
+
+    if not text or len(text) < 10:
+        raise ReportInputError('Text is too short or missing')
+
+    text_simplifier = services.get('simplifier')
+    on_stage('simplify', 'running')
+    multilingual = len(options['languages']) > 1
+    pipelined = PIPELINED_SPEECH and TTS_CHUNKED and services.get('tts') and not multilingual
+    if pipelined:
+        result, speech, segments = None, None, []
+        for event in pipelined_events(text, options):
+            if 'segment' in event:
+                segments.append(event['segment']['filename'])
+                on_stage('speech', 'running', segments=list(segments))
+            elif 'speech_reset' in event:
+                segments = []
+            elif 'speech' in event:
+                speech = event['speech']
+            elif 'result' in event:
+                result = event['result']
+                on_stage('simplify', 'done' if result.get('success') else 'failed',
+                         cached=result.get('cached', False))
+                if result.get('success') and not segments:
+                    on_stage('speech', 'running')
+    else:
+        REPORT_CHARACTERS.observe(len(text))
+        with stage('simplify') as timer:
+            if is_long_report(text, SEGMENT_MIN_CHARS):
+                # Long multi-section reports are simplified section by section in parallel
+                result = text_simplifier.analyze_segmented_report(
+                    text,
+                    target_audience=options['target_audience'],
+                    grade_level=options['grade_level'],
+                    language=options['language'],
+                    skip_sections=SKIP_SECTIONS
+                )
+            else:
+                # One model call returns both the simplified text and the key findings
+                result = text_simplifier.analyze_report(
+                    text=text,
+                    target_audience=options['target_audience'],
+                    grade_level=options['grade_level'],
+                    language=options['language']
+                )
+            timer.failed = not result.get('success')
+        on_stage('simplify', 'done' if result.get('success') else 'failed', cached=result.get('cached', False))
+
+    response = {
+        'original_text': result.get('original_text', ''),
+        'simplified_text': result.get('simplified_text', ''),
+        'key_findings': result.get('key_findings', []),
+        'success': result.get('success', False),
+        'cached': result.get('cached', False)
+    }
+    if not result.get('success'):
+        response['error'] = result.get('error')
+    if compaction:
+        response['compaction'] = compaction
+
+    if multilingual and result.get('success'):
+        response['languages'] = run_languages(on_stage, result, options)
+        primary = response['languages'][0]
+        response.update({key: primary[key] for key in ('audio_filename', 'audio_segments', 'audio_error')
+                         if key in primary})
+        return response
+    on_stage('translate', 'skipped')
+
+    if services.get('tts') and result.get('success'):
+        if not pipelined:
+            on_stage('speech', 'running')
+            segments = []
+            for event in speech_events(result['simplified_text'], options['language_code']):
+                if 'segment' in event:
+                    segments.append(event['segment']['filename'])
+                    on_stage('speech', 'running', segments=list(segments))
+                else:
+                    speech = event['result']
+        if speech.get('success'):
+            response['audio_filename'] = speech['filename']
+            response['audio_segments'] = speech.get('segments', [speech['filename']])
+            on_stage('speech', 'done')
+        else:
+            response['audio_error'] = speech.get('error')
+            on_stage('speech', 'failed', error=speech.get('error'))
+    else:
+        on_stage('speech', 'skipped')
+
+    return response
+
+def run_languages(on_stage, result, options):
+    """
+    Translate a simplified report into the request's other languages and
+    voice every language, the first while the translations are made.
+    Returns one output per language, in the order requested.
+    """
+    text_simplifier = services.get('simplifier')
+    tts_converter = services.get('tts')
+    primary, others = options['languages'][0], options['languages'][1:]
+    results = {primary['language']: result}
+    sessions = {}
+    speech_started = time.perf_counter()
+
+    def start_speech(entry):
+        voiced = results[entry['language']]
+        if tts_converter and entry['language_code'] and voiced.get('success'):
+            sessions[entry['language']] = tts_converter.start_speech(voiced['simplified_text'],
+                                                                     entry['language_code'])
+
+    on_stage('speech', 'running')
+    start_speech(primary)
+    on_stage('translate', 'running')
+    with stage('translate') as timer:
+        # Only the short simplified text is sent again, not the report
+        results.update(text_simplifier.translate_analyses(result, [entry['language'] for entry in others]))
+        timer.failed = not all(translated.get('success') for translated in results.values())
+    on_stage('translate', 'failed' if timer.failed else 'done',
+             cached=[entry['language'] for entry in others if results[entry['language']].get('cached')])
+    for entry in others:
+        start_speech(entry)
+
+    outputs = []
+    for entry in options['languages']:
+        translated = results[entry['language']]
+        output = {
+            'language': entry['language'],
+            'language_code': entry['language_code'],
+            'simplified_text': translated.get('simplified_text', ''),
+            'key_findings': translated.get('key_findings', []),
+            'success': translated.get('success', False),
+            'cached': translated.get('cached', False)
+        }
+        if not translated.get('success'):
+            output['error'] = translated.get('error')
+        elif entry['language'] in sessions:
+            speech = sessions[entry['language']].finish(translated['simplified_text'])
+            observe_audio(tts_converter, speech)
+            if speech.get('success'):
+                output['audio_filename'] = speech['filename']
+                output['audio_segments'] = speech['segments']
+            else:
+                output['audio_error'] = speech.get('error')
+        elif tts_converter:
+            output['audio_error'] = f"No speech language code for {entry['language']}"
+        outputs.append(output)
+
+    if sessions:
+        failed = any('audio_error' in output for output in outputs)
+        record_stage('speech', time.perf_counter() - speech_started, error=failed)
+        on_stage('speech', 'failed' if failed else 'done')
+    else:
+        on_stage('speech', 'skipped')
+    return outputs
+
+def simplify_events(text, options):
+    """Yield the simplified text as the model writes it, then the result."""
+    text_simplifier = services.get('simplifier')
+    REPORT_CHARACTERS.observe(len(text))
+    with stage('simplify') as timer:
+        if is_long_report(text, SEGMENT_MIN_CHARS):
+            events = text_simplifier.stream_segmented_report(
+                text,
+                target_audience=options['target_audience'],
+                grade_level=options['grade_level'],
+                language=options['language'],
+                skip_sections=SKIP_SECTIONS)
+        else:
+            events = text_simplifier.stream_simplify_text(
+                text=text,
+                target_audience=options['target_audience'],
+                grade_level=options['grade_level'],
+                language=options['language'],
+                include_findings=True)
+        for event in events:
+            if 'result' in event:
+                timer.failed = not event['result'].get('success')
+            yield event
+
+def observe_audio(tts_converter, speech):
+    if speech.get('success'):
+        seconds = tts_converter.backend.duration(speech['filepath'])
+        if seconds is not None:
+            AUDIO_SECONDS.observe(seconds)
+
+def pipelined_events(text, options):
+    """
+    Simplify text and synthesize it at the same time, each sentence going
+    to the speech engine as soon as the model has written it. Yields the
+    events of simplify_events and TextToSpeechConverter.speak_while_generating.
+    """
+    tts_converter = services.get('tts')
+    started = None
+    events = tts_converter.speak_while_generating(simplify_events(text, options), options['language_code'])
+    for event in events:
+        if started is None and 'chunk' in event:
+            started = time.perf_counter()
+        if 'speech' in event:
+            speech = event['speech']
+            # Overlaps the simplify stage: from the first text to the last audio
+            record_stage('speech', time.perf_counter() - (started or time.perf_counter()),
+                         error=not speech.get('success'))
+            observe_audio(tts_converter, speech)
+        yield event
+
+def speech_events(text, language_code):
+    """Yield audio segments as they become playable, then the speech result."""
+    tts_converter = services.get('tts')
+    with stage('speech') as timer:
+        if TTS_CHUNKED:
+            events = tts_converter.stream_speech(text, language_code)
+        else:
+            events = [{'result': tts_converter.convert_to_speech(text, language_code)}]
+        for event in events:
+            if 'result' in event:
+                speech = event['result']
+                timer.failed = not speech.get('success')
+                observe_audio(tts_converter, speech)
+            yield event
+
+def _ignore_stage(name, status, **info):
+    pass
+
 @app.route('/simplify', methods=['POST'])
 def simplify():
     try:
-        if not text_simplifier:
+        if not services.get('simplifier'):
             return jsonify({'error': 'Text simplification not available'}), 500
 
         text = request.form.get('text', '').strip()
-        if not text and 'file' in request.files:
-            file = request.files['file']
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(file_path)
-                text = extract_text_from_file(file_path)
-                os.remove(file_path)
-
-        if not text or len(text) < 10:
-            return jsonify({'error': 'Text is too short or missing'}), 400
-
-        result = text_simplifier.simplify_text(
-            text=text,
-            target_audience=request.form.get('target_audience', 'general'),
-            grade_level=int(request.form.get('grade_level', 6)),
-            language=request.form.get('language', 'English')
-        )
-
-        response = {
-            'original_text': result.get('original_text', ''),
-            'simplified_text': result.get('simplified_text', ''),
-            'success': result.get('success', False)
-        }
-
-        if tts_converter and result.get('success'):
-            speech = tts_converter.convert_to_speech(result['simplified_text'], request.form.get('language_code', 'en'))
-            if speech.get('success'):
-                response['audio_filename'] = speech['filename']
-            else:
-                response['audio_error'] = speech.get('error')
-
-        return jsonify(response)
+        upload = receive_upload(request.files) if not text else None
+        return jsonify(run_pipeline(_ignore_stage, text, upload, read_options(request.form)))
+    except ReportInputError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/simplify/stream', methods=['POST'])
+def simplify_stream():
+    text_simplifier = services.get('simplifier')
+    if not text_simplifier:
+        return jsonify({'error': 'Text simplification not available'}), 500
+
+    text = request.form.get('text', '').strip()
+    upload = receive_upload(request.files) if not text else None
+    options = read_options(request.form)
+
+    def stream():
+        try:
+            report_text = text
+            if upload:
+                yield sse_event('stage', {'stage': 'extract'})
+                report_text = extract_upload(upload)
+            report_text, compaction = compact_report(report_text)
+            if not report_text or len(report_text) < 10:
+                yield sse_event('error', {'error': 'Text is too short or missing'})
+                return
+
+            yield sse_event('stage', {'stage': 'simplify'})
+            pipelined = PIPELINED_SPEECH and TTS_CHUNKED and services.get('tts')
+            result = speech = None
+            events = pipelined_events(report_text, options) if pipelined else simplify_events(report_text, options)
+            for event in events:
+                if 'chunk' in event:
+                    yield sse_event('chunk', {'text': event['chunk']})
+                elif 'segment' in event:
+                    yield sse_event('audio_segment', event['segment'])
+                elif 'speech_reset' in event:
+                    yield sse_event('audio_reset', {})
+                elif 'speech' in event:
+                    speech = event['speech']
+                else:
+                    result = event['result']
+                    if not result.get('success'):
+                        yield sse_event('error', {'error': result.get('error')})
+                        return
+                    if pipelined:
+                        yield sse_event('stage', {'stage': 'speech'})
+
+            response = {
+                'original_text': result['original_text'],
+                'simplified_text': result['simplified_text'],
+                'key_findings': result.get('key_findings', []),
+                'success': True,
+                'cached': result.get('cached', False)
+            }
+            if compaction:
+                response['compaction'] = compaction
+            if services.get('tts'):
+                if not pipelined:
+                    yield sse_event('stage', {'stage': 'speech'})
+                    for event in speech_events(result['simplified_text'], options['language_code']):
+                        if 'segment' in event:
+                            yield sse_event('audio_segment', event['segment'])
+                        else:
+                            speech = event['result']
+                if speech.get('success'):
+                    response['audio_filename'] = speech['filename']
+                    response['audio_segments'] = speech.get('segments', [speech['filename']])
+                else:
+                    response['audio_error'] = speech.get('error')
+            yield sse_event('done', response)
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event('error', {'error': str(e)})
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if upload:
+        # Also covers clients that disconnect before extraction starts
+        response.call_on_close(upload.discard)
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    if not services.get('simplifier'):
+        return jsonify({'error': 'Text simplification not available'}), 500
+
+    text = request.form.get('text', '').strip()
+    upload = receive_upload(request.files) if not text else None
+    if not upload and len(text) < 10:
+        return jsonify({'error': 'Text is too short or missing'}), 400
+    try:
+        job = job_manager.submit(run_pipeline, PIPELINE_STAGES, text, upload, read_options(request.form))
+    except QueueFullError as e:
+        if upload:
+            upload.discard()
+        return jsonify({'error': str(e)}), 503
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+def create_batch_processor(output_dir, options, audio=True, extract_workers=BATCH_EXTRACT_WORKERS,
+                           simplify_workers=BATCH_SIMPLIFY_WORKERS, speech_workers=BATCH_SPEECH_WORKERS):
+    """
+    Build a BatchProcessor on the app's services: the shared simplifier
+    (cache, glossary and client limits), extraction gated on the OCR probe,
+    prompt compaction, and a converter writing to output_dir/audio on the
+    shared speech backend. Call processor.tts.shutdown() when done.
+    """
+    from utils.tts import TextToSpeechConverter
+
+    tts_converter = services.get('tts') if audio else None
+    return BatchProcessor(
+        extract=lambda path: compact_report(extract_text_from_file(path))[0],
+        simplifier=services.get('simplifier'),
+        tts=TextToSpeechConverter(
+            output_dir=os.path.join(output_dir, 'audio'),
+            max_workers=speech_workers,
+            backend=tts_converter.backend
+        ) if tts_converter else None,
+        options=options,
+        extract_workers=extract_workers,
+        simplify_workers=simplify_workers,
+        speech_workers=speech_workers,
+        zip_max_bytes=BATCH_ZIP_MAX_BYTES,
+        zip_max_files=BATCH_ZIP_MAX_FILES
+    )
+
+def run_batch(on_stage, source, output_dir, options, cleanup=None):
+    on_stage('batch', 'running')
+    processor = create_batch_processor(output_dir, options)
+    try:
+        summary = processor.run(source, output_dir, on_progress=lambda progress: on_stage('batch', 'running', **progress))
+    finally:
+        if processor.tts:
+            processor.tts.shutdown()
+        if cleanup:
+            os.remove(cleanup)
+    on_stage('batch', 'done', **summary)
+    return summary
+
+@app.route('/batch', methods=['POST'])
+def create_batch():
+    if not services.get('simplifier'):
+        return jsonify({'error': 'Text simplification not available'}), 500
+
+    data = request.get_json(silent=True) or request.form
+    # Reusing an output name resumes that batch from its checkpoint
+    output_name = secure_filename(data.get('output', '')) or uuid.uuid4().hex
+    output_dir = os.path.join(BATCH_OUTPUT_ROOT, output_name)
+
+    upload = request.files.get('file')
+    cleanup = None
+    if upload and upload.filename.lower().endswith(('.zip', '.jsonl')):
+        source = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{secure_filename(upload.filename)}")
+        upload.save(source)
+        cleanup = source
+    elif data.get('source'):
+        # Server-side sources are confined to BATCH_ROOT
+        root = os.path.realpath(BATCH_ROOT)
+        source = os.path.realpath(os.path.join(root, data['source']))
+        if os.path.commonpath([root, source]) != root or not os.path.exists(source):
+            return jsonify({'error': 'Batch source not found'}), 400
+    else:
+        return jsonify({'error': 'Provide a .zip or .jsonl file, or a source under BATCH_ROOT'}), 400
+
+    try:
+        job = job_manager.submit(run_batch, ['batch'], source, output_dir, read_options(data), cleanup)
+    except QueueFullError as e:
+        if cleanup:
+            os.remove(cleanup)
+        return jsonify({'error': str(e)}), 503
+    return jsonify({'job_id': job.id, 'status': job.status, 'output': output_name}), 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    if job_manager.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def stream():
+        version = -1
+        while True:
+            snapshot = job_manager.wait_for_update(job_id, version)
+            if snapshot is None:
+                return
+            if snapshot['version'] == version:
+                # Keep the connection alive through proxies while nothing changes
+                yield ': keep-alive\n\n'
+                continue
+            version = snapshot['version']
+            yield f"data: {json.dumps(snapshot)}\n\n"
+            if snapshot['status'] in ('done', 'failed'):
+                return
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'bmp', 'tif', 'tiff', 'webp'}
+
+@app.route('/classify', methods=['POST'])
+def classify_scan():
+    scan_classifier = services.get('classifier')
+    if not scan_classifier:
+        return jsonify({'error': 'Scan classification not available'}), 503
+
+    files = [f for f in request.files.getlist('file')
+             if '.' in f.filename and f.filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS]
+    if not files:
+        return jsonify({'error': 'Upload one or more scan images as "file"'}), 400
+
+    futures = [(f.filename, scan_classifier.submit(f.read())) for f in files]
+    predictions = []
+    for filename, future in futures:
+        try:
+            predictions.append({'filename': filename, **future.result(timeout=30)})
+        except Exception as e:
+            predictions.append({'filename': filename, 'error': str(e)})
+    return jsonify({'predictions': predictions})
+
+@app.route('/check-classifier-status')
+def check_classifier_status():
+    scan_classifier = services.get('classifier')
+    if not scan_classifier:
+        return jsonify({'available': False})
+    return jsonify({'available': True, **scan_classifier.stats()})
+
 @app.route('/check-ocr-status')
 def check_ocr_status():
-    return jsonify({'ocr_available': ocr_available, 'missing_dependencies': missing_deps})
+    probe = probe_ocr()
+    status = {
+        'ocr_available': probe['available'],
+        'missing_dependencies': probe['missing_dependencies'],
+        'tesseract_version': probe['tesseract_version']
+    }
+    # Only report worker health once the pool exists; checking must not start it
+    if services.loaded('ocr') and services.get('ocr'):
+        status['workers'] = services.get('ocr').health(timeout=5)
+    return jsonify(status)
+
+@app.route('/check-llm-status')
+def check_llm_status():
+    text_simplifier = services.get('simplifier')
+    if not text_simplifier:
+        return jsonify({'available': False})
+    return jsonify({
+        'available': True,
+        **text_simplifier.client.stats(),
+        'routing': glossary.stats() if glossary else None
+    })
+
+@app.route('/startup-report')
+def startup_report():
+    import resource
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return jsonify({
+        'import_seconds': round(IMPORT_SECONDS, 3),
+        'max_rss_mb': round(max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1),
+        **services.report()
+    })
+
+@app.route('/metrics')
+def metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache-stats')
+def cache_stats():
+    return jsonify({'simplify': simplify_cache.stats(), 'audio': audio_store.stats()})
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+print(f"✅ App ready in {IMPORT_SECONDS:.2f}s")
+
+# Under gunicorn the worker hooks in gunicorn.conf.py start and stop each worker
+if os.environ.get('SERVER_MANAGED_LIFECYCLE', '0') == '0':
+    start_worker()
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Batch processing for Radiology-to-Speech Assistant
+
+Simplifies (and optionally voices) every report in a directory, a zip
+archive or a JSONL file. Results stream to <output>/results.jsonl and
+audio to <output>/audio. Re-running with the same output directory
+resumes where the previous run stopped.
+
+Usage: python batch_process.py <source> <output_dir> [options]
+"""
+
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-process radiology reports")
+    parser.add_argument("source", help="Directory, .zip or .jsonl of reports")
+    parser.add_argument("output", help="Output directory (also the resume checkpoint)")
+    parser.add_argument("--extract-workers", type=int, default=2)
+    parser.add_argument("--simplify-workers", type=int, default=4)
+    parser.add_argument("--speech-workers", type=int, default=4)
+    parser.add_argument("--no-audio", action="store_true", help="Skip speech synthesis")
+    parser.add_argument("--target-audience", default="general")
+    parser.add_argument("--grade-level", type=int, default=6)
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--language-code", default="en")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ Source not found: {args.source}")
+        sys.exit(1)
+
+    load_dotenv()
+    # No web server here: skip the app's per-worker startup (audio sweeper, warm-up)
+    os.environ.setdefault('SERVER_MANAGED_LIFECYCLE', '1')
+
+    # The same services as the web app: cache, glossary, client limits, OCR probe and compaction
+    import app
+
+    if not app.services.get('simplifier'):
+        print("❌ Text simplification not available")
+        sys.exit(1)
+
+    processor = app.create_batch_processor(
+        args.output,
+        options={
+            'target_audience': args.target_audience,
+            'grade_level': args.grade_level,
+            'language': args.language,
+            'language_code': args.language_code
+        },
+        audio=not args.no_audio,
+        extract_workers=args.extract_workers,
+        simplify_workers=args.simplify_workers,
+        speech_workers=args.speech_workers
+    )
+
+    def report(summary):
+        print(f"\r✓ {summary['processed']} done, ✗ {summary['failed']} failed, "
+              f"↷ {summary['skipped']} skipped ({summary['elapsed_seconds']}s)", end="", flush=True)
+
+    try:
+        summary = processor.run(args.source, args.output, on_progress=report)
+    finally:
+        if processor.tts:
+            processor.tts.shutdown()
+        app.services.shutdown()
+    print()
+    print(f"📁 Results: {summary['results_path']}")
+    sys.exit(1 if summary['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
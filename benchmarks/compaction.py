@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Prompt compaction benchmark for Radiology-to-Speech Assistant
+
+Builds multi-page scanned reports the way OCR reads them: every page
+repeats the hospital letterhead, a patient banner and a footer with the
+page number, each with slightly different OCR errors. Pages also carry
+specks of noise and words hyphenated across lines. The report bodies come
+from the extraction benchmark's generator (benchmarks/corpus.py).
+
+For each document it reports the estimated prompt tokens before and after
+utils/compaction.py, and the share of the report's words still present.
+It also checks short reports whose findings look like repeated lines
+(REGRESSIONS). A run exits with status 1 if compaction loses report content.
+
+Usage: python -m benchmarks.compaction [options]
+"""
+
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, List
+
+from benchmarks.corpus import make_report
+from benchmarks.extraction import score
+from utils.compaction import PAGE_BREAK, compact_text
+
+LETTERHEAD = [
+    "ST. MARY'S REGIONAL MEDICAL CENTER",
+    "Department of Diagnostic Radiology - 1200 Hospital Drive, Springfield",
+    "Tel (555) 010-2000   Fax (555) 010-2001   radiology@stmarys.example",
+]
+BANNER = "Patient: {name}   MRN: {mrn}   DOB: {dob}   Accession: {accession}"
+FOOTER = [
+    "CONFIDENTIAL: This report contains protected health information.",
+    "Printed 2024-06-01 14:32   Page {page} of {pages}",
+]
+NOISE = ["~ ' .", "|", "_ -- _", ". , ;", "ll |"]
+# Characters OCR commonly confuses
+CONFUSIONS = {"O": "0", "o": "0", "l": "1", "I": "l", "S": "5", "e": "c", "rn": "m"}
+# Words never broken across lines, so content checks are not affected by the breaks themselves
+MIN_BREAK_LENGTH = 8
+
+# Report content that may be lost before the run fails
+MAX_RECALL_LOSS = 0.01
+
+# Reports whose findings resemble headers or footers, and lines compaction must keep
+REGRESSIONS = [
+    {
+        "name": "laterality",
+        "text": "Mild right pleural effusion.\nLungs otherwise clear.\f\nMild left pleural effusion.\nHeart normal.",
+        "keep": ["Mild right pleural effusion.", "Mild left pleural effusion."],
+    },
+    {
+        "name": "repeated finding",
+        "text": ("FINDINGS:\nNo pneumothorax.\nNo pleural effusion.\f\n"
+                 "IMPRESSION:\nNo pneumothorax.\nNo acute cardiopulmonary process."),
+        "keep": ["No pneumothorax."] * 2,
+    },
+    {
+        "name": "finding on every page",
+        "text": "\f\n".join(f"Report page {page}\nStable 4 mm nodule in the right lower lobe.\nSee prior."
+                             for page in range(1, 6)),
+        "keep": ["Stable 4 mm nodule in the right lower lobe."] * 5,
+    },
+    {
+        "name": "similar findings on every page",
+        "text": "\f\n".join(f"{side} {organ} cyst measuring 2 cm.\nComparison: none."
+                             for side, organ in [("Left", "renal"), ("Right", "renal"), ("Left", "hepatic"),
+                                                 ("Right", "hepatic")]),
+        "keep": ["Left renal cyst", "Right renal cyst", "Left hepatic cyst", "Right hepatic cyst"],
+    },
+]
+
+
+def ocr_errors(line: str, rng: random.Random, rate: float = 0.04) -> str:
+    """Apply OCR-style character confusions to a repeated line."""
+    for source, target in CONFUSIONS.items():
+        if source in line and rng.random() < rate * len(line) / 20:
+            line = line.replace(source, target, 1)
+    return line
+
+
+def break_words(text: str, rng: random.Random, rate: float = 0.08) -> str:
+    """Hyphenate some long lowercase words across lines, as narrow columns do."""
+    words = text.split(' ')
+    for index, word in enumerate(words):
+        if len(word) >= MIN_BREAK_LENGTH and word.isalpha() and word.islower() and rng.random() < rate:
+            cut = len(word) // 2
+            words[index] = f"{word[:cut]}-\n{word[cut:]}"
+    return ' '.join(words)
+
+
+def scanned_document(rng: random.Random, pages: int) -> Dict[str, Any]:
+    """A multi-page OCR'd report and the report text it should reduce to."""
+    patient = {
+        "name": rng.choice(["JOHN DOE", "MARIA GARCIA", "WEI CHEN", "PRIYA SHARMA"]),
+        "mrn": rng.randint(100000, 999999),
+        "dob": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1940, 2005)}",
+        "accession": rng.randint(1000000, 9999999),
+    }
+    bodies = [make_report(rng, 6) for _ in range(pages)]
+    texts = []
+    for number, body in enumerate(bodies, 1):
+        lines = [ocr_errors(line, rng) for line in LETTERHEAD]
+        lines.append(ocr_errors(BANNER.format(**patient), rng))
+        lines.append(rng.choice(NOISE))
+        lines.append(break_words(body, rng))
+        lines.append(rng.choice(NOISE))
+        lines.extend(ocr_errors(line.format(page=number, pages=pages), rng) for line in FOOTER)
+        texts.append("\n".join(lines))
+    return {"text": PAGE_BREAK.join(texts), "truth": "\n\n".join(bodies)}
+
+
+def check_regressions() -> List[str]:
+    """Names of the REGRESSIONS cases whose kept lines compaction removed."""
+    failed = []
+    for case in REGRESSIONS:
+        text = compact_text(case["text"])["text"]
+        # Each expected line must survive as many times as it is listed
+        if any(text.count(line) < case["keep"].count(line) for line in case["keep"]):
+            failed.append(case["name"])
+    return failed
+
+
+def run(documents: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    results = []
+    for index in range(documents):
+        document = scanned_document(rng, pages=rng.randint(2, 8))
+        compaction = compact_text(document["text"])
+        before = score(document["text"], document["truth"])["word_recall"]
+        after = score(compaction.pop("text"), document["truth"])["word_recall"]
+        results.append({
+            "document": index,
+            **compaction,
+            "saved_share": round(compaction["tokens_saved"] / compaction["tokens_before"], 3),
+            "word_recall_before": before,
+            "word_recall_after": after,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prompt compaction on synthetic multi-page scans")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.documents, args.seed)
+    print(f"{'doc':<5}{'pages':>6}{'tokens':>9}{'after':>8}{'saved':>8}{'repeated':>10}{'garbage':>9}"
+          f"{'hyphens':>9}{'recall':>9}")
+    for result in results:
+        print(f"{result['document']:<5}{result['pages']:>6}{result['tokens_before']:>9}{result['tokens_after']:>8}"
+              f"{result['saved_share']:>8.0%}{result['repeated_lines']:>10}{result['garbage_lines']:>9}"
+              f"{result['hyphenations']:>9}{result['word_recall_after']:>9.3f}")
+    before = sum(result['tokens_before'] for result in results)
+    after = sum(result['tokens_after'] for result in results)
+    print(f"📊 {before} → {after} estimated tokens ({1 - after / before:.0%} saved)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    lost = [result['document'] for result in results
+            if result['word_recall_after'] < result['word_recall_before'] - MAX_RECALL_LOSS]
+    if lost:
+        print(f"❌ Compaction lost report content in documents {lost}")
+    regressions = check_regressions()
+    if regressions:
+        print(f"❌ Compaction removed findings in regression cases: {', '.join(regressions)}")
+    else:
+        print(f"✅ {len(REGRESSIONS)} regression cases kept their findings")
+    sys.exit(1 if lost or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Synthetic radiology report corpus for the extraction benchmark.
+
+Every document is generated locally and deterministically, with its ground
+truth text recorded in manifest.json:
+
+    born_digital   PDF with a text layer
+    scanned        PDF whose pages are slightly rotated, noisy page images
+    mixed          PDF with one text page and one scanned page
+    multi_page     Long PDF with a text layer spanning several pages
+    docx / txt     The same kind of report in the other upload formats
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+CORPUS_VERSION = 1
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+SCAN_ZOOM = 150 / 72
+
+EXAMS = [
+    ("CT CHEST WITH CONTRAST", "Shortness of breath and cough for three weeks."),
+    ("MRI LUMBAR SPINE WITHOUT CONTRAST", "Low back pain radiating to the left leg."),
+    ("CT ABDOMEN AND PELVIS WITH CONTRAST", "Right lower quadrant pain and fever."),
+    ("MRI BRAIN WITH AND WITHOUT CONTRAST", "New onset headaches and blurred vision."),
+    ("CHEST RADIOGRAPH PA AND LATERAL", "Follow-up of community acquired pneumonia."),
+]
+FINDINGS = [
+    "There is a 1.4 cm ground-glass nodule in the right upper lobe.",
+    "No pleural effusion or pneumothorax is identified.",
+    "Mild degenerative disc disease at L4-L5 with a small central disc protrusion.",
+    "The appendix is dilated to 11 mm with periappendiceal fat stranding.",
+    "There is a 2.1 cm hypodense lesion in segment 7 of the liver, likely a simple cyst.",
+    "The heart is normal in size. The mediastinal contours are unremarkable.",
+    "Scattered T2 hyperintense foci in the periventricular white matter.",
+    "No acute intracranial hemorrhage, mass effect or midline shift.",
+    "Mild bibasilar atelectasis without focal consolidation.",
+    "The kidneys enhance symmetrically without hydronephrosis.",
+    "Moderate left neural foraminal narrowing at L5-S1.",
+    "Subcentimeter mesenteric lymph nodes, likely reactive.",
+]
+IMPRESSIONS = [
+    "Findings consistent with acute appendicitis.",
+    "Indeterminate pulmonary nodule; follow-up CT in 3 months is recommended.",
+    "Degenerative changes without high grade canal stenosis.",
+    "Nonspecific white matter changes, likely chronic small vessel ischemic disease.",
+    "No acute cardiopulmonary abnormality.",
+]
+
+
+def make_report(rng: random.Random, findings: int = 5) -> str:
+    """A plausible, randomly assembled radiology report."""
+    exam, history = rng.choice(EXAMS)
+    lines = [
+        exam,
+        f"Accession: {rng.randint(1000000, 9999999)}   Date: 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "",
+        f"CLINICAL HISTORY: {history}",
+        "",
+        "TECHNIQUE: Standard departmental protocol was used.",
+        "",
+        "FINDINGS:",
+    ]
+    lines.extend(rng.sample(FINDINGS, findings))
+    lines.extend(["", "IMPRESSION:"])
+    lines.extend(f"{n}. {text}" for n, text in enumerate(rng.sample(IMPRESSIONS, 2), 1))
+    return "\n".join(lines)
+
+
+def _text_page(doc, text: str) -> None:
+    import fitz
+
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    rect = fitz.Rect(MARGIN, MARGIN, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN)
+    if page.insert_textbox(rect, text, fontsize=11, fontname="helv") < 0:
+        raise ValueError("Report text does not fit on one page")
+
+
+def _scanned_page(doc, text: str, rng: random.Random) -> None:
+    """Render text to an image the way a flatbed scan would see it."""
+    import fitz
+    import numpy as np
+    from PIL import Image
+
+    source = fitz.open()
+    _text_page(source, text)
+    pix = source[0].get_pixmap(matrix=fitz.Matrix(SCAN_ZOOM, SCAN_ZOOM), colorspace=fitz.csGRAY, alpha=False)
+    source.close()
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    image = image.rotate(rng.uniform(-1.5, 1.5), resample=Image.BILINEAR, fillcolor=255)
+    noise = np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 12, (image.height, image.width))
+    pixels = np.clip(np.asarray(image, dtype=np.float32) * 0.92 + 10 + noise, 0, 255).astype(np.uint8)
+    buffer = fitz.Pixmap(fitz.csGRAY, pix.width, pix.height, pixels.tobytes(), False)
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_image(page.rect, stream=buffer.tobytes("png"))
+
+
+def _write_pdf(path: str, pages: List[Any]) -> None:
+    import fitz
+
+    doc = fitz.open()
+    for build in pages:
+        build(doc)
+    # Fixed metadata keeps the files byte-for-byte reproducible
+    doc.set_metadata({"producer": "radiology benchmark", "creationDate": "", "modDate": ""})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def _write_docx(path: str, text: str) -> bool:
+    try:
+        import docx
+    except ImportError:
+        return False
+    document = docx.Document()
+    for line in text.split("\n"):
+        document.add_paragraph(line)
+    document.core_properties.created = datetime.datetime(2024, 1, 1)
+    document.save(path)
+    return True
+
+
+def build_corpus(directory: str, seed: int = 7) -> Dict[str, Any]:
+    """
+    Generate the corpus into directory and write its manifest.
+
+    Returns:
+        The manifest: corpus version, seed and one entry per document
+        with its file, kind, page count and ground truth text
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    documents = []
+
+    def add(name: str, kind: str, truth: List[str], writer) -> None:
+        path = os.path.join(directory, name)
+        if writer(path) is False:
+            print(f"⚠️ Skipping {name}: python-docx not installed")
+            return
+        documents.append({"name": name, "kind": kind, "pages": len(truth), "truth": "\n\n".join(truth)})
+
+    report = make_report(rng)
+    add("born_digital.pdf", "born_digital", [report],
+        lambda path: _write_pdf(path, [lambda doc: _text_page(doc, report)]))
+
+    scanned = make_report(rng)
+    scan_rng = random.Random(rng.random())
+    add("scanned.pdf", "scanned", [scanned],
+        lambda path: _write_pdf(path, [lambda doc: _scanned_page(doc, scanned, scan_rng)]))
+
+    mixed = [make_report(rng, 4), make_report(rng, 4)]
+    mixed_rng = random.Random(rng.random())
+    add("mixed.pdf", "mixed", mixed,
+        lambda path: _write_pdf(path, [lambda doc: _text_page(doc, mixed[0]),
+                                       lambda doc: _scanned_page(doc, mixed[1], mixed_rng)]))
+
+    multi = [make_report(rng, 8) for _ in range(6)]
+    add("multi_page.pdf", "multi_page", multi,
+        lambda path: _write_pdf(path, [lambda doc, text=text: _text_page(doc, text) for text in multi]))
+
+    docx_report = make_report(rng)
+    add("report.docx", "docx", [docx_report], lambda path: _write_docx(path, docx_report))
+
+    txt_report = make_report(rng)
+
+    def write_txt(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(txt_report)
+
+    add("report.txt", "txt", [txt_report], write_txt)
+
+    manifest = {"version": CORPUS_VERSION, "seed": seed, "documents": documents}
+    manifest["fingerprint"] = hashlib.sha256(
+        json.dumps(documents, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_corpus(directory: str, seed: int = 7) -> Dict[str, Any]:
+    """
+    Load the corpus manifest, generating the corpus first if it is missing
+    or was built by an older version of this module.
+    """
+    path = os.path.join(directory, "manifest.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == CORPUS_VERSION and manifest.get("seed") == seed:
+            return manifest
+    print(f"🛠️ Generating benchmark corpus in {directory}")
+    return build_corpus(directory, seed)
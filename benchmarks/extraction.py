@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Extraction benchmark for Radiology-to-Speech Assistant
+
+Runs every extractor and OCR configuration over a generated corpus of
+synthetic radiology reports (see benchmarks/corpus.py) and measures wall
+time, CPU time (including OCR worker processes), peak RSS and accuracy
+against the ground truth. Results are written as JSON and compared with a
+stored baseline; any regression makes the run exit with status 1.
+
+Each measurement runs in a fresh process, so peak RSS and CPU time belong
+to that extractor alone. Library imports and OCR worker start-up happen
+before the timer starts.
+
+OCR configurations need Tesseract. Without it they are skipped, which fails
+the run (and refuses to update the baseline) unless --allow-skipped-ocr is
+given, so a check cannot pass by never running OCR.
+
+Usage: python -m benchmarks.extraction [options]
+       python -m benchmarks.extraction --update-baseline
+"""
+
+import argparse
+import difflib
+import importlib
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.corpus import load_corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(ROOT, 'benchmarks', 'corpus')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+RESULT_MARKER = 'BENCHMARK_RESULT '
+
+# Regression thresholds against the baseline
+ACCURACY_TOLERANCE = 0.02
+TIME_TOLERANCE = 1.0      # fraction slower than the baseline...
+TIME_SLACK = 0.1          # ...and at least this many seconds slower
+RSS_TOLERANCE = 0.5
+RSS_SLACK_MB = 50
+
+PDF_ONLY = {'pdf'}
+ALL_FORMATS = {'pdf', 'docx', 'txt'}
+
+# name -> (formats, needs OCR, environment, description)
+EXTRACTORS: Dict[str, Tuple[set, bool, Dict[str, str], str]] = {
+    'pypdf2': (PDF_ONLY, False, {}, 'PyPDF2 text layer'),
+    'pdfplumber': (PDF_ONLY, False, {}, 'pdfplumber text layer'),
+    'pymupdf': (PDF_ONLY, False, {}, 'PyMuPDF text layer'),
+    'pipeline_text_only': (PDF_ONLY, False, {}, 'extract_pdf_text_with_ocr with OCR off'),
+    'app': (ALL_FORMATS, False, {}, 'extract_text_from_file with the default OCR settings'),
+    'app_ocr_no_preprocess': (ALL_FORMATS, True, {'OCR_PREPROCESS': '0'},
+                              'extract_text_from_file, adaptive DPI without page cleanup'),
+    'app_ocr_fixed_zoom': (ALL_FORMATS, True, {'OCR_PREPROCESS': '0', 'OCR_ZOOM': '2'},
+                           'extract_text_from_file, fixed 144 DPI without page cleanup'),
+}
+
+
+def _pypdf2(path: str) -> str:
+    from PyPDF2 import PdfReader
+
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def _pdfplumber(path: str) -> str:
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+
+def _pymupdf(path: str) -> str:
+    import fitz
+
+    with fitz.open(path) as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+
+def _prepare(name: str) -> Tuple[Callable[[str], str], Callable[[], None]]:
+    """
+    Import what the extractor needs and start any OCR workers.
+
+    Returns:
+        The extraction function and a teardown that stops worker processes
+    """
+    if name == 'pypdf2':
+        import PyPDF2  # noqa: F401
+        return _pypdf2, lambda: None
+    if name == 'pdfplumber':
+        import pdfplumber  # noqa: F401
+        return _pdfplumber, lambda: None
+    if name == 'pymupdf':
+        import fitz  # noqa: F401
+        return _pymupdf, lambda: None
+    if name == 'pipeline_text_only':
+        import fitz  # noqa: F401
+        from utils.pdf_processor import extract_pdf_text_with_ocr
+
+        return lambda path: extract_pdf_text_with_ocr(path, ocr=False), lambda: None
+
+    # extract_text_from_file imports these on first use, which would be timed
+    import app
+    import docx  # noqa: F401
+    import fitz  # noqa: F401
+    import utils.pdf_processor  # noqa: F401
+    from utils.capabilities import probe_ocr
+
+    probe = probe_ocr()
+    if not probe['available']:
+        return app.extract_text_from_file, lambda: None
+    importlib.import_module(probe['engine'])
+    from utils.ocr import get_ocr_engine
+
+    engine = get_ocr_engine()
+    engine.warm_up()
+    # Reaping the workers adds their CPU time to this process's children
+    return app.extract_text_from_file, lambda: engine.shutdown(wait=True)
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss survives exec, so a fresh interpreter would report the
+    # benchmark runner's peak; VmHWM belongs to this process alone
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+def _usage() -> Tuple[float, float]:
+    """CPU seconds of this process and its reaped children, and peak RSS in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    children_kb = children.ru_maxrss // 1024 if sys.platform == 'darwin' else children.ru_maxrss
+    return cpu, max(_peak_rss_kb(), children_kb) / 1024
+
+
+def run_one(name: str, path: str) -> Dict[str, Any]:
+    """
+    Measure one extractor on one file in the current process.
+    """
+    extract, teardown = _prepare(name)
+    cpu_before, _ = _usage()
+    started = time.perf_counter()
+    try:
+        text, error = extract(path), None
+    except Exception as e:
+        text, error = '', f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    teardown()
+    cpu_after, peak_rss = _usage()
+    return {
+        'text': text,
+        'error': error,
+        'wall_seconds': wall,
+        'cpu_seconds': cpu_after - cpu_before,
+        'peak_rss_mb': peak_rss
+    }
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def score(text: str, truth: str) -> Dict[str, float]:
+    """
+    Character accuracy (similarity of the whitespace-normalized texts) and
+    word recall (share of ground truth words that were extracted).
+    """
+    extracted, expected = _normalize(text), _normalize(truth)
+    matcher = difflib.SequenceMatcher(None, extracted, expected, autojunk=False)
+    words = expected.split()
+    found = set(extracted.split())
+    return {
+        'char_accuracy': round(matcher.ratio(), 4),
+        'word_recall': round(sum(1 for word in words if word in found) / len(words), 4) if words else 1.0
+    }
+
+
+def measure(name: str, path: str, env: Dict[str, str], timeout: float) -> Dict[str, Any]:
+    """
+    Run one measurement in a fresh interpreter and collect its result.
+    """
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.extraction', '--run-one', name, path],
+        cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True, timeout=timeout)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    tail = (completed.stderr or completed.stdout).strip().splitlines()[-1:] or ['no output']
+    return {'text': '', 'error': f"Benchmark process failed: {tail[0]}",
+            'wall_seconds': None, 'cpu_seconds': None, 'peak_rss_mb': None}
+
+
+def run_benchmark(corpus_dir: str, extractors: List[str], repeat: int = 3,
+                  timeout: float = 300) -> Dict[str, Any]:
+    """
+    Measure every extractor on every document it supports.
+
+    Returns:
+        Environment details, the corpus fingerprint and one result per
+        (extractor, document), with median times over the repeats
+    """
+    from utils.capabilities import probe_ocr
+
+    manifest = load_corpus(corpus_dir)
+    ocr = probe_ocr()
+    results = []
+    for name in extractors:
+        formats, needs_ocr, env, _ = EXTRACTORS[name]
+        for document in manifest['documents']:
+            if document['name'].rsplit('.', 1)[1] not in formats:
+                continue
+            entry = {'extractor': name, 'document': document['name'], 'kind': document['kind']}
+            if needs_ocr and not ocr['available']:
+                entry.update(status='skipped', reason=f"OCR unavailable: missing {', '.join(ocr['missing_dependencies'])}")
+                results.append(entry)
+                continue
+            runs = [measure(name, os.path.join(corpus_dir, document['name']), env, timeout) for _ in range(repeat)]
+            last = runs[-1]
+            entry['status'] = 'error' if last['error'] else 'ok'
+            if last['error']:
+                entry['error'] = last['error']
+            for metric, digits in (('wall_seconds', 4), ('cpu_seconds', 4), ('peak_rss_mb', 1)):
+                values = [run[metric] for run in runs if run[metric] is not None]
+                entry[metric] = round(statistics.median(values), digits) if values else None
+            entry['characters'] = len(last['text'])
+            entry.update(score(last['text'], document['truth']))
+            results.append(entry)
+            print(f"  {name:<22} {document['name']:<18} {entry['status']:<6} "
+                  f"acc {entry['char_accuracy']:.3f}  wall {entry['wall_seconds']}s  "
+                  f"cpu {entry['cpu_seconds']}s  rss {entry['peak_rss_mb']} MB")
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'tesseract': ocr['tesseract_version']
+        },
+        'corpus': {'version': manifest['version'], 'fingerprint': manifest['fingerprint']},
+        'extractors': {name: EXTRACTORS[name][3] for name in extractors},
+        'repeat': repeat,
+        'results': results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    Returns:
+        One message per regression (empty if none)
+    """
+    if current['corpus']['fingerprint'] != baseline['corpus']['fingerprint']:
+        return ["Corpus differs from the baseline's; regenerate the baseline with --update-baseline"]
+    previous = {(r['extractor'], r['document']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['extractor'], result['document']))
+        if before is None or result['status'] == 'skipped':
+            continue
+        label = f"{result['extractor']} on {result['document']}"
+        if before['status'] == 'skipped':
+            regressions.append(f"{label} has no baseline measurement (skipped when it was recorded); "
+                               f"regenerate the baseline with --update-baseline")
+            continue
+        if before['status'] != 'ok':
+            continue
+        if result['status'] != 'ok':
+            regressions.append(f"{label} now fails: {result.get('error')}")
+            continue
+        if result['char_accuracy'] < before['char_accuracy'] - ACCURACY_TOLERANCE:
+            regressions.append(f"{label} accuracy {before['char_accuracy']:.3f} -> {result['char_accuracy']:.3f}")
+        wall, old_wall = result['wall_seconds'], before['wall_seconds']
+        if wall > old_wall * (1 + TIME_TOLERANCE) and wall - old_wall > TIME_SLACK:
+            regressions.append(f"{label} wall time {old_wall:.3f}s -> {wall:.3f}s")
+        rss, old_rss = result['peak_rss_mb'], before['peak_rss_mb']
+        if rss > old_rss * (1 + RSS_TOLERANCE) and rss - old_rss > RSS_SLACK_MB:
+            regressions.append(f"{label} peak RSS {old_rss:.0f} MB -> {rss:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text extraction and OCR")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus directory (generated if missing)")
+    parser.add_argument("--extractors", default=','.join(EXTRACTORS),
+                        help=f"Comma-separated subset of: {', '.join(EXTRACTORS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; times are medians")
+    parser.add_argument("--output", default=os.path.join(ROOT, 'benchmarks', 'results.json'))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--allow-skipped-ocr", action="store_true",
+                        help="Pass even though OCR configurations were skipped because Tesseract is unavailable")
+    parser.add_argument("--run-one", nargs=2, metavar=("EXTRACTOR", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        result = run_one(*args.run_one)
+        print(RESULT_MARKER + json.dumps(result))
+        return
+
+    extractors = [name.strip() for name in args.extractors.split(',') if name.strip()]
+    unknown = [name for name in extractors if name not in EXTRACTORS]
+    if unknown:
+        print(f"❌ Unknown extractor(s): {', '.join(unknown)}")
+        sys.exit(2)
+
+    print(f"📊 Extraction benchmark ({args.repeat} run(s) each)")
+    results = run_benchmark(args.corpus, extractors, repeat=args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"📝 Results written to {args.output}")
+
+    skipped = [result for result in results['results'] if result['status'] == 'skipped']
+    if skipped and not args.allow_skipped_ocr:
+        names = sorted({result['extractor'] for result in skipped})
+        print(f"❌ Skipped {', '.join(names)}: {skipped[0]['reason']}")
+        print("   Install Tesseract, or pass --allow-skipped-ocr to accept a run without OCR")
+        sys.exit(1)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No baseline at {args.baseline}; create one with --update-baseline")
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        regressions = compare(results, json.load(f))
+    if regressions:
+        print(f"\n❌ {len(regressions)} REGRESSION(S) against {args.baseline}:")
+        for message in regressions:
+            print(f"   • {message}")
+        sys.exit(1)
+    print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
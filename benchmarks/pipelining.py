@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Speech pipelining benchmark for Radiology-to-Speech Assistant
+
+Simplifies one report and synthesizes its speech twice, with local fakes
+for Gemini and the speech engine (utils/fakes.py) whose latency is set on
+the command line:
+
+    sequential   speech starts once the whole simplified text is ready
+    pipelined    each sentence goes to the speech engine as soon as the
+                 model has written it (TextToSpeechConverter.speak_while_generating)
+
+and reports when the text was complete, when the first audio segment was
+playable and when all speech was done. Pipelined, the first audio comes
+long before the text is complete, and the total is the longer of text
+generation and speech synthesis plus the last chunk's synthesis, rather
+than their sum. Each comparison runs with a given number of speech workers
+(--tts-workers): with enough of them sequential synthesis is already fast,
+and pipelining mainly brings the first audio forward.
+
+Usage: python -m benchmarks.pipelining [options]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from utils.audio_store import AudioStore
+from utils.fakes import FakeGenerativeModel, FakeSpeechBackend
+from utils.nlp import FINDINGS_MARKER, RadiologyTextSimplifier
+from utils.tts import TextToSpeechConverter
+
+REPORT = (
+    "CT CHEST WITH CONTRAST. FINDINGS: There is a 1.4 cm ground-glass nodule in the right upper lobe. "
+    "No pleural effusion or pneumothorax. The heart is normal in size. "
+    "IMPRESSION: Indeterminate pulmonary nodule; follow-up CT in 3 months is recommended."
+)
+RESPONSE = (
+    "This scan took detailed pictures of your chest. "
+    "It found a small spot, about half an inch wide, in the top part of your right lung. "
+    "The spot looks hazy, like frosted glass. "
+    "Spots like this are common and are often caused by a past infection or inflammation. "
+    "There is no fluid around your lungs. Your lungs have not collapsed. "
+    "Your heart is a normal size. "
+    "Because the spot is new, your doctor wants another scan in three months. "
+    "That scan will show whether the spot has gone away, stayed the same or grown. "
+    "Most spots like this stay the same or go away. "
+    "Please bring any questions about this result to your doctor."
+    f"\n{FINDINGS_MARKER}\n"
+    "- A small hazy spot in the right lung\n"
+    "- No fluid around the lungs\n"
+    "- Follow-up scan in three months"
+)
+
+
+def measure(mode: str, tts_workers: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run one simplification and its speech; times are seconds from the start."""
+    model = FakeGenerativeModel(response_text=RESPONSE, chunk_words=args.chunk_words,
+                                first_chunk_delay=args.first_token_delay, chunk_delay=args.chunk_delay)
+    simplifier = RadiologyTextSimplifier(api_key='', model=model,
+                                         client_options={'rate': 1000, 'burst': 1000})
+    backend = FakeSpeechBackend(delay=args.tts_delay)
+    # A fresh store per run, so no run is answered from another's audio
+    output_dir = tempfile.mkdtemp(prefix=f'pipelining-{mode}-')
+    tts = TextToSpeechConverter(output_dir=output_dir, max_workers=tts_workers,
+                                store=AudioStore(output_dir, max_bytes=None, max_age=None),
+                                backend=backend)
+
+    timings = {'text_done': None, 'first_audio': None, 'speech_done': None}
+    started = time.perf_counter()
+
+    def mark(name):
+        if timings[name] is None:
+            timings[name] = round(time.perf_counter() - started, 3)
+
+    events = simplifier.stream_simplify_text(REPORT, include_findings=True)
+    speech = None
+    if mode == 'pipelined':
+        for event in tts.speak_while_generating(events):
+            if 'result' in event:
+                mark('text_done')
+            elif 'segment' in event:
+                mark('first_audio')
+            elif 'speech' in event:
+                speech = event['speech']
+    else:
+        result = None
+        for event in events:
+            if 'result' in event:
+                result = event['result']
+                mark('text_done')
+        for event in tts.stream_speech(result['simplified_text']):
+            if 'segment' in event:
+                mark('first_audio')
+            else:
+                speech = event['result']
+    mark('speech_done')
+    tts._executor.shutdown()
+
+    if not speech or not speech.get('success'):
+        raise RuntimeError(f"{mode}: speech failed: {speech and speech.get('error')}")
+    return {'mode': mode, 'tts_workers': tts_workers, 'segments': len(speech['segments']),
+            'synthesis_calls': len(backend.calls), **timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and pipelined simplification and speech")
+    parser.add_argument("--first-token-delay", type=float, default=0.5, help="Seconds before the model's first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.1, help="Seconds between the model's chunks")
+    parser.add_argument("--chunk-words", type=int, default=4, help="Words per model chunk")
+    parser.add_argument("--tts-delay", type=float, default=0.8, help="Seconds per speech synthesis call")
+    parser.add_argument("--tts-workers", default="1,4",
+                        help="Comma-separated chunks synthesized concurrently, one comparison each")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    comparisons = []
+    print(f"{'workers':<9}{'mode':<12}{'text done':>11}{'first audio':>13}{'speech done':>13}{'segments':>10}")
+    for workers in (int(value) for value in args.tts_workers.split(',')):
+        sequential, pipelined = measure('sequential', workers, args), measure('pipelined', workers, args)
+        # What full overlap could reach: the longer of text generation and speech alone
+        ideal = max(sequential['text_done'], sequential['speech_done'] - sequential['text_done'])
+        for result in (sequential, pipelined):
+            print(f"{workers:<9}{result['mode']:<12}{result['text_done']:>10.2f}s{result['first_audio']:>12.2f}s"
+                  f"{result['speech_done']:>12.2f}s{result['segments']:>10}")
+        print(f"{'':<9}max(text, speech) = {ideal:.2f}s; total is {pipelined['speech_done'] / ideal:.2f}x that "
+              f"pipelined, {sequential['speech_done'] / ideal:.2f}x sequential")
+        comparisons.append({'tts_workers': workers, 'sequential': sequential, 'pipelined': pipelined,
+                            'ideal_seconds': round(ideal, 3)})
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(comparisons, f, indent=2)
+    # Pipelining must start audio sooner and never finish later (allowing for timer noise)
+    failed = [c['tts_workers'] for c in comparisons
+              if c['pipelined']['first_audio'] >= c['sequential']['first_audio']
+              or c['pipelined']['speech_done'] > c['sequential']['speech_done'] * 1.05]
+    if failed:
+        print(f"❌ Pipelining did not help with {failed} speech workers")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 PDF Debug Utility for Radiology-to-Speech Assistant
 
 This script helps diagnose issues with PDF text extraction.
+To compare extractors and OCR settings across a whole corpus, with timings
+and accuracy, run the benchmark instead: python -m benchmarks.extraction
 Usage: python debug_pdf.py <path_to_pdf>
 """
 
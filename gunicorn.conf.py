@@ -0,0 +1,78 @@
+"""
+gunicorn settings for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Each worker imports the app after it is forked, so Gemini clients, OCR
+worker pools, caches and database connections are created per process and
+never shared across a fork. Worker hooks below warm up WARM_UP_SERVICES
+before a worker takes traffic and drain background jobs when it stops.
+
+Workers share METRICS_DIR, so /metrics reports all workers together
+whichever one serves the scrape.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# The app defers its startup work to the hooks below
+os.environ['SERVER_MANAGED_LIFECYCLE'] = '1'
+# Set before workers fork, so they all inherit the same directory
+_temporary_metrics_dir = not os.environ.get('METRICS_DIR')
+if _temporary_metrics_dir:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='radiology-metrics-')
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+# gthread (threads per sync worker), gevent, or uvicorn.workers.UvicornWorker
+# with wsgi:asgi_application
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_WORKERS', 0)) or min(4, multiprocessing.cpu_count())
+# Every worker has its own OCR pool, so by default the CPUs left for OCR are
+# divided between them rather than each worker starting cpu_count - 1 Tesseract
+# processes (OCR_WORKERS x workers in total when set explicitly)
+os.environ.setdefault('OCR_WORKERS', str(max(1, (multiprocessing.cpu_count() - 1) // workers)))
+threads = int(os.environ.get('WEB_THREADS', 8))
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 100))
+# Long enough for a streamed simplification
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+# Time a stopping worker gets to finish requests and drain background jobs
+graceful_timeout = int(float(os.environ.get('SHUTDOWN_DRAIN_SECONDS', 30))) + 5
+keepalive = 5
+# Recycle workers now and then to cap slow memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+# The app is imported in each worker, not in the master (see above)
+preload_app = False
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None
+
+
+def on_starting(server):
+    from utils.metrics import clear_directory
+
+    clear_directory(os.environ['METRICS_DIR'])
+
+
+def post_worker_init(worker):
+    import app
+
+    app.start_worker(background=False)
+    worker.log.info("Worker %s ready: %s", worker.pid, app.services.report())
+
+
+def worker_exit(server, worker):
+    import app
+
+    app.stop_worker()
+
+
+def child_exit(server, worker):
+    # Runs in the master: keep the worker's counters, drop its gauges
+    from utils.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, os.environ['METRICS_DIR'])
+
+
+def on_exit(server):
+    if _temporary_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Load test for Radiology-to-Speech Assistant
+
+Sends concurrent POST /simplify requests and reports requests per second
+and latency percentiles. Without --url the app is started in-process with
+FAKE_UPSTREAMS=1, so Gemini and the speech engine are local stand-ins with
+fixed latency and the numbers reflect the server itself. To test a
+production setup, start it with stubbed upstreams and point --url at it:
+
+    FAKE_UPSTREAMS=1 GEMINI_RPS=1000 gunicorn -c gunicorn.conf.py wsgi:application
+    python load_test.py --url http://localhost:8000 --requests 500 --concurrency 32
+
+Usage: python load_test.py [options]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REPORT = (
+    "CT ABDOMEN AND PELVIS WITH CONTRAST. FINDINGS: There is a 1.2 cm hypodense lesion "
+    "in segment 7 of the liver, too small to characterize, likely a simple cyst. "
+    "Mild diverticulosis of the sigmoid colon without diverticulitis. No lymphadenopathy. "
+    "IMPRESSION: Likely hepatic cyst. Sigmoid diverticulosis. Case {index}."
+)
+
+
+def start_local_server():
+    """Serve the app with fake upstreams on a free local port."""
+    os.environ['FAKE_UPSTREAMS'] = '1'
+    # The fakes are the bottleneck being modelled, not the Gemini rate limit
+    os.environ.setdefault('GEMINI_RPS', '1000')
+    os.environ.setdefault('GEMINI_BURST', '1000')
+    os.environ.setdefault('GEMINI_MAX_IN_FLIGHT', '64')
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def send(url, index, same_text, timeout):
+    # Distinct text per request unless --same-text, so the cache does not answer
+    text = REPORT.format(index=0 if same_text else index)
+    body = urllib.parse.urlencode({'text': text}).encode()
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body), timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = None
+    return status, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(url, requests, concurrency, same_text=False, timeout=120.0):
+    """
+    Send requests to url from concurrency threads.
+
+    Returns:
+        A summary with throughput, latency percentiles and status counts
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda index: send(url, index, same_text, timeout), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for status, seconds in results if status == 200]
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'url': url,
+        'requests': requests,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'errors': requests - len(latencies),
+        'statuses': statuses,
+        'latency_ms': {
+            name: round(value * 1000, 1) if value is not None else None
+            for name, value in (
+                ('p50', percentile(latencies, 0.50)),
+                ('p95', percentile(latencies, 0.95)),
+                ('p99', percentile(latencies, 0.99)),
+                ('max', max(latencies) if latencies else None)
+            )
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the /simplify endpoint")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process with fake upstreams)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--same-text", action="store_true", help="Send one report repeatedly to measure cache hits")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = start_local_server()
+    try:
+        summary = run(base_url.rstrip('/') + '/simplify', args.requests, args.concurrency,
+                      same_text=args.same_text, timeout=args.timeout)
+    finally:
+        if server:
+            server.shutdown()
+
+    latency = summary['latency_ms']
+    print(f"📊 {summary['requests']} requests, concurrency {summary['concurrency']}, {summary['seconds']}s")
+    print(f"   {summary['requests_per_second']} req/s, "
+          f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, max {latency['max']} ms")
+    if summary['errors']:
+        print(f"❌ {summary['errors']} failed requests: {summary['statuses']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(1 if summary['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main()
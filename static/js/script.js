@@ -12,6 +12,15 @@ document.addEventListener('DOMContentLoaded', function() {
     const noFindingsMsg = document.getElementById('noFindingsMsg');
     const languageSelect = document.getElementById('language');
     const languageCodeInput = document.getElementById('language_code');
+    const loadingMessage = document.getElementById('loadingMessage');
+    let segmentPlayer = null;
+    const canStream = !!(window.ReadableStream && window.TextDecoder);
+    const stageLabels = {
+        extract: 'reading file',
+        simplify: 'simplifying text',
+        translate: 'translating',
+        speech: 'generating audio'
+    };
 
     // Handle language selection change
     languageSelect.addEventListener('change', function() {
@@ -25,6 +34,7 @@ document.addEventListener('DOMContentLoaded', function() {
         e.preventDefault();
         
         // Show loading indicator
+        loadingMessage.textContent = 'Processing your request...';
         loadingIndicator.style.display = 'block';
         resultCard.style.display = 'none';
         noResultMsg.style.display = 'none';
@@ -33,30 +43,23 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Get form data
         const formData = new FormData(radiologyForm);
+        segmentPlayer = null;
         
         try {
-            // Send request to simplify endpoint
-            const response = await fetch('/simplify', {
-                method: 'POST',
-                body: formData
-            });
-            
-            if (!response.ok) {
-                throw new Error('Server error: ' + response.status);
-            }
-            
-            const data = await response.json();
+            const data = canStream ? await streamSimplify(formData) : await runJob(formData);
             
             // Display simplified text
             simplifiedText.textContent = data.simplified_text;
             
-            // Create audio player
-            audioPlayer.innerHTML = `
-                <audio controls class="w-100">
-                    <source src="/static/audio/${data.audio_filename}" type="audio/mpeg">
-                    Your browser does not support the audio element.
-                </audio>
-            `;
+            // Create audio player, unless segment playback has already started
+            if (!segmentPlayer || segmentPlayer.idle()) {
+                audioPlayer.innerHTML = `
+                    <audio controls class="w-100">
+                        <source src="/static/audio/${data.audio_filename}">
+                        Your browser does not support the audio element.
+                    </audio>
+                `;
+            }
             
             // Store audio filename for download
             downloadAudioBtn.setAttribute('data-filename', data.audio_filename);
@@ -66,8 +69,8 @@ document.addEventListener('DOMContentLoaded', function() {
             resultCard.style.display = 'block';
             noResultMsg.style.display = 'none';
             
-            // Fetch key findings
-            await fetchKeyFindings(data.original_text);
+            // Display key findings returned with the simplification
+            showKeyFindings(data.key_findings);
             
         } catch (error) {
             console.error('Error:', error);
@@ -79,32 +82,215 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
-    // Fetch key findings from the radiology report
-    async function fetchKeyFindings(text) {
-        try {
-            const response = await fetch('/api/key-findings', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ text })
-            });
+    // Queue the report as a background job and wait for its result
+    async function runJob(formData) {
+        const response = await fetch('/jobs', {
+            method: 'POST',
+            body: formData
+        });
+        
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.error || 'Server error: ' + response.status);
+        }
+        
+        return waitForJob(job.job_id);
+    }
+    
+    // Stream the simplified text into the page as the model generates it
+    async function streamSimplify(formData) {
+        const response = await fetch('/simplify/stream', {
+            method: 'POST',
+            body: formData
+        });
+        
+        if (!response.ok) {
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.error || 'Server error: ' + response.status);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let started = false;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                throw new Error('Connection closed before the result was complete');
+            }
+            buffer += decoder.decode(value, { stream: true });
             
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const message = parseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                
+                if (message.event === 'stage') {
+                    loadingMessage.textContent = `Processing your request (${stageLabels[message.data.stage] || message.data.stage})...`;
+                    // Segments may already be playing when speech is synthesized alongside the text
+                    if (started && message.data.stage === 'speech' && !segmentPlayer) {
+                        audioPlayer.innerHTML = '<p class="text-muted mb-0">Generating audio...</p>';
+                    }
+                } else if (message.event === 'chunk') {
+                    if (!started) {
+                        // Show the result card as soon as the first text arrives
+                        started = true;
+                        simplifiedText.textContent = '';
+                        audioPlayer.innerHTML = '';
+                        loadingIndicator.style.display = 'none';
+                        resultCard.style.display = 'block';
+                    }
+                    simplifiedText.textContent += message.data.text;
+                } else if (message.event === 'audio_segment') {
+                    if (!segmentPlayer) {
+                        segmentPlayer = createSegmentPlayer();
+                    }
+                    segmentPlayer.add(message.data.filename);
+                } else if (message.event === 'audio_reset') {
+                    // The final text differs from what was spoken; its audio follows
+                    if (segmentPlayer) {
+                        segmentPlayer.stop();
+                    }
+                    segmentPlayer = null;
+                    audioPlayer.innerHTML = '<p class="text-muted mb-0">Generating audio...</p>';
+                } else if (message.event === 'error') {
+                    throw new Error(message.data.error || 'Simplification failed');
+                } else if (message.event === 'done') {
+                    reader.cancel();
+                    return message.data;
+                }
+            }
+        }
+    }
+    
+    // Play audio segments back to back as they arrive, so listening can
+    // start before the whole report has been synthesized
+    function createSegmentPlayer() {
+        audioPlayer.innerHTML = '<audio controls class="w-100"></audio>';
+        const audio = audioPlayer.querySelector('audio');
+        const queue = [];
+        let next = 0;
+        let started = false;
+        
+        function playNext() {
+            if (next < queue.length) {
+                audio.src = `/static/audio/${queue[next++]}`;
+                audio.play().catch(() => {});
+            }
+        }
+        audio.addEventListener('play', () => { started = true; });
+        audio.addEventListener('ended', playNext);
+        
+        return {
+            add(filename) {
+                queue.push(filename);
+                if (next === 0) {
+                    audio.src = `/static/audio/${queue[next++]}`;
+                } else if (audio.ended) {
+                    playNext();
+                }
+            },
+            idle() {
+                return !started;
+            },
+            stop() {
+                audio.pause();
+            }
+        };
+    }
+    
+    // Parse one server-sent event block into its event name and JSON data
+    function parseEvent(block) {
+        let event = 'message';
+        const dataLines = [];
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : {} };
+    }
+    
+    // Show which pipeline stage the job is in
+    function showProgress(job) {
+        const running = Object.entries(job.stages).find(([, stage]) => stage.status === 'running');
+        loadingMessage.textContent = running
+            ? `Processing your request (${stageLabels[running[0]] || running[0]})...`
+            : 'Processing your request...';
+    }
+    
+    function jobResult(job) {
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Processing failed');
+        }
+        if (!job.result.success) {
+            throw new Error(job.result.error || 'Simplification failed');
+        }
+        return job.result;
+    }
+    
+    // Wait for a job to finish, using server-sent events when available
+    function waitForJob(jobId) {
+        if (!window.EventSource) {
+            return pollJob(jobId);
+        }
+        return new Promise((resolve, reject) => {
+            const events = new EventSource(`/jobs/${jobId}/events`);
+            events.onmessage = function(event) {
+                const job = JSON.parse(event.data);
+                showProgress(job);
+                if (job.status === 'done' || job.status === 'failed') {
+                    events.close();
+                    try {
+                        resolve(jobResult(job));
+                    } catch (error) {
+                        reject(error);
+                    }
+                }
+            };
+            events.onerror = function() {
+                // Fall back to polling if the event stream drops
+                events.close();
+                pollJob(jobId).then(resolve, reject);
+            };
+        });
+    }
+    
+    async function pollJob(jobId) {
+        while (true) {
+            const response = await fetch(`/jobs/${jobId}`);
             if (!response.ok) {
-                throw new Error('Failed to fetch key findings');
+                throw new Error('Server error: ' + response.status);
             }
-            
-            const data = await response.json();
-            
-            // Display key findings
-            keyFindings.innerHTML = data.key_findings;
-            keyFindingsCard.style.display = 'block';
-            noFindingsMsg.style.display = 'none';
-            
-        } catch (error) {
-            console.error('Error fetching key findings:', error);
+            const job = await response.json();
+            showProgress(job);
+            if (job.status === 'done' || job.status === 'failed') {
+                return jobResult(job);
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+    
+    // Display the key findings list
+    function showKeyFindings(findings) {
+        if (!findings || !findings.length) {
             noFindingsMsg.style.display = 'block';
+            return;
         }
+        
+        const list = document.createElement('ul');
+        list.className = 'mb-0';
+        findings.forEach(finding => {
+            const item = document.createElement('li');
+            item.textContent = finding;
+            list.appendChild(item);
+        });
+        keyFindings.replaceChildren(list);
+        keyFindingsCard.style.display = 'block';
+        noFindingsMsg.style.display = 'none';
     }
     
     // Copy simplified text to clipboard
@@ -128,7 +314,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (filename) {
             const link = document.createElement('a');
             link.href = `/static/audio/${filename}`;
-            link.download = 'simplified_radiology_report.mp3';
+            link.download = 'simplified_radiology_report.' + filename.split('.').pop();
             document.body.appendChild(link);
             link.click();
             document.body.removeChild(link);
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The app reads its configuration at import: local fakes, no rate limiting, no per-worker threads
+os.environ.setdefault('FAKE_UPSTREAMS', '1')
+os.environ.setdefault('GEMINI_RPS', '1000')
+os.environ.setdefault('GEMINI_BURST', '1000')
+os.environ.setdefault('SERVER_MANAGED_LIFECYCLE', '1')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
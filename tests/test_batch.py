@@ -0,0 +1,41 @@
+import zipfile
+
+import pytest
+
+from utils.batch import iter_reports
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def test_zip_unpacks_only_report_files(tmp_path):
+    source = make_zip(tmp_path / 'batch.zip', {
+        'a/report1.txt': 'No acute findings.',
+        'report2.pdf': b'%PDF-1.4',
+        'run.sh': 'echo hi',
+        '../escape.txt': 'outside',
+    })
+    work_dir = tmp_path / 'work'
+    reports = list(iter_reports(source, str(work_dir)))
+    assert sorted(report.id for report in reports) == ['a/report1.txt', 'escape.txt', 'report2.pdf']
+    assert not (work_dir / 'unpacked' / 'run.sh').exists()
+    assert not (tmp_path / 'escape.txt').exists()
+
+
+def test_zip_over_the_size_cap_is_rejected_before_extracting(tmp_path):
+    # Compresses to a few kilobytes
+    source = make_zip(tmp_path / 'bomb.zip', {'report.txt': '0' * (2 * 1024 * 1024)})
+    work_dir = tmp_path / 'work'
+    with pytest.raises(ValueError, match='unpacks to'):
+        list(iter_reports(source, str(work_dir), max_zip_bytes=1024 * 1024))
+    assert not (work_dir / 'unpacked').exists()
+
+
+def test_zip_over_the_file_cap_is_rejected(tmp_path):
+    source = make_zip(tmp_path / 'many.zip', {f'report{i}.txt': 'Normal.' for i in range(5)})
+    with pytest.raises(ValueError, match='5 reports'):
+        list(iter_reports(source, str(tmp_path / 'work'), max_zip_files=4))
@@ -0,0 +1,120 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.fakes import FakeGenerativeModel
+from utils.gemini_client import (CapacityTimeoutError, CircuitBreaker, GeminiClient, UpstreamTimeoutError,
+                                 UpstreamUnavailableError)
+
+
+class ServiceUnavailable(Exception):
+    """Named like the google.api_core error, so the client treats it as transient."""
+
+
+class FlakyModel(FakeGenerativeModel):
+    """Fails the first `failures` calls with a transient error, then answers."""
+
+    def __init__(self, failures):
+        super().__init__(first_chunk_delay=0, chunk_delay=0)
+        self.failures = failures
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if len(self.prompts) < self.failures:
+            self.prompts.append(prompt)
+            raise ServiceUnavailable("503 overloaded")
+        return super().generate_content(prompt, stream=stream, **kwargs)
+
+
+class StallingModel(FakeGenerativeModel):
+    """Streams one chunk, then stalls for `stall` seconds before the next."""
+
+    def __init__(self, stall):
+        super().__init__(first_chunk_delay=0, chunk_delay=0)
+        self.stall = stall
+
+    def _stream(self):
+        yield SimpleNamespace(text="The scan ")
+        time.sleep(self.stall)
+        yield SimpleNamespace(text="is normal.")
+
+
+def make_client(model, **options):
+    return GeminiClient(model, **{'rate': 1000, 'burst': 1000, 'backoff_base': 0.01, **options})
+
+
+def test_transient_errors_are_retried():
+    model = FlakyModel(failures=2)
+    client = make_client(model, max_retries=3)
+
+    assert client.generate("prompt").text == model.response_text
+    stats = client.stats()
+    assert len(model.prompts) == 3
+    assert stats['retries'] == 2
+    assert stats['circuit'] == 'closed'
+
+
+def test_retries_give_up_after_max_retries():
+    model = FlakyModel(failures=10)
+    client = make_client(model, max_retries=1)
+
+    with pytest.raises(ServiceUnavailable):
+        client.generate("prompt")
+    assert len(model.prompts) == 2
+
+
+def test_open_breaker_fails_fast_without_calling_the_model():
+    model = FlakyModel(failures=10)
+    client = make_client(model, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailable):
+            client.generate("prompt")
+    with pytest.raises(UpstreamUnavailableError):
+        client.generate("prompt")
+    assert len(model.prompts) == 2
+    assert client.stats()['circuit'] == 'open'
+    assert client.stats()['rejected'] == 1
+
+
+def test_breaker_closes_after_a_successful_trial_call():
+    model = FlakyModel(failures=1)
+    client = make_client(model, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+
+    with pytest.raises(ServiceUnavailable):
+        client.generate("prompt")
+    assert client.stats()['circuit'] == 'open'
+    time.sleep(0.06)
+    assert client.generate("prompt").text == model.response_text
+    assert client.stats()['circuit'] == 'closed'
+
+
+def test_stalled_stream_times_out_after_its_first_chunk():
+    client = make_client(StallingModel(stall=1.0), timeout=0.2, max_retries=0)
+
+    started = time.monotonic()
+    chunks = []
+    with pytest.raises(UpstreamTimeoutError):
+        for chunk in client.stream("prompt"):
+            chunks.append(chunk.text)
+    assert chunks == ["The scan "]
+    assert time.monotonic() - started < 0.6
+
+
+def test_stalled_stream_keeps_its_slot_until_the_read_ends():
+    stalling = StallingModel(stall=0.5)
+    client = make_client(stalling, timeout=0.2, max_in_flight=1, max_retries=0)
+
+    with pytest.raises(UpstreamTimeoutError):
+        list(client.stream("prompt"))
+
+    # The stalled read still occupies the only executor thread: new calls wait
+    # for capacity instead of timing out against the model
+    stalling.stall = 0
+    with pytest.raises(CapacityTimeoutError):
+        client.generate("prompt")
+    assert len(stalling.prompts) == 1
+    assert client.stats()['circuit'] == 'closed'
+
+    time.sleep(0.5)
+    assert client.generate("prompt").text == stalling.response_text
@@ -0,0 +1,30 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from utils.capabilities import probe_ocr
+from utils.ocr import OCREngine, render_page
+
+pytestmark = pytest.mark.skipif(not probe_ocr()['available'], reason="OCR dependencies are not installed")
+
+
+@pytest.fixture
+def engine():
+    probe = probe_ocr()
+    engine = OCREngine(max_workers=1, tesseract_cmd=probe['tesseract_cmd'], tessdata=probe['tessdata'])
+    yield engine
+    engine.shutdown()
+
+
+def test_workers_keep_tesseract_loaded_with_tesserocr(engine):
+    health = engine.health()
+    assert health['healthy']
+    assert health['engine'] == probe_ocr()['engine'] == 'tesserocr'
+
+
+def test_rendered_page_is_recognized(engine):
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_text((72, 100), "No acute intracranial hemorrhage.", fontsize=16)
+    text = engine.ocr_images([render_page(page, zoom=3.0)])[0]
+    assert "intracranial hemorrhage" in text.lower()
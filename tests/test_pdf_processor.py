@@ -0,0 +1,30 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from utils.pdf_processor import page_needs_ocr
+
+
+def scanned_page(document, rect=None):
+    """Adds a page whose only content is an image drawn over rect (the whole page by default)."""
+    page = document.new_page()
+    image = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 40, 40), False)
+    image.clear_with(255)
+    page.insert_image(rect or page.rect, pixmap=image)
+    return page
+
+
+def test_short_page_without_images_keeps_its_text_layer():
+    page = fitz.open().new_page()
+    page.insert_text((72, 72), "Page 2 of 2")
+    assert not page_needs_ocr(page, page.get_text())
+
+
+def test_page_with_a_small_logo_and_little_text_is_not_ocrd():
+    page = scanned_page(fitz.open(), fitz.Rect(20, 20, 60, 60))
+    assert not page_needs_ocr(page, "")
+
+
+def test_image_only_page_is_ocrd():
+    page = scanned_page(fitz.open())
+    assert page_needs_ocr(page, "")
@@ -0,0 +1,139 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+from utils.audio_store import AudioStore
+from utils.fakes import FakeGenerativeModel, FakeSpeechBackend
+from utils.nlp import FINDINGS_MARKER, RadiologyTextSimplifier
+from utils.tts import TextToSpeechConverter
+
+REPORT = "CT CHEST. FINDINGS: 6 mm nodule in the right upper lobe. No effusion. IMPRESSION: Small nodule."
+SIMPLIFIED = "The scan found a small spot in your right lung. There is no fluid around the lungs."
+
+
+class ScriptedModel(FakeGenerativeModel):
+    """Streams the given chunks exactly, and optionally fails after some of them."""
+
+    def __init__(self, chunks, fail_after=None):
+        super().__init__(response_text="".join(chunks), first_chunk_delay=0, chunk_delay=0)
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    def _chunks(self):
+        return list(self.chunks)
+
+    def _stream(self):
+        for index, chunk in enumerate(self.chunks):
+            if index == self.fail_after:
+                raise ValueError("upstream failed mid-stream")
+            yield SimpleNamespace(text=chunk)
+
+
+def make_simplifier(model):
+    return RadiologyTextSimplifier(api_key='', model=model, client_options={'rate': 1000, 'burst': 1000})
+
+
+def stream_events(simplifier, **kwargs):
+    return list(simplifier.stream_simplify_text(REPORT, **kwargs))
+
+
+def test_stream_without_findings_forwards_every_chunk():
+    model = FakeGenerativeModel(response_text=SIMPLIFIED, chunk_words=3, first_chunk_delay=0, chunk_delay=0)
+    events = stream_events(make_simplifier(model))
+
+    chunks = [event['chunk'] for event in events if 'chunk' in event]
+    assert len(chunks) > 1
+    assert "".join(chunks) == SIMPLIFIED
+    assert events[-1]['result']['simplified_text'] == SIMPLIFIED
+
+
+@pytest.mark.parametrize('chunks', [
+    [SIMPLIFIED, f"\n{FINDINGS_MARKER}\n- Small spot in the right lung"],
+    # The marker arrives split across chunks
+    [SIMPLIFIED + "\n### KEY FIN", "DINGS ###\n- Small spot in the right lung"],
+    [SIMPLIFIED + "\n#", "## KEY FINDINGS #", "##\n- Small spot", " in the right lung"],
+])
+def test_findings_marker_is_never_streamed(chunks):
+    events = stream_events(make_simplifier(ScriptedModel(chunks)), include_findings=True)
+
+    streamed = "".join(event['chunk'] for event in events if 'chunk' in event)
+    assert streamed == SIMPLIFIED
+    result = events[-1]['result']
+    assert result['success']
+    assert result['simplified_text'] == SIMPLIFIED
+    assert result['key_findings'] == ["Small spot in the right lung"]
+
+
+def test_text_resembling_the_marker_is_streamed():
+    text = "Results: ### KEY points are below."
+    events = stream_events(make_simplifier(ScriptedModel(["Results: ### KEY", " points are below."])),
+                           include_findings=True)
+
+    assert "".join(event['chunk'] for event in events if 'chunk' in event) == text
+    assert events[-1]['result']['key_findings'] == []
+
+
+def test_upstream_failure_mid_stream_yields_failed_result():
+    events = stream_events(make_simplifier(ScriptedModel(["The scan ", "found ", "a spot."], fail_after=2)))
+
+    assert [event['chunk'] for event in events if 'chunk' in event] == ["The scan ", "found "]
+    result = events[-1]['result']
+    assert not result['success']
+    assert "mid-stream" in result['error']
+
+
+@pytest.fixture
+def client(tmp_path):
+    """A test client whose simplifier and speech service are replaced per test."""
+    def use(model, speech=True):
+        app_module.services.register('simplifier', lambda: make_simplifier(model))
+        app_module.services.register('tts', lambda: TextToSpeechConverter(
+            output_dir=str(tmp_path), store=AudioStore(str(tmp_path), max_bytes=None, max_age=None),
+            backend=FakeSpeechBackend(delay=0)) if speech else None)
+        return app_module.app.test_client()
+
+    yield use
+    app_module.services.shutdown()
+    app_module.services.register('simplifier', app_module.create_simplifier)
+    app_module.services.register('tts', app_module.create_tts, shutdown=lambda tts: tts.backend.close())
+
+
+def read_sse(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_simplify_stream_event_sequence(client):
+    chunks = [SIMPLIFIED[:30], SIMPLIFIED[30:], f"\n{FINDINGS_MARKER}\n- Small spot in the right lung"]
+    response = client(ScriptedModel(chunks)).post('/simplify/stream', data={'text': REPORT})
+
+    assert response.mimetype == 'text/event-stream'
+    events = read_sse(response)
+    names = [name for name, _ in events]
+    assert events[0] == ('stage', {'stage': 'simplify'})
+    assert names[-1] == 'done'
+    assert 'error' not in names
+    assert 'audio_segment' in names
+    # The speech stage is announced once the text is complete
+    assert names.index('stage', 1) > max(index for index, name in enumerate(names) if name == 'chunk')
+
+    done = events[-1][1]
+    assert "".join(data['text'] for name, data in events if name == 'chunk') == SIMPLIFIED
+    assert done['simplified_text'] == SIMPLIFIED
+    assert done['key_findings'] == ["Small spot in the right lung"]
+    assert done['audio_segments']
+
+
+def test_simplify_stream_reports_upstream_failure(client):
+    # The first chunk is longer than the marker, so part of it is streamed before the failure
+    model = ScriptedModel([SIMPLIFIED, " More text."], fail_after=1)
+    events = read_sse(client(model).post('/simplify/stream', data={'text': REPORT}))
+
+    names = [name for name, _ in events]
+    assert names == ['stage', 'chunk', 'error']
+    assert "mid-stream" in events[-1][1]['error']
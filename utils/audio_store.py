@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+
+def audio_key(**params: Any) -> str:
+    """
+    Derive a content address for a piece of synthesized audio.
+
+    Args:
+        **params: Everything that affects the audio (text, language, speed, engine)
+
+    Returns:
+        A hex digest usable as a filename stem
+    """
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class AudioStore:
+    """
+    Content-addressed audio file storage with size- and age-bounded eviction.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 max_bytes: Optional[int] = 500 * 1024 * 1024,
+                 max_age: Optional[float] = 7 * 24 * 3600):
+        """
+        Initialize the AudioStore.
+
+        Args:
+            directory: Directory holding the audio files
+            max_bytes: Total size the directory is swept down to, or None for no limit
+            max_age: Seconds since last use after which a file is evicted, or None
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._stats = {"hits": 0, "misses": 0, "evicted_files": 0, "evicted_bytes": 0}
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def get_or_create(self, filename: str, writer: Callable[[str], None]) -> bool:
+        """
+        Return an existing file or create it with writer, synthesizing each
+        filename at most once even under concurrent requests.
+
+        Args:
+            filename: Content-addressed filename
+            writer: Called with a temporary path to write the audio to
+
+        Returns:
+            True if the file already existed (a cache hit)
+        """
+        filepath = self.path(filename)
+        while True:
+            with self._lock:
+                if os.path.exists(filepath):
+                    self._stats["hits"] += 1
+                    break
+                pending = self._in_flight.get(filename)
+                if pending is None:
+                    self._in_flight[filename] = threading.Event()
+                    self._stats["misses"] += 1
+            if pending is not None:
+                # Another request is synthesizing the same audio; wait and re-check
+                pending.wait()
+                continue
+            try:
+                tmp_path = self.path(f".{uuid.uuid4().hex}.tmp")
+                try:
+                    writer(tmp_path)
+                    os.replace(tmp_path, filepath)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            finally:
+                with self._lock:
+                    self._in_flight.pop(filename).set()
+            return False
+
+        # Refresh the modification time so eviction treats the file as recently used
+        try:
+            os.utime(filepath)
+        except OSError:
+            pass
+        return True
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        Evict files older than max_age, then the least recently used files
+        until the directory is under max_bytes.
+
+        Returns:
+            Counts of files and bytes removed by this sweep
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        removed_files = removed_bytes = 0
+        for mtime, size, filepath in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            over_quota = self.max_bytes is not None and total > self.max_bytes
+            if not expired and not over_quota:
+                break
+            try:
+                os.remove(filepath)
+            except OSError:
+                continue
+            total -= size
+            removed_files += 1
+            removed_bytes += size
+
+        with self._lock:
+            self._stats["evicted_files"] += removed_files
+            self._stats["evicted_bytes"] += removed_bytes
+        return {"files": removed_files, "bytes": removed_bytes}
+
+    def start_sweeper(self, interval: float = 600) -> None:
+        """
+        Run sweep() periodically on a daemon thread.
+
+        Args:
+            interval: Seconds between sweeps
+        """
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Audio cache sweep failed: {e}")
+
+        self._sweeper = threading.Thread(target=run, name="audio-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,288 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, Iterator, Optional
+
+REPORT_EXTENSIONS = {'txt', 'pdf', 'doc', 'docx'}
+# Default caps on what an archive may unpack to, checked before extracting
+ZIP_MAX_BYTES = 200 * 1024 * 1024
+ZIP_MAX_FILES = 5000
+
+
+class Report:
+    """
+    One report in a batch: either inline text or a file to extract, or an
+    error if the report could not be read from the source.
+    """
+
+    def __init__(self, report_id: str, text: Optional[str] = None, file_path: Optional[str] = None,
+                 error: Optional[str] = None, line: Optional[int] = None):
+        self.id = report_id
+        self.text = text
+        self.file_path = file_path
+        self.error = error
+        self.line = line
+
+
+def _is_report(filename: str) -> bool:
+    return filename.rsplit('.', 1)[-1].lower() in REPORT_EXTENSIONS
+
+
+def _iter_directory(directory: str, root: Optional[str] = None) -> Iterator[Report]:
+    root = root or directory
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if _is_report(filename):
+                file_path = os.path.join(dirpath, filename)
+                yield Report(os.path.relpath(file_path, root).replace(os.sep, '/'), file_path=file_path)
+
+
+def _iter_jsonl(path: str) -> Iterator[Report]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = None
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict) or not isinstance(record.get('text'), str):
+                    raise ValueError('missing "text" field')
+            except ValueError as e:
+                # One bad line fails its own report, not the batch
+                report_id = record.get('id', line_number) if isinstance(record, dict) else line_number
+                yield Report(str(report_id), error=f"Line {line_number}: {e}", line=line_number)
+                continue
+            yield Report(str(record.get('id', line_number)), text=record['text'], line=line_number)
+
+
+def _unpack_reports(source: str, unpack_dir: str, max_bytes: int, max_files: int) -> None:
+    """
+    Extract the report files of an archive, skipping everything else, after
+    checking their count and uncompressed size against the caps.
+    """
+    with zipfile.ZipFile(source) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir() and _is_report(info.filename)]
+        if len(members) > max_files:
+            raise ValueError(f"Archive has {len(members)} reports; the limit is {max_files}")
+        total = sum(info.file_size for info in members)
+        if total > max_bytes:
+            raise ValueError(f"Archive unpacks to {total} bytes; the limit is {max_bytes}")
+        # zipfile stops each member at its declared size and strips absolute and ".." paths
+        for info in members:
+            archive.extract(info, unpack_dir)
+
+
+def iter_reports(source: str, work_dir: str, max_zip_bytes: int = ZIP_MAX_BYTES,
+                 max_zip_files: int = ZIP_MAX_FILES) -> Iterator[Report]:
+    """
+    Enumerate the reports in a directory, a zip archive or a JSONL file.
+
+    JSONL lines need a "text" field and may carry an "id"; a line that is
+    not valid JSON or lacks "text" yields a report carrying the error.
+    Files in a directory or archive are identified by their relative path.
+    Only report files are unpacked from an archive, and an archive with more
+    of them than max_zip_files, or unpacking to more than max_zip_bytes, is
+    rejected with ValueError before anything is extracted.
+
+    Args:
+        source: Path to the directory, .zip or .jsonl file
+        work_dir: Scratch directory used to unpack archives
+        max_zip_bytes: Largest total uncompressed size of an archive's reports
+        max_zip_files: Most reports an archive may contain
+
+    Yields:
+        Reports in a stable order
+    """
+    if os.path.isdir(source):
+        yield from _iter_directory(source)
+    elif source.lower().endswith('.zip'):
+        unpack_dir = os.path.join(work_dir, 'unpacked')
+        _unpack_reports(source, unpack_dir, max_zip_bytes, max_zip_files)
+        yield from _iter_directory(unpack_dir)
+    elif source.lower().endswith(('.jsonl', '.ndjson')):
+        yield from _iter_jsonl(source)
+    else:
+        raise ValueError(f"Unsupported batch source: {source}")
+
+
+class BatchProcessor:
+    """
+    Runs extraction, simplification and speech over many reports as a
+    concurrent pipeline, with a separate concurrency limit per stage.
+
+    Results are appended to results.jsonl in the output directory as each
+    report finishes. That file doubles as the checkpoint: reports already
+    recorded as successful are skipped when a run is resumed.
+    """
+
+    def __init__(self,
+                 extract: Callable[[str], str],
+                 simplifier,
+                 tts=None,
+                 options: Optional[Dict[str, Any]] = None,
+                 extract_workers: int = 2,
+                 simplify_workers: int = 4,
+                 speech_workers: int = 4,
+                 zip_max_bytes: int = ZIP_MAX_BYTES,
+                 zip_max_files: int = ZIP_MAX_FILES):
+        """
+        Initialize the BatchProcessor.
+
+        Args:
+            extract: Function returning the text of a report file
+            simplifier: A RadiologyTextSimplifier
+            tts: Optional TextToSpeechConverter; speech is skipped if None
+            options: target_audience, grade_level, language and language_code
+            extract_workers: Reports extracted concurrently
+            simplify_workers: Reports simplified concurrently
+            speech_workers: Reports synthesized concurrently
+            zip_max_bytes: Largest total uncompressed size of the reports in a zip source
+            zip_max_files: Most reports a zip source may contain
+        """
+        self.extract = extract
+        self.simplifier = simplifier
+        self.tts = tts
+        self.options = {
+            'target_audience': 'general',
+            'grade_level': 6,
+            'language': 'English',
+            'language_code': 'en',
+            **(options or {})
+        }
+        self.limits = {
+            'extract': threading.BoundedSemaphore(extract_workers),
+            'simplify': threading.BoundedSemaphore(simplify_workers),
+            'speech': threading.BoundedSemaphore(speech_workers)
+        }
+        self.zip_max_bytes = zip_max_bytes
+        self.zip_max_files = zip_max_files
+        # Enough report threads to keep every stage saturated at once
+        self.max_in_flight = extract_workers + simplify_workers + speech_workers
+
+    @staticmethod
+    def load_checkpoint(results_path: str) -> set:
+        """
+        Return the ids of reports already processed successfully.
+        """
+        done = set()
+        if not os.path.exists(results_path):
+            return done
+        with open(results_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash; the report will be redone
+                    continue
+                if record.get('success'):
+                    done.add(record['id'])
+        return done
+
+    def _process(self, report: Report) -> Dict[str, Any]:
+        if report.error:
+            raise ValueError(report.error)
+        record: Dict[str, Any] = {'id': report.id, 'timings': {}}
+        text = report.text
+        if report.file_path:
+            with self.limits['extract']:
+                started = time.perf_counter()
+                text = self.extract(report.file_path)
+                record['timings']['extract'] = round(time.perf_counter() - started, 3)
+        if not text or len(text.strip()) < 10:
+            raise ValueError('Text is too short or missing')
+
+        with self.limits['simplify']:
+            started = time.perf_counter()
+            result = self.simplifier.simplify_text(
+                text=text,
+                target_audience=self.options['target_audience'],
+                grade_level=self.options['grade_level'],
+                language=self.options['language']
+            )
+            record['timings']['simplify'] = round(time.perf_counter() - started, 3)
+        if not result.get('success'):
+            raise RuntimeError(result.get('error') or 'Simplification failed')
+        record['simplified_text'] = result['simplified_text']
+        record['cached'] = result.get('cached', False)
+
+        if self.tts is not None:
+            with self.limits['speech']:
+                started = time.perf_counter()
+                speech = self.tts.convert_to_speech(result['simplified_text'], self.options['language_code'])
+                record['timings']['speech'] = round(time.perf_counter() - started, 3)
+            if not speech.get('success'):
+                raise RuntimeError(speech.get('error') or 'Speech synthesis failed')
+            record['audio_file'] = speech['filepath']
+
+        record['success'] = True
+        return record
+
+    def run(self,
+            source: str,
+            output_dir: str,
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Process every report in source, resuming from output_dir if it
+        already holds results from an earlier run.
+
+        Args:
+            source: Directory, .zip or .jsonl of reports
+            output_dir: Where results.jsonl (and audio, via the TTS store) go
+            on_progress: Called with a summary after each report
+
+        Returns:
+            Summary counts and the path of the results file
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        results_path = os.path.join(output_dir, 'results.jsonl')
+        done = self.load_checkpoint(results_path)
+        summary = {'processed': 0, 'failed': 0, 'skipped': 0, 'results_path': results_path}
+        write_lock = threading.Lock()
+        started = time.perf_counter()
+        work_dir = tempfile.mkdtemp(prefix='batch_')
+
+        def finish(record: Dict[str, Any]) -> None:
+            with write_lock:
+                with open(results_path, 'a', encoding='utf-8') as out:
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    out.flush()
+                    os.fsync(out.fileno())
+                summary['processed' if record.get('success') else 'failed'] += 1
+                summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+                snapshot = dict(summary)
+            if on_progress:
+                on_progress(snapshot)
+
+        def process(report: Report) -> None:
+            try:
+                record = self._process(report)
+            except Exception as e:
+                record = {'id': report.id, 'success': False, 'error': str(e)}
+                if report.line is not None:
+                    record['line'] = report.line
+            finish(record)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='batch') as executor:
+                pending = set()
+                for report in iter_reports(source, work_dir, self.zip_max_bytes, self.zip_max_files):
+                    if report.id in done:
+                        summary['skipped'] += 1
+                        continue
+                    # Keep a bounded window so huge batches are not all queued in memory
+                    if len(pending) >= self.max_in_flight * 2:
+                        _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.add(executor.submit(process, report))
+                wait(pending)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        return summary
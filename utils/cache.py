@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+def normalize_report_text(text: str) -> str:
+    """
+    Normalize report text so trivially different copies share a cache key.
+
+    Args:
+        text: The raw report text
+
+    Returns:
+        The text with line endings unified and runs of whitespace collapsed
+    """
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(' '.join(line.split()) for line in lines).strip()
+
+
+def make_cache_key(text: str, **params: Any) -> str:
+    """
+    Build a content-addressed cache key from report text and prompt parameters.
+
+    Args:
+        text: The report text (normalized before hashing)
+        **params: Prompt parameters and model name that affect the output
+
+    Returns:
+        A hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {"text": normalize_report_text(text), "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Base interface for simplification result caches.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(ResultCache):
+    """
+    Thread-safe in-memory LRU cache with size and TTL eviction.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 3600):
+        """
+        Initialize the MemoryCache.
+
+        Args:
+            max_entries: Maximum number of entries kept before evicting the least recently used
+            ttl: Seconds an entry stays valid, or None to never expire
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(ResultCache):
+    """
+    On-disk cache backed by SQLite that survives process restarts.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = 7 * 24 * 3600):
+        """
+        Initialize the SQLiteCache.
+
+        Args:
+            path: Path to the SQLite database file
+            ttl: Seconds an entry stays valid, or None to never expire
+        """
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+
+class TieredCache(ResultCache):
+    """
+    Two-tier cache: an in-memory LRU in front of an optional disk tier,
+    with hit/miss counters.
+    """
+
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[ResultCache] = None):
+        """
+        Initialize the TieredCache.
+
+        Args:
+            memory: The in-memory tier (a default MemoryCache if omitted)
+            disk: An optional persistent tier consulted on memory misses
+        """
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "miss_seconds": 0.0,
+        }
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def record_miss_latency(self, seconds: float) -> None:
+        """
+        Record how long an uncached call took, to estimate savings from hits.
+
+        Args:
+            seconds: Wall time of the upstream call that filled a miss
+        """
+        with self._lock:
+            self._stats["miss_seconds"] += seconds
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hit/miss counters and estimated upstream time saved.
+
+        Returns:
+            A dictionary of cache statistics
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        avg_miss = stats["miss_seconds"] / stats["misses"] if stats["misses"] else 0.0
+        stats.update({
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "avg_miss_seconds": avg_miss,
+            "estimated_seconds_saved": hits * avg_miss,
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None,
+        })
+        return stats
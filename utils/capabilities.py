@@ -0,0 +1,119 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Common Windows install locations, tried when tesseract is not on PATH
+WINDOWS_TESSERACT_PATHS = [
+    r'D:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+]
+
+# Language the OCR engine loads (OCREngine's default)
+OCR_LANG = 'eng'
+
+_ocr_probe: Optional[Dict[str, Any]] = None
+_ocr_probe_lock = threading.Lock()
+
+
+def find_tesseract() -> Optional[str]:
+    """
+    Locate the tesseract binary: TESSERACT_CMD, then PATH, then the usual
+    Windows install directories.
+    """
+    configured = os.environ.get('TESSERACT_CMD')
+    if configured:
+        return configured if os.path.exists(configured) or shutil.which(configured) else None
+    found = shutil.which('tesseract')
+    if found:
+        return found
+    for path in WINDOWS_TESSERACT_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def find_tessdata(lang: str = OCR_LANG) -> Optional[str]:
+    """
+    Locate a directory holding <lang>.traineddata for tesserocr:
+    TESSDATA_PREFIX, then <prefix>/share/tessdata (where the tessdata.eng
+    package installs it), then the data directory tesserocr was built with.
+    """
+    configured = os.environ.get('TESSDATA_PREFIX')
+    candidates = [configured] if configured else []
+    candidates.append(os.path.join(sys.prefix, 'share', 'tessdata'))
+    for directory in candidates:
+        if os.path.exists(os.path.join(directory, f'{lang}.traineddata')):
+            return directory
+    try:
+        import tesserocr
+
+        directory, languages = tesserocr.get_languages()
+    except (ImportError, RuntimeError):
+        return None
+    return directory if lang in languages else None
+
+
+def _tesseract_version(cmd: str) -> Optional[str]:
+    output = subprocess.run([cmd, '--version'], capture_output=True, text=True, timeout=10)
+    lines = (output.stdout or output.stderr).strip().splitlines()
+    return lines[0] if lines else None
+
+
+def probe_ocr() -> Dict[str, Any]:
+    """
+    Check once per process whether OCR can run, without importing PyMuPDF
+    or pytesseract; later calls return the cached answer.
+
+    OCR runs on tesserocr (Tesseract loaded once in each worker process)
+    when it and the language data are installed, otherwise on pytesseract
+    and the tesseract binary, which starts a process per page.
+
+    Returns:
+        available, engine ("tesserocr", "pytesseract" or None),
+        missing_dependencies, tessdata, tesseract_cmd, tesseract_version
+        and how long the probe took
+    """
+    global _ocr_probe
+    with _ocr_probe_lock:
+        if _ocr_probe is None:
+            started = time.perf_counter()
+            missing = [package for package, module in (("PyMuPDF", "fitz"), ("pillow", "PIL"))
+                       if importlib.util.find_spec(module) is None]
+            engine = tessdata = cmd = version = None
+            if importlib.util.find_spec("tesserocr") is not None:
+                tessdata = find_tessdata()
+                if tessdata:
+                    import tesserocr
+
+                    engine = "tesserocr"
+                    version = tesserocr.tesseract_version().splitlines()[0]
+            cmd = find_tesseract()
+            if cmd:
+                try:
+                    cmd_version = _tesseract_version(cmd)
+                except (OSError, subprocess.SubprocessError):
+                    cmd = None
+                else:
+                    if engine is None and importlib.util.find_spec("pytesseract") is not None:
+                        engine, version = "pytesseract", cmd_version
+            if engine is None:
+                if importlib.util.find_spec("tesserocr") is None:
+                    missing.append("tesserocr")
+                else:
+                    missing.append(f"{OCR_LANG}.traineddata")
+            _ocr_probe = {
+                "available": not missing,
+                "engine": engine if not missing else None,
+                "missing_dependencies": missing,
+                "tessdata": tessdata,
+                "tesseract_cmd": cmd,
+                "tesseract_version": version,
+                "probe_seconds": round(time.perf_counter() - started, 3)
+            }
+        return _ocr_probe
@@ -0,0 +1,297 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from utils.scan_preprocess import preprocess_batch, preprocess_image
+
+IMG_SIZE = (224, 224)
+CLASS_NAMES = ['Abdomen Ultrasound', 'Brain MRI', 'Breast Ultrasound']
+DEFAULT_MODEL_PATH = os.path.join('Tumour Classification', 'models', 'scan_type_classifier_aspect_safe.keras')
+
+
+def use_cpu_only() -> None:
+    """
+    Hide GPUs from TensorFlow. Must run before TensorFlow is first imported
+    to take full effect.
+    """
+    os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+
+class KerasEngine:
+    """
+    Runs the original Keras model.
+    """
+    name = "keras"
+
+    def __init__(self, model_path: str):
+        import tensorflow as tf
+
+        tf.config.set_visible_devices([], 'GPU')
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch):
+        import numpy as np
+
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteEngine:
+    """
+    Runs a TFLite export of the model, a much lighter CPU runtime than
+    Keras for small batches.
+    """
+    name = "tflite"
+
+    def __init__(self, model_path: str, threads: Optional[int] = None):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+
+                Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=threads or os.cpu_count())
+        self._input = self.interpreter.get_input_details()[0]['index']
+        self._output = self.interpreter.get_output_details()[0]['index']
+        self._batch_size = None
+
+    def predict(self, batch):
+        if len(batch) != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input, list(batch.shape))
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(batch)
+        self.interpreter.set_tensor(self._input, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output).copy()
+
+
+class ONNXEngine:
+    """
+    Runs an ONNX export of the model with onnxruntime on the CPU.
+    """
+    name = "onnx"
+
+    def __init__(self, model_path: str):
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self._input = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self._input: batch})[0]
+
+
+def load_engine(model_path: str):
+    """
+    Pick the inference runtime from the model file: .tflite, .onnx, or a
+    Keras .keras/.h5 model.
+    """
+    extension = model_path.rsplit('.', 1)[-1].lower()
+    if extension == 'tflite':
+        return TFLiteEngine(model_path)
+    if extension == 'onnx':
+        return ONNXEngine(model_path)
+    return KerasEngine(model_path)
+
+
+def export_tflite(model_path: str, output_path: str) -> str:
+    """
+    Convert the Keras model to TFLite for use with TFLiteEngine.
+    """
+    use_cpu_only()
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(model_path))
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+
+class _Request:
+    __slots__ = ('array', 'future', 'enqueued')
+
+    def __init__(self, array, future: Future):
+        self.array = array
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class ScanClassifier:
+    """
+    Scan-type classifier service: loads the model once, preprocesses
+    images on a thread pool and gathers concurrent requests into batched
+    predictions, waiting at most max_latency for a batch to fill.
+    """
+
+    def __init__(self,
+                 model_path: str = DEFAULT_MODEL_PATH,
+                 class_names: Sequence[str] = CLASS_NAMES,
+                 max_batch: int = 16,
+                 max_latency: float = 0.01,
+                 preprocess_workers: int = 4):
+        """
+        Initialize the ScanClassifier.
+
+        Args:
+            model_path: Path to the .keras/.h5 model, or a .tflite/.onnx export
+            class_names: Labels in the model's output order
+            max_batch: Largest batch sent to the model
+            max_latency: Seconds the first request of a batch may wait for more
+            preprocess_workers: Threads decoding and resizing images
+        """
+        self.model_path = model_path
+        self.class_names = list(class_names)
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.engine = None
+        self._predict_lock = threading.Lock()
+        self._batch_buffer = None
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._preprocess = ThreadPoolExecutor(max_workers=preprocess_workers, thread_name_prefix='classify-prep')
+        self._batcher: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {'images': 0, 'batches': 0, 'predict_seconds': 0.0, 'failures': 0}
+        self._started = None
+
+    def load(self) -> 'ScanClassifier':
+        """
+        Load the model on the CPU, run a warm-up prediction so the first
+        request does not pay for graph tracing, and start the batcher.
+        """
+        use_cpu_only()
+        import numpy as np
+
+        self.engine = load_engine(self.model_path)
+        # Batches are assembled in this buffer instead of a fresh np.stack each time
+        self._batch_buffer = np.zeros((self.max_batch, IMG_SIZE[0], IMG_SIZE[1], 3), dtype=np.float32)
+        self._predict(self._batch_buffer[:1])
+        self._started = time.perf_counter()
+        self._batcher = threading.Thread(target=self._run_batches, name='classify-batcher', daemon=True)
+        self._batcher.start()
+        return self
+
+    def _predict(self, batch):
+        # Runtimes such as TFLite are not safe to call from several threads
+        with self._predict_lock:
+            return self.engine.predict(batch)
+
+    def _enqueue(self, prep: Future, result: Future) -> None:
+        try:
+            self._queue.put(_Request(prep.result(), result))
+        except Exception as e:
+            result.set_exception(e)
+
+    def submit(self, image: Union[str, bytes]) -> Future:
+        """
+        Queue one image (a path or encoded bytes) for classification.
+
+        Returns:
+            A future resolving to {"label", "confidence", "scores"}
+        """
+        if self._batcher is None:
+            raise RuntimeError("Classifier is not loaded")
+        result: Future = Future()
+        prep = self._preprocess.submit(preprocess_image, image, IMG_SIZE)
+        prep.add_done_callback(lambda done: self._enqueue(done, result))
+        return result
+
+    def classify(self, image: Union[str, bytes], timeout: Optional[float] = 30.0) -> Dict[str, Any]:
+        return self.submit(image).result(timeout=timeout)
+
+    def classify_batch(self, images: Sequence[Union[str, bytes]]) -> List[Dict[str, Any]]:
+        """
+        Classify many images in bulk, decoding them in parallel straight
+        into one preallocated batch buffer per max_batch images.
+        """
+        import numpy as np
+
+        if self.engine is None:
+            raise RuntimeError("Classifier is not loaded")
+        buffer = np.empty((min(self.max_batch, len(images)), IMG_SIZE[0], IMG_SIZE[1], 3), dtype=np.float32)
+        results = []
+        for start in range(0, len(images), self.max_batch):
+            chunk = images[start:start + self.max_batch]
+            batch = preprocess_batch(chunk, IMG_SIZE, out=buffer, executor=self._preprocess)
+            results.extend(self._scored(batch))
+        return results
+
+    def _scored(self, batch) -> List[Dict[str, Any]]:
+        import numpy as np
+
+        started = time.perf_counter()
+        try:
+            scores = self._predict(batch)
+        except Exception:
+            with self._stats_lock:
+                self._stats['failures'] += len(batch)
+            raise
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats['images'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['predict_seconds'] += elapsed
+        results = []
+        for row in np.asarray(scores):
+            index = int(np.argmax(row))
+            results.append({
+                'label': self.class_names[index],
+                'confidence': float(row[index]),
+                'scores': {name: float(score) for name, score in zip(self.class_names, row)}
+            })
+        return results
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        deadline = first.enqueued + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run_batches(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            requests = self._collect(first)
+            batch = self._batch_buffer[:len(requests)]
+            for index, request in enumerate(requests):
+                batch[index] = request.array
+            try:
+                results = self._scored(batch)
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+            for request, result in zip(requests, results):
+                request.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        images = stats['images']
+        stats['avg_batch_size'] = round(images / stats['batches'], 2) if stats['batches'] else 0.0
+        # Model throughput, and end-to-end throughput since the service started
+        stats['images_per_second'] = round(images / stats['predict_seconds'], 1) if stats['predict_seconds'] else 0.0
+        uptime = time.perf_counter() - self._started if self._started else 0.0
+        stats['served_images_per_second'] = round(images / uptime, 2) if uptime else 0.0
+        stats['predict_seconds'] = round(stats['predict_seconds'], 3)
+        stats['engine'] = self.engine.name if self.engine else None
+        return stats
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._preprocess.shutdown(wait=False)
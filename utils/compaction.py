@@ -0,0 +1,204 @@
+import math
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+from utils.segmenter import SECTION_HEADING
+
+# Separates pages in extracted PDF text
+PAGE_BREAK = "\n\f\n"
+# "--- Page 2 ---" markers added by the OCR-only extraction path
+PAGE_MARKER = re.compile(r'^[ \t]*-{2,}[ \t]*page[ \t]+\d+(?:[ \t]+of[ \t]+\d+)?[ \t]*-{2,}[ \t]*$',
+                         re.IGNORECASE | re.MULTILINE)
+# A word broken across lines, "abdo-\nmen"; capitalized continuations such as "L4-\nL5" are left alone
+HYPHEN_BREAK = re.compile(r'([^\W\d_])-\n([a-z])')
+WORD_LIKE = re.compile(r'[^\W\d_]{2}|\d')
+
+# Headers and footers are looked for among this many lines at each end of a page
+EDGE_LINES = 6
+# ...and must recur on at least this many pages, and on most pages of longer documents
+MIN_PAGES = 3
+# Line similarity (numbers masked) at which two OCR'd lines count as the same header or footer
+SIMILARITY = 0.95
+# Lines with these words are report content, never a header or footer
+CLINICAL_WORDS = re.compile(
+    r'\b(?:left|right|bilateral|unilateral|upper|lower|anterior|posterior|medial|lateral|proximal|distal'
+    r'|no|not|without|normal|abnormal|mild|moderate|severe|small|large|acute|chronic|new|stable'
+    r'|effusion|pneumothorax|nodule|nodules|mass|lesion|lesions|fracture|opacity|consolidation'
+    r'|atelectasis|edema|hemorrhage|stenosis|cyst|tumou?r|thrombus|aneurysm|infarct|fluid)\b',
+    re.IGNORECASE
+)
+# Rough characters per model token, for reporting savings
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate model tokens for text, without calling the model's tokenizer."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _line_key(line: str) -> str:
+    return ' '.join(re.sub(r'[^\w]+', ' ', line.lower()).split())
+
+
+def _masked(key: str) -> str:
+    # Page numbers and dates vary between copies of a header
+    return re.sub(r'\b\d+\b', '#', key)
+
+
+def _same_numbers(a: str, b: str) -> bool:
+    # Copies of a header differ in at most the page number, while lines
+    # differing in more numbers (accessions, dates) are report content
+    # (standalone numbers only, not OCR'd letters like "H0SPITAL")
+    numbers_a, numbers_b = re.findall(r'\b\d+\b', a), re.findall(r'\b\d+\b', b)
+    if len(numbers_a) != len(numbers_b):
+        return False
+    return sum(x != y for x, y in zip(numbers_a, numbers_b)) <= 1
+
+
+def is_garbage_line(line: str) -> bool:
+    """
+    Whether a line looks like OCR noise (specks, rules, scanner edges)
+    rather than text: mostly symbols, or no word or number at all.
+    """
+    chars = line.replace(' ', '')
+    if not chars:
+        return False
+    if sum(c.isalnum() for c in chars) / len(chars) < 0.5:
+        return True
+    return not WORD_LIKE.search(line)
+
+
+def split_pages(text: str) -> List[str]:
+    """Split extracted text at form feeds and "--- Page N ---" markers."""
+    return re.split(r'\f|' + PAGE_MARKER.pattern, text, flags=PAGE_MARKER.flags)
+
+
+class _Cluster:
+    __slots__ = ('key', 'members')
+
+    def __init__(self, key: str):
+        self.key = key
+        self.members: List[tuple] = []
+
+
+def _find_cluster(clusters: List[_Cluster], exact: Dict[str, _Cluster], key: str) -> Optional[_Cluster]:
+    if key in exact:
+        return exact[key]
+    if len(key) < 4:
+        return None
+    masked = _masked(key)
+    for cluster in clusters:
+        matcher = SequenceMatcher(None, masked, _masked(cluster.key), autojunk=False)
+        if (matcher.real_quick_ratio() >= SIMILARITY and matcher.quick_ratio() >= SIMILARITY
+                and matcher.ratio() >= SIMILARITY and _same_numbers(key, cluster.key)):
+            return cluster
+    return None
+
+
+def repeated_lines(pages: List[List[Optional[str]]]) -> List[tuple]:
+    """
+    Find headers and footers: lines near the top or bottom of a page that
+    recur, allowing for small OCR differences, on at least MIN_PAGES pages
+    and on most pages. Lines that look like findings are never candidates.
+
+    Args:
+        pages: The lines of each page
+
+    Returns:
+        (page, line) positions of every copy except the first
+    """
+    needed = max(MIN_PAGES, len(pages) // 2 + 1)
+    if len(pages) < needed:
+        return []
+
+    clusters: List[_Cluster] = []
+    exact: Dict[str, _Cluster] = {}
+    for page_index, lines in enumerate(pages):
+        filled = [index for index, line in enumerate(lines) if line]
+        edges = filled[:EDGE_LINES] + filled[EDGE_LINES:][-EDGE_LINES:]
+        for line_index in edges:
+            line = lines[line_index]
+            heading = SECTION_HEADING.match(line)
+            # A bare section heading recurs legitimately when a PDF holds several reports
+            if heading and not heading.group(2).strip():
+                continue
+            # "Mild left pleural effusion" must never pass for a copy of a similar finding
+            if CLINICAL_WORDS.search(line):
+                continue
+            key = _line_key(line)
+            if not key:
+                continue
+            cluster = _find_cluster(clusters, exact, key)
+            if cluster is None:
+                cluster = _Cluster(key)
+                clusters.append(cluster)
+            exact.setdefault(key, cluster)
+            cluster.members.append((page_index, line_index))
+
+    positions = []
+    for cluster in clusters:
+        if len({page for page, _ in cluster.members}) >= needed:
+            positions.extend(cluster.members[1:])
+    return positions
+
+
+def compact_text(text: str) -> Dict[str, Any]:
+    """
+    Shrink extracted report text before it is sent to the model: drop page
+    markers, headers and footers repeated on every page (letterhead,
+    patient banners, page numbers) and OCR garbage lines, rejoin words
+    hyphenated across lines and collapse whitespace. The first copy of a
+    repeated line is kept.
+
+    Args:
+        text: Extracted report text, pages separated by PAGE_BREAK or
+            "--- Page N ---" markers
+
+    Returns:
+        A dictionary with the compacted "text" and what was removed,
+        including estimated tokens before and after
+    """
+    normalized = text.replace('\r\n', '\n').replace('\r', '\n')
+    page_markers = len(PAGE_MARKER.findall(normalized))
+    pages = [
+        [' '.join(line.split()) for line in page.split('\n')]
+        for page in split_pages(normalized)
+    ]
+
+    garbage = 0
+    for lines in pages:
+        for index, line in enumerate(lines):
+            if is_garbage_line(line):
+                lines[index] = None
+                garbage += 1
+
+    repeated = repeated_lines(pages) if len(pages) > 1 else []
+    for page_index, line_index in repeated:
+        pages[page_index][line_index] = None
+
+    page_texts = []
+    hyphenations = 0
+    for lines in pages:
+        # Removed lines are dropped, not left as paragraph breaks
+        page_text = '\n'.join(line for line in lines if line is not None)
+        page_text, joined = HYPHEN_BREAK.subn(r'\1\2', page_text)
+        hyphenations += joined
+        page_text = re.sub(r'\n{3,}', '\n\n', page_text).strip()
+        if page_text:
+            page_texts.append(page_text)
+    compacted = '\n\n'.join(page_texts)
+
+    return {
+        "text": compacted,
+        "pages": len(pages),
+        "page_markers": page_markers,
+        "repeated_lines": len(repeated),
+        "garbage_lines": garbage,
+        "hyphenations": hyphenations,
+        "characters_before": len(text),
+        "characters_after": len(compacted),
+        "tokens_before": estimate_tokens(text),
+        "tokens_after": estimate_tokens(compacted),
+        "tokens_saved": estimate_tokens(text) - estimate_tokens(compacted)
+    }
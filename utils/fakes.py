@@ -0,0 +1,92 @@
+import time
+import wave
+from types import SimpleNamespace
+from typing import Iterator, List, Optional
+
+from utils.tts_backends import WaveBackend
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel that needs no network access.
+
+    Useful for exercising the streaming and load-handling paths with
+    predictable latency.
+    """
+
+    def __init__(self,
+                 response_text: Optional[str] = None,
+                 chunk_words: int = 4,
+                 first_chunk_delay: float = 0.2,
+                 chunk_delay: float = 0.05):
+        """
+        Initialize the FakeGenerativeModel.
+
+        Args:
+            response_text: Text returned for every prompt (a canned summary if omitted)
+            chunk_words: Words per streamed chunk
+            first_chunk_delay: Seconds before the first chunk, mimicking time-to-first-token
+            chunk_delay: Seconds between subsequent chunks
+        """
+        self.response_text = response_text or (
+            "This scan looks at your chest. Your lungs are clear and show no signs of infection. "
+            "Your heart is a normal size. There is no fluid around the lungs. "
+            "Overall, this is a normal result."
+        )
+        self.chunk_words = chunk_words
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.prompts: List[str] = []
+
+    def _chunks(self) -> List[str]:
+        words = self.response_text.split(' ')
+        return [
+            ' '.join(words[i:i + self.chunk_words]) + (' ' if i + self.chunk_words < len(words) else '')
+            for i in range(0, len(words), self.chunk_words)
+        ]
+
+    def _stream(self) -> Iterator[SimpleNamespace]:
+        time.sleep(self.first_chunk_delay)
+        for index, chunk in enumerate(self._chunks()):
+            if index:
+                time.sleep(self.chunk_delay)
+            yield SimpleNamespace(text=chunk)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        self.prompts.append(prompt)
+        if stream:
+            return self._stream()
+        time.sleep(self.first_chunk_delay + self.chunk_delay * (len(self._chunks()) - 1))
+        return SimpleNamespace(text=self.response_text)
+
+
+class FakeSpeechBackend(WaveBackend):
+    """
+    Offline speech backend that writes silent WAV audio after a fixed delay.
+    """
+
+    name = "fake"
+
+    def __init__(self, delay: float = 0.1, seconds_per_char: float = 0.06, sample_rate: int = 8000):
+        """
+        Initialize the FakeSpeechBackend.
+
+        Args:
+            delay: Seconds each synthesis call takes
+            seconds_per_char: Length of the generated audio per character of text
+            sample_rate: Sample rate of the generated audio
+        """
+        self.delay = delay
+        self.seconds_per_char = seconds_per_char
+        self.sample_rate = sample_rate
+        self.calls: List[str] = []
+
+    def synthesize(self, text: str, language: str, slow: bool, filepath: str) -> None:
+        self.calls.append(text)
+        time.sleep(self.delay)
+        frames = int(len(text) * self.seconds_per_char * self.sample_rate)
+        with wave.open(filepath, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(b'\x00\x00' * frames)
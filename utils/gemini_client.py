@@ -0,0 +1,340 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Iterator, Optional
+
+# Upstream errors worth retrying: rate limiting, overload and transport hiccups.
+# Matched by name so google.api_core stays an indirect dependency.
+TRANSIENT_ERRORS = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+    'DeadlineExceeded', 'GatewayTimeout', 'BadGateway', 'Aborted',
+    'TimeoutError', 'ConnectionError', 'ConnectionResetError', 'RemoteDisconnected'
+}
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised without calling the model while the circuit breaker is open.
+    """
+
+
+class UpstreamTimeoutError(TimeoutError):
+    """
+    Raised when a call does not complete within its deadline.
+    """
+
+
+class CapacityTimeoutError(UpstreamTimeoutError):
+    """
+    Raised when the deadline passes while waiting for the local rate limit
+    or a free request slot, before anything was sent upstream.
+    """
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in TRANSIENT_ERRORS:
+        return True
+    code = getattr(error, 'code', None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize the TokenBucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting for the bucket to refill if needed.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if a token was taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures and fails fast until a cool-down has
+    passed, then lets a single trial call through.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        Initialize the CircuitBreaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class GeminiClient:
+    """
+    Wraps a Gemini model with rate limiting, a cap on in-flight requests,
+    per-call deadlines, jittered exponential retries on transient errors and
+    a circuit breaker.
+    """
+
+    def __init__(self,
+                 model,
+                 rate: float = 5.0,
+                 burst: int = 10,
+                 max_in_flight: int = 8,
+                 timeout: float = 60.0,
+                 stream_timeout: Optional[float] = 300.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize the GeminiClient.
+
+        Args:
+            model: Object with a Gemini-compatible generate_content method
+            rate: Sustained requests per second
+            burst: Requests allowed in a burst above the sustained rate
+            max_in_flight: Maximum concurrent upstream calls
+            timeout: Deadline in seconds for each call, including waiting for a
+                slot, and for each further chunk of a stream
+            stream_timeout: Deadline in seconds for a whole stream, or None for no limit
+            max_retries: Retries after the first attempt for transient errors
+            backoff_base: Initial backoff in seconds, doubled each retry
+            backoff_max: Upper bound for a single backoff
+            breaker: Circuit breaker (a default one if omitted)
+        """
+        self.model = model
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        # One thread per slot; calls run here so the caller can stop waiting at the deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gemini")
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "failures": 0, "timeouts": 0, "rejected": 0}
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from synchronized clients spreading out
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _acquire(self, deadline: float) -> None:
+        if not self.bucket.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._count("timeouts")
+            raise CapacityTimeoutError("Timed out waiting for Gemini rate limit")
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._count("timeouts")
+            raise CapacityTimeoutError("Timed out waiting for a free Gemini request slot")
+        # Checked last so a half-open trial call is always actually sent
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count("rejected")
+            raise UpstreamUnavailableError("Gemini is unavailable (circuit open); try again shortly")
+
+    def _call(self, fn, deadline: float, hold_slot: bool = False):
+        """
+        Run fn on the client's executor within the deadline.
+
+        The in-flight slot is released when fn really ends, so stalled calls
+        keep counting against the cap. With hold_slot the caller releases it
+        instead (used for streams, which stay in flight after fn returns).
+        """
+        self._acquire(deadline)
+        self._count("calls")
+        try:
+            future = self._executor.submit(fn)
+        except Exception:
+            self._slots.release()
+            raise
+        if not hold_slot:
+            future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            if hold_slot:
+                future.add_done_callback(lambda _: self._slots.release())
+            self._count("timeouts")
+            raise UpstreamTimeoutError(f"Gemini call exceeded {self.timeout}s deadline")
+        except Exception:
+            if hold_slot:
+                self._slots.release()
+            raise
+
+    def _with_retries(self, attempt_call):
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            try:
+                result = attempt_call(deadline)
+                self.breaker.record_success()
+                return result
+            except (UpstreamUnavailableError, CapacityTimeoutError):
+                raise
+            except Exception as e:
+                self._count("failures")
+                if not is_transient(e):
+                    # The upstream answered; the request itself was the problem
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                self._count("retries")
+                time.sleep(delay)
+                # Each retry gets a fresh deadline of its own
+                deadline = time.monotonic() + self.timeout
+
+    def generate(self, prompt: str, **kwargs):
+        """
+        Generate a complete response.
+
+        Args:
+            prompt: The prompt
+            **kwargs: Passed through to generate_content
+
+        Returns:
+            The model response
+        """
+        def request():
+            response = self.model.generate_content(prompt, **kwargs)
+            # Touch .text so blocked or empty responses raise inside the deadline
+            response.text
+            return response
+
+        return self._with_retries(lambda deadline: self._call(request, deadline))
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        """
+        Generate a streamed response, yielding chunks as they arrive.
+
+        The deadline and retries apply up to the first chunk. After that each
+        chunk must arrive within the call timeout, and the whole stream within
+        stream_timeout, or UpstreamTimeoutError is raised. The in-flight slot
+        is held until the stream ends; after a stall, until the stalled read
+        really returns, so stalled streams keep counting against the cap.
+
+        Args:
+            prompt: The prompt
+            **kwargs: Passed through to generate_content
+
+        Yields:
+            Response chunks
+        """
+        def request():
+            iterator = iter(self.model.generate_content(prompt, stream=True, **kwargs))
+            return iterator, next(iterator, None)
+
+        started = time.monotonic()
+        iterator, first = self._with_retries(lambda deadline: self._call(request, deadline, hold_slot=True))
+        stalled = False
+        try:
+            chunk = first
+            while chunk is not None:
+                yield chunk
+                # Read the next chunk on the executor so a stalled stream cannot block past its deadline
+                timeout = self.timeout
+                if self.stream_timeout is not None:
+                    timeout = min(timeout, started + self.stream_timeout - time.monotonic())
+                future = self._executor.submit(next, iterator, None)
+                try:
+                    chunk = future.result(timeout=max(0.0, timeout))
+                except FutureTimeoutError:
+                    # The read still occupies an executor thread; free the slot when it ends, as _call does
+                    stalled = True
+                    future.add_done_callback(lambda _: self._slots.release())
+                    self._count("timeouts")
+                    raise UpstreamTimeoutError("Gemini stream stalled past its deadline")
+        except Exception as e:
+            self._count("failures")
+            if is_transient(e):
+                self.breaker.record_failure()
+            raise
+        finally:
+            if not stalled:
+                self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["circuit"] = self.breaker.state
+        return stats
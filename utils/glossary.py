@@ -0,0 +1,348 @@
+import hashlib
+import json
+import re
+import threading
+from collections import deque
+from typing import Dict, Any, List, NamedTuple, Optional
+
+# Radiology terms and plain-language explanations
+DEFAULT_TERMS = {
+    "atelectasis": "partly collapsed or airless lung",
+    "consolidation": "an area of lung filled with fluid or infection instead of air",
+    "pleural effusion": "fluid around the lung",
+    "effusion": "a build-up of fluid",
+    "pneumothorax": "air leaking into the space around the lung",
+    "pneumonia": "a lung infection",
+    "opacity": "an area that looks whiter than expected on the image",
+    "opacities": "areas that look whiter than expected on the image",
+    "ground-glass opacity": "a hazy area in the lung",
+    "infiltrate": "a hazy area in the lung, often from infection or inflammation",
+    "nodule": "a small round spot",
+    "mass": "a lump or growth of tissue",
+    "mass effect": "pressure that pushes nearby structures out of place",
+    "lesion": "an area of abnormal tissue",
+    "cardiomegaly": "an enlarged heart",
+    "cardiomediastinal silhouette": "the outline of the heart and the middle of the chest",
+    "mediastinum": "the middle of the chest between the lungs",
+    "hilar": "near where the airways and blood vessels enter the lungs",
+    "emphysema": "damage to the air sacs of the lungs",
+    "fibrosis": "scarring",
+    "edema": "swelling caused by fluid",
+    "osseous": "related to bone",
+    "osteophyte": "a bone spur",
+    "osteopenia": "lower than normal bone density",
+    "fracture": "a broken bone",
+    "degenerative changes": "wear and tear",
+    "spondylosis": "wear and tear of the spine",
+    "stenosis": "narrowing",
+    "hepatomegaly": "an enlarged liver",
+    "splenomegaly": "an enlarged spleen",
+    "hepatic steatosis": "fatty liver",
+    "steatosis": "fat build-up",
+    "cholelithiasis": "gallstones",
+    "cholecystitis": "an inflamed gallbladder",
+    "nephrolithiasis": "kidney stones",
+    "hydronephrosis": "swelling of a kidney from urine that cannot drain",
+    "renal cyst": "a fluid-filled sac in the kidney",
+    "cyst": "a fluid-filled sac",
+    "lymphadenopathy": "enlarged lymph nodes",
+    "ascites": "fluid in the belly",
+    "diverticulosis": "small pouches in the wall of the bowel",
+    "diverticulitis": "inflamed pouches in the wall of the bowel",
+    "appendicitis": "an inflamed appendix",
+    "calcification": "a deposit of calcium",
+    "calcified granuloma": "a small calcium spot from an old, healed infection",
+    "granuloma": "a small spot left by old inflammation",
+    "aneurysm": "a bulging blood vessel",
+    "thrombus": "a blood clot",
+    "embolism": "a blockage in a blood vessel",
+    "pulmonary embolism": "a blood clot in the lung arteries",
+    "infarct": "an area of tissue damaged by lost blood supply",
+    "hemorrhage": "bleeding",
+    "hematoma": "a collection of blood",
+    "ischemia": "reduced blood flow",
+    "herniation": "a bulge of tissue out of its normal place",
+    "benign": "not cancer",
+    "malignant": "cancerous",
+    "metastasis": "cancer that has spread",
+    "metastases": "cancer that has spread",
+    "unremarkable": "normal",
+    "within normal limits": "normal",
+    "bilateral": "on both sides",
+    "unilateral": "on one side",
+    "anterior": "toward the front",
+    "posterior": "toward the back",
+    "lateral": "toward the side",
+    "contrast": "a dye that makes parts of the body show up more clearly",
+    "acute": "new or sudden",
+    "chronic": "long-lasting",
+    "focal": "in one specific spot",
+    "diffuse": "spread out",
+    "interval": "since the last scan",
+}
+
+
+class TermMatch(NamedTuple):
+    start: int
+    end: int
+    term: str
+    explanation: str
+
+
+class TermIndex:
+    """
+    Aho-Corasick automaton over a terminology dictionary, matching every
+    term in a single pass over the text regardless of dictionary size.
+    """
+
+    def __init__(self, terms: Dict[str, str]):
+        """
+        Initialize the TermIndex.
+
+        Args:
+            terms: Mapping of term to plain-language explanation
+        """
+        self.terms = {term.lower(): explanation for term, explanation in terms.items()}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for term in self.terms:
+            self._add(term)
+        self._build_failure_links()
+
+    def _add(self, term: str) -> None:
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(term)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> List[TermMatch]:
+        """
+        Find whole-word term occurrences, preferring the longest match where
+        terms overlap.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Non-overlapping matches in text order
+        """
+        lowered = text.lower()
+        candidates = []
+        state = 0
+        for index, char in enumerate(lowered):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for term in self._output[state]:
+                start = index - len(term) + 1
+                end = index + 1
+                before = lowered[start - 1] if start > 0 else ' '
+                after = lowered[end] if end < len(lowered) else ' '
+                if not before.isalnum() and not after.isalnum():
+                    candidates.append((start, end, term))
+
+        matches = []
+        last_end = -1
+        for start, end, term in sorted(candidates, key=lambda c: (c[0], -(c[1] - c[0]))):
+            if start >= last_end:
+                matches.append(TermMatch(start, end, text[start:end], self.terms[term]))
+                last_end = end
+        return matches
+
+
+class NormalTemplate(NamedTuple):
+    """
+    A known "normal study" report: every sentence must match one of the
+    allowed patterns for the report to be answered locally.
+    """
+    name: str
+    required: re.Pattern
+    sentences: List[re.Pattern]
+    simplified_text: str
+    key_findings: List[str]
+
+
+def _patterns(*patterns: str) -> List[re.Pattern]:
+    return [re.compile(r'^(?:' + p + r')\.?$', re.IGNORECASE) for p in patterns]
+
+
+COMMON_SENTENCES = _patterns(
+    r'(?:clinical )?(?:history|indication|reason for exam)\s*:.*',
+    r'comparison\s*:\s*(?:none|no prior(?: studies| exams?)?(?: available)?)',
+    r'(?:technique|exam|examination)\s*:.*',
+    r'findings\s*:?',
+    r'impression\s*:?',
+)
+
+DEFAULT_TEMPLATES = [
+    NormalTemplate(
+        name="normal_chest_xray",
+        required=re.compile(r'\b(?:cxr|chest (?:x-ray|xr|radiograph)|(?:xr|x-ray|radiograph)\s+chest)\b', re.IGNORECASE),
+        sentences=COMMON_SENTENCES + _patterns(
+            r'(?:xr|x-ray|radiograph|cxr)?\s*chest(?: x-ray| radiograph)?(?:,)?(?: pa and lateral| 2 views| two views| 1 view| single view| ap| pa)?(?: views?)?',
+            r'(?:the )?lungs are clear(?: bilaterally)?',
+            r'(?:the )?lungs are well expanded and clear',
+            r'no (?:focal )?(?:airspace )?consolidation(?:,)?(?: pleural effusion)?(?:,)?(?: or pneumothorax)?',
+            r'no pleural effusion(?: or pneumothorax)?',
+            r'no pneumothorax(?: or pleural effusion)?',
+            r'(?:the )?(?:heart size|cardiac size|heart) (?:is )?(?:normal|within normal limits)',
+            r'(?:the )?cardiomediastinal silhouette (?:is )?(?:normal|within normal limits|unremarkable)(?: in size)?',
+            r'(?:the )?(?:visualized )?(?:osseous|bony) structures (?:are )?(?:intact|unremarkable|normal)',
+            r'no acute (?:osseous|bony) abnormality',
+            r'no acute cardiopulmonary (?:process|abnormality|disease)',
+            r'(?:\d\.\s*)?normal chest(?: x-ray| radiograph)?',
+        ),
+        simplified_text=(
+            "This was an X-ray of your chest.\n\n"
+            "Your lungs look clear, with no signs of infection, fluid or collapsed lung. "
+            "Your heart is a normal size, and the bones seen on the X-ray look normal.\n\n"
+            "Summary: This is a normal chest X-ray."
+        ),
+        key_findings=[
+            "The lungs are clear",
+            "No fluid around the lungs and no collapsed lung",
+            "The heart is a normal size",
+            "Normal chest X-ray",
+        ],
+    ),
+]
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+class GlossaryEngine:
+    """
+    Local rule-based pre-pass: annotates medical terms, answers reports that
+    match a known normal template without a model call, and builds a compact
+    glossary for the prompt otherwise. Keeps routing statistics.
+    """
+
+    def __init__(self,
+                 terms: Optional[Dict[str, str]] = None,
+                 templates: Optional[List[NormalTemplate]] = None,
+                 max_prompt_terms: int = 25):
+        """
+        Initialize the GlossaryEngine.
+
+        Args:
+            terms: Term dictionary (DEFAULT_TERMS if omitted)
+            templates: Normal-report templates (DEFAULT_TEMPLATES if omitted)
+            max_prompt_terms: Maximum glossary entries added to a prompt
+        """
+        self.index = TermIndex(terms if terms is not None else DEFAULT_TERMS)
+        self.templates = templates if templates is not None else DEFAULT_TEMPLATES
+        self.max_prompt_terms = max_prompt_terms
+        self.version = self._version()
+        self._lock = threading.Lock()
+        self._stats = {"reports": 0, "local": 0, "llm": 0, "glossary_terms": 0}
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "GlossaryEngine":
+        """
+        Build an engine whose dictionary is DEFAULT_TERMS extended by a JSON
+        file mapping terms to explanations.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            extra = json.load(f)
+        return cls(terms={**DEFAULT_TERMS, **extra}, **kwargs)
+
+    def _version(self) -> str:
+        # Changes whenever the terms, templates or prompt limit change, so cached results are not reused
+        payload = json.dumps({
+            "terms": self.index.terms,
+            "templates": [
+                [t.name, t.required.pattern, [p.pattern for p in t.sentences], t.simplified_text, t.key_findings]
+                for t in self.templates
+            ],
+            "max_prompt_terms": self.max_prompt_terms
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def annotate(self, text: str) -> List[TermMatch]:
+        return self.index.find(text)
+
+    def match_template(self, text: str) -> Optional[NormalTemplate]:
+        """
+        Return the normal template the whole report matches, if any.
+        """
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+        if not sentences:
+            return None
+        for template in self.templates:
+            if not template.required.search(text):
+                continue
+            if all(any(p.match(sentence) for p in template.sentences) for sentence in sentences):
+                return template
+        return None
+
+    def route(self, text: str, language: str = "English") -> Dict[str, Any]:
+        """
+        Decide how a report is simplified and record the decision.
+
+        Args:
+            text: The report text
+            language: Requested output language (templates are English only)
+
+        Returns:
+            {"local": True, "template": ...} when the report can be answered
+            without the model, else {"local": False, "glossary": str}
+        """
+        template = self.match_template(text) if language.lower() == "english" else None
+        if template is not None:
+            self._count(local=True)
+            return {"local": True, "template": template}
+
+        terms = self._prompt_terms(text)
+        self._count(local=False, terms=len(terms))
+        return {"local": False, "glossary": self._format(terms)}
+
+    def _prompt_terms(self, text: str) -> Dict[str, str]:
+        terms = {}
+        for match in self.annotate(text):
+            terms.setdefault(match.term.lower(), match.explanation)
+            if len(terms) >= self.max_prompt_terms:
+                break
+        return terms
+
+    @staticmethod
+    def _format(terms: Dict[str, str]) -> str:
+        return "; ".join(f"{term} = {explanation}" for term, explanation in terms.items())
+
+    def prompt_glossary(self, text: str) -> str:
+        """
+        Build a compact one-line "term = explanation; ..." glossary of the
+        terms found in the report.
+        """
+        return self._format(self._prompt_terms(text))
+
+    def _count(self, local: bool, terms: int = 0) -> None:
+        with self._lock:
+            self._stats["reports"] += 1
+            self._stats["local" if local else "llm"] += 1
+            self._stats["glossary_terms"] += terms
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["local_fraction"] = stats["local"] / stats["reports"] if stats["reports"] else 0.0
+        return stats
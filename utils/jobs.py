@@ -0,0 +1,180 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity.
+    """
+
+
+class Job:
+    """
+    A unit of background work with per-stage progress.
+    """
+
+    def __init__(self, stages: List[str]):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.created = time.time()
+        self.finished = None
+        self.stages = {name: {"status": "pending"} for name in stages}
+        self.result = None
+        self.error = None
+        self.version = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished
+        }
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a bounded background executor and tracks their progress.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 32, retention: float = 3600):
+        """
+        Initialize the JobManager.
+
+        Args:
+            max_workers: Number of jobs that run concurrently
+            max_queued: Maximum unfinished jobs (running plus waiting) before submissions are rejected
+            retention: Seconds a finished job stays queryable
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._changed = threading.Condition()
+        self._closed = False
+
+    def submit(self, func: Callable[..., Any], stages: List[str], *args, **kwargs) -> Job:
+        """
+        Queue a job. The callable receives an ``on_stage(name, status, **info)``
+        callback as its first argument and its return value becomes the job result.
+
+        Args:
+            func: The work to run
+            stages: Names of the stages the job reports progress for
+            *args: Extra positional arguments for func
+            **kwargs: Extra keyword arguments for func
+
+        Returns:
+            The queued Job
+
+        Raises:
+            QueueFullError: If too many jobs are already unfinished, or the
+                manager is draining for shutdown
+        """
+        job = Job(stages)
+        with self._changed:
+            if self._closed:
+                raise QueueFullError("Server is shutting down")
+            self._expire()
+            unfinished = sum(1 for j in self._jobs.values() if j.finished is None)
+            if unfinished >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({self.max_queued} pending)")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def wait_for_update(self, job_id: str, version: int, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """
+        Block until the job changes past the given version or the timeout elapses.
+
+        Returns:
+            A snapshot of the job, or None if it does not exist
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if job.version > version or remaining <= 0:
+                    snapshot = job.to_dict()
+                    snapshot["version"] = job.version
+                    return snapshot
+                self._changed.wait(remaining)
+
+    def _update(self, job: Job, **changes) -> None:
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _run(self, job: Job, func, args, kwargs) -> None:
+        def on_stage(name: str, status: str, **info) -> None:
+            with self._changed:
+                stage = job.stages.setdefault(name, {"status": "pending"})
+                now = time.time()
+                if status == "running":
+                    stage.setdefault("started", now)
+                elif "started" in stage:
+                    stage["seconds"] = round(now - stage["started"], 3)
+                stage["status"] = status
+                stage.update(info)
+                job.version += 1
+                self._changed.notify_all()
+
+        self._update(job, status="running")
+        try:
+            result = func(on_stage, *args, **kwargs)
+            self._update(job, status="done", result=result, finished=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job, status="failed", error=str(e), finished=time.time())
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._changed:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"max_workers": self.max_workers, "max_queued": self.max_queued, "jobs": counts}
+
+    def drain(self, timeout: Optional[float] = None) -> int:
+        """
+        Stop accepting jobs and wait for unfinished ones to complete.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            Number of jobs still unfinished when the wait ended
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            self._closed = True
+            while True:
+                unfinished = sum(1 for j in self._jobs.values() if j.finished is None)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not unfinished or (remaining is not None and remaining <= 0):
+                    return unfinished
+                self._changed.wait(remaining)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,411 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+BYTE_BUCKETS = (1024, 10240, 102400, 524288, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def snapshot(self) -> Dict[Tuple[str, ...], object]:
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def _add_values(total, value):
+        return total + value
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, e.g. errors.
+    """
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], object]] = None) -> List[str]:
+        values = self.snapshot() if values is None else values
+        return self._header() + [f"{self.name}{_format_labels(self.labels, key)} {_format_number(value)}"
+                                 for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, e.g. requests in flight.
+    """
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """
+    Counts observations into cumulative buckets, plus their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @staticmethod
+    def _copy(value):
+        return [[*value[0]], value[1], value[2]]
+
+    @staticmethod
+    def _add_values(total, value):
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], object]] = None) -> List[str]:
+        values = self.snapshot() if values is None else values
+        lines = self._header()
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text
+    exposition format.
+
+    With a directory, several worker processes (e.g. gunicorn workers)
+    report as one: each writes its values to <directory>/<pid>.json, on
+    every scrape it serves and every flush interval, and render() sums
+    the files of all workers. Counters and histograms of workers that have
+    exited are kept (see mark_process_dead); their gauges are dropped.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Initialize the MetricsRegistry.
+
+        Args:
+            directory: Shared directory for multi-process metrics, or None
+                for metrics of this process only
+        """
+        self.directory = directory
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop_flush = threading.Event()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """This process's values, in the form written to the metrics directory."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {"kind": metric.kind,
+                              "values": [[list(key), value] for key, value in metric.snapshot().items()]}
+                for metric in metrics}
+
+    def write_snapshot(self) -> None:
+        """Write this process's values to the metrics directory, if there is one."""
+        if not self.directory:
+            return
+        _write_json(os.path.join(self.directory, f"{os.getpid()}.json"), self.snapshot())
+
+    def _aggregate(self) -> Dict[str, Dict[Tuple[str, ...], object]]:
+        self.write_snapshot()
+        totals: Dict[str, Dict[Tuple[str, ...], object]] = {}
+        for data in _read_snapshots(self.directory):
+            for name, entry in data.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                values = totals.setdefault(name, {})
+                for key, value in entry["values"]:
+                    key = tuple(key)
+                    values[key] = metric._add_values(values[key], value) if key in values else value
+        return totals
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        totals = self._aggregate() if self.directory else None
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(totals.get(metric.name, {}) if totals is not None else None))
+        return '\n'.join(lines) + '\n'
+
+    def start_flusher(self, interval: float = 1.0) -> None:
+        """
+        Write this process's values every interval seconds, so scrapes
+        served by other workers see them. Does nothing without a directory.
+        """
+        if not self.directory or self._flusher is not None:
+            return
+        self._stop_flush.clear()
+
+        def flush():
+            while not self._stop_flush.wait(interval):
+                self.write_snapshot()
+
+        self._flusher = threading.Thread(target=flush, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def stop_flusher(self) -> None:
+        """Stop the flusher and write the final values."""
+        if self._flusher is not None:
+            self._stop_flush.set()
+            self._flusher.join()
+            self._flusher = None
+        self.write_snapshot()
+
+
+def _write_json(path: str, data: object) -> None:
+    # Written aside and renamed, so readers never see a partial file
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _read_snapshots(directory: str) -> Iterator[Dict[str, Dict[str, object]]]:
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                yield json.load(f)
+        except (OSError, ValueError):
+            # Removed by mark_process_dead between listing and reading
+            continue
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = None) -> None:
+    """
+    Fold an exited worker's counters and histograms into the metrics
+    directory's dead.json and remove its file; its gauges no longer apply.
+    Call from one process only (gunicorn's master, in child_exit).
+    """
+    directory = directory or registry.directory
+    if not directory:
+        return
+    path = os.path.join(directory, f"{pid}.json")
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    dead_path = os.path.join(directory, 'dead.json')
+    try:
+        with open(dead_path, encoding='utf-8') as f:
+            dead = json.load(f)
+    except (OSError, ValueError):
+        dead = {}
+    for name, entry in data.items():
+        if entry["kind"] == "gauge":
+            continue
+        merger = Histogram._add_values if entry["kind"] == "histogram" else Counter._add_values
+        values = {tuple(key): value for key, value in dead.get(name, {"values": []})["values"]}
+        for key, value in entry["values"]:
+            key = tuple(key)
+            values[key] = merger(values[key], value) if key in values else value
+        dead[name] = {"kind": entry["kind"], "values": [[list(key), value] for key, value in values.items()]}
+    _write_json(dead_path, dead)
+    os.remove(path)
+
+
+def clear_directory(directory: str) -> None:
+    """Remove metrics left by an earlier server run."""
+    os.makedirs(directory, exist_ok=True)
+    for filename in os.listdir(directory):
+        if filename.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(directory, filename))
+
+
+# METRICS_DIR is set by gunicorn.conf.py so that all workers report together
+registry = MetricsRegistry(directory=os.environ.get('METRICS_DIR') or None)
+
+STAGE_SECONDS = registry.histogram(
+    'pipeline_stage_seconds', 'Time spent in each pipeline stage', ['stage'])
+STAGE_IN_FLIGHT = registry.gauge(
+    'pipeline_stage_in_flight', 'Pipeline stages currently running', ['stage'])
+STAGE_ERRORS = registry.counter(
+    'pipeline_stage_errors_total', 'Pipeline stages that raised an error', ['stage'])
+UPLOAD_BYTES = registry.histogram(
+    'upload_bytes', 'Size of uploaded report files', buckets=BYTE_BUCKETS)
+REPORT_PAGES = registry.histogram(
+    'report_pages', 'Pages per PDF report, by how their text was read', ['source'], buckets=COUNT_BUCKETS)
+REPORT_CHARACTERS = registry.histogram(
+    'report_characters', 'Characters of report text sent for simplification', buckets=COUNT_BUCKETS)
+TOKENS_SAVED = registry.histogram(
+    'compaction_tokens_saved', 'Estimated prompt tokens removed from each report by compaction',
+    buckets=COUNT_BUCKETS)
+AUDIO_SECONDS = registry.histogram(
+    'speech_audio_seconds', 'Length of the generated audio', buckets=(5, 10, 20, 30, 60, 120, 300, 600))
+HTTP_SECONDS = registry.histogram(
+    'http_request_seconds', 'Time to serve each request, including streamed bodies',
+    ['endpoint', 'method', 'status'])
+HTTP_IN_FLIGHT = registry.gauge(
+    'http_requests_in_flight', 'Requests currently being served')
+
+
+class RequestTiming:
+    """
+    Stage timings of one request, reported in a Server-Timing header.
+    Repeated stages (e.g. OCR pages) are summed.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        with self._lock:
+            stages = dict(self._stages)
+        parts = []
+        for name, (seconds, count) in stages.items():
+            desc = f';desc="{count}x"' if count > 1 else ''
+            parts.append(f"{name};dur={seconds * 1000:.1f}{desc}")
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ', '.join(parts)
+
+
+_timing: ContextVar[Optional[RequestTiming]] = ContextVar('request_timing', default=None)
+
+
+def start_request() -> RequestTiming:
+    """
+    Begin timing a request on the current thread; stages recorded through
+    stage() or record_stage() on this thread are added to it.
+    """
+    timing = RequestTiming()
+    _timing.set(timing)
+    return timing
+
+
+def record_stage(name: str, seconds: float, error: bool = False) -> None:
+    """
+    Record a stage timed elsewhere, e.g. an OCR page run in a worker process.
+    """
+    STAGE_SECONDS.observe(seconds, stage=name)
+    if error:
+        STAGE_ERRORS.inc(stage=name)
+    timing = _timing.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+class StageTimer:
+    __slots__ = ('failed',)
+
+    def __init__(self):
+        self.failed = False
+
+
+@contextmanager
+def stage(name: str) -> Iterator[StageTimer]:
+    """
+    Time a pipeline stage: its latency histogram, in-flight gauge, error
+    count and the current request's Server-Timing entry.
+
+    The stage counts as an error if it raises, or if the caller sets
+    failed on the yielded timer (for stages that report failure in their
+    result instead).
+    """
+    timer = StageTimer()
+    STAGE_IN_FLIGHT.inc(stage=name)
+    started = time.perf_counter()
+    try:
+        yield timer
+    except Exception:
+        timer.failed = True
+        raise
+    finally:
+        STAGE_IN_FLIGHT.dec(stage=name)
+        record_stage(name, time.perf_counter() - started, error=timer.failed)
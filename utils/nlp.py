@@ -1,29 +1,246 @@
-import google.generativeai as genai
+import json
 import os
-from typing import Dict, Any, Optional
+import re
+import time
+from typing import Dict, Any, Iterator, List, Optional
+
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import ResultCache, TieredCache, make_cache_key
+from utils.gemini_client import GeminiClient
+from utils.glossary import GlossaryEngine
+from utils.segmenter import merge_short_segments, segment_report, summary_segment_index
+
+# Separates simplified text from key findings in streamed combined responses
+FINDINGS_MARKER = "### KEY FINDINGS ###"
+BULLET_PREFIX = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+')
+FINDINGS_HEADING = re.compile(r'^\s*(?:#+\s*)?\**key findings\s*:?\**\s*:?\s*$', re.IGNORECASE | re.MULTILINE)
+
+JSON_OUTPUT_INSTRUCTIONS = """Respond with ONLY a JSON object, without code fences, in exactly this form:
+        {"simplified_text": "<the simplified report>", "key_findings": ["<finding>", "<finding>"]}
+        The key_findings list should hold the most important clinical findings in order of
+        medical significance, each as one short plain-language sentence, including both
+        normal and abnormal findings."""
+
+MARKER_OUTPUT_INSTRUCTIONS = f"""First write ONLY the simplified version, without any introduction or explanatory notes.
+        Then write a line containing exactly {FINDINGS_MARKER} followed by the most important
+        clinical findings in order of medical significance, one per line starting with "- ",
+        including both normal and abnormal findings."""
+
+
+# Plain-language headings used when merging section-by-section English output
+SECTION_TITLES = {
+    "history": "Why the scan was done",
+    "technique": "How the scan was done",
+    "comparison": "Earlier scans",
+    "findings": "What the scan showed",
+    "impression": "Summary",
+}
+# Boilerplate sections answered from a template instead of the model
+SECTION_TEMPLATES = {
+    "technique": "This part of the report describes how the images were taken. It does not describe any findings.",
+}
+
+
+def _parse_findings_list(text: str) -> List[str]:
+    findings = []
+    for line in text.splitlines():
+        line = BULLET_PREFIX.sub('', line).strip()
+        if line:
+            findings.append(line)
+    return findings
+
+
+def _validate_analysis(data: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(data, dict):
+        return None
+    simplified = data.get("simplified_text")
+    findings = data.get("key_findings", [])
+    if not isinstance(simplified, str) or not simplified.strip() or not isinstance(findings, list):
+        return None
+    cleaned = []
+    for finding in findings:
+        if isinstance(finding, dict):
+            finding = finding.get("finding") or finding.get("text") or ""
+        if isinstance(finding, str) and finding.strip():
+            cleaned.append(finding.strip())
+    return {"simplified_text": simplified.strip(), "key_findings": cleaned}
+
+
+def parse_analysis(raw: str) -> Dict[str, Any]:
+    """
+    Parse a combined simplification + key findings response.
+
+    Tries the requested JSON object first (tolerating code fences and
+    surrounding chatter), then the streamed marker format, then a
+    "Key findings" heading, and finally treats the whole response as
+    simplified text with no findings.
+
+    Args:
+        raw: The model's response text
+
+    Returns:
+        A dictionary with "simplified_text", "key_findings" and the
+        "format" that was recognized
+    """
+    text = raw.strip()
+    fenced = re.match(r'^```(?:json)?\s*(.*?)\s*```$', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+
+    candidates = [text]
+    start, end = text.find('{'), text.rfind('}')
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        try:
+            parsed = _validate_analysis(json.loads(candidate))
+        except ValueError:
+            continue
+        if parsed:
+            return {**parsed, "format": "json"}
+
+    if FINDINGS_MARKER in text:
+        simplified, findings = text.split(FINDINGS_MARKER, 1)
+        return {"simplified_text": simplified.strip(), "key_findings": _parse_findings_list(findings), "format": "marker"}
+
+    heading = FINDINGS_HEADING.search(text)
+    if heading and text[:heading.start()].strip():
+        return {
+            "simplified_text": text[:heading.start()].strip(),
+            "key_findings": _parse_findings_list(text[heading.end():]),
+            "format": "heading"
+        }
+
+    return {"simplified_text": text, "key_findings": [], "format": "text"}
+
 
 class RadiologyTextSimplifier:
     """
     A class to simplify radiology report text using Google's Gemini API.
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, model_name: str = 'gemini-1.5-flash',
+                 cache: Optional[ResultCache] = None, model: Any = None,
+                 client_options: Optional[Dict[str, Any]] = None,
+                 segment_workers: int = 4,
+                 glossary: Optional[GlossaryEngine] = None):
         """
         Initialize the RadiologyTextSimplifier with the Gemini API key.
         
         Args:
             api_key: The API key for Google's Gemini API
+            model_name: The Gemini model to use
+            cache: Optional cache for simplification results
+            model: Optional object with a Gemini-compatible generate_content
+                method, used instead of the real API (e.g. a local fake)
+            client_options: Rate limit, concurrency, deadline and retry
+                settings passed to GeminiClient
+            segment_workers: Report sections simplified (or translations made)
+                concurrently
+            glossary: Optional local pre-pass that answers normal template
+                reports without the model and adds term explanations to prompts
         """
         self.api_key = api_key
-        genai.configure(api_key=api_key)
-        # Use Gemini 1.5 Flash for faster processing and lower cost
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.model_name = model_name
+        self.cache = cache
+        self.glossary = glossary
+        if model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            # Use Gemini 1.5 Flash for faster processing and lower cost
+            model = genai.GenerativeModel(model_name)
+        self.model = model
+        # All model calls go through the client for rate limiting, deadlines and retries
+        self.client = GeminiClient(model, **(client_options or {}))
+        self._segment_executor = ThreadPoolExecutor(max_workers=segment_workers, thread_name_prefix="segment")
         
+    def _build_simplify_prompt(self, text: str, target_audience: str,
+                               grade_level: int, language: str,
+                               output_instructions: str = "Please provide ONLY the simplified version, without any introduction or explanatory notes.",
+                               glossary: str = "") -> str:
+        if glossary:
+            # Explanations resolved locally, so the model only has to reword them
+            terms = f"Explain medical terms in plain words, using these meanings: {glossary}"
+        else:
+            terms = "Explain key medical terms when they first appear"
+        # Create the prompt with specific instructions for radiology report simplification
+        return f"""
+        You are a medical translator assistant specialized in converting complex radiology reports into 
+        easy-to-understand language. I will provide you with a radiology report, and your task is to:
+
+        1. Simplify the medical terminology while preserving the important clinical information
+        2. Target a {grade_level}th grade reading level
+        3. Organize the information in a clear, structured way
+        4. {terms}
+        5. Focus on what would be most important for a {target_audience} audience to understand
+        6. Respond in {language}
+
+        Here is the radiology report to simplify:
+        ```
+        {text}
+        ```
+
+        {output_instructions}
+        """
+
+    def _simplify_cache_key(self, text: str, target_audience: str,
+                            grade_level: int, language: str,
+                            task: str = "simplify") -> Optional[str]:
+        if self.cache is None:
+            return None
+        return make_cache_key(
+            text,
+            task=task,
+            model=self.model_name,
+            target_audience=target_audience,
+            grade_level=grade_level,
+            language=language,
+            glossary=self.glossary.version if self.glossary is not None else None
+        )
+
+    def _route(self, text: str, language: str, allow_local: bool = True) -> Dict[str, Any]:
+        """
+        Run the glossary pre-pass: {"template": NormalTemplate} when the
+        report can be answered locally, else {"glossary": str} for the prompt.
+        """
+        if self.glossary is None:
+            return {"glossary": ""}
+        if not allow_local:
+            return {"glossary": self.glossary.prompt_glossary(text)}
+        return self.glossary.route(text, language)
+
+    @staticmethod
+    def _local_result(text: str, template, target_audience: str, grade_level: int,
+                      language: str, include_findings: bool) -> Dict[str, Any]:
+        result = {
+            "original_text": text,
+            "simplified_text": template.simplified_text,
+            "target_audience": target_audience,
+            "grade_level": grade_level,
+            "language": language,
+            "success": True,
+            "cached": True,
+            "local": template.name
+        }
+        if include_findings:
+            result["key_findings"] = list(template.key_findings)
+        return result
+
+    def _store_result(self, cache_key: Optional[str], result: Dict[str, Any], started: float) -> None:
+        if cache_key is None:
+            return
+        self.cache.set(cache_key, result)
+        if isinstance(self.cache, TieredCache):
+            self.cache.record_miss_latency(time.perf_counter() - started)
+
     def simplify_text(self, 
                       text: str, 
                       target_audience: str = "general", 
                       grade_level: int = 6,
-                      language: str = "English") -> Dict[str, Any]:
+                      language: str = "English",
+                      allow_local: bool = True) -> Dict[str, Any]:
         """
         Simplify radiology report text using Gemini API.
         
@@ -32,50 +249,397 @@ class RadiologyTextSimplifier:
             target_audience: The target audience for the simplified text
             grade_level: Target reading grade level (e.g., 6 for 6th grade)
             language: The language for the simplified text
+            allow_local: Whether a normal template report may be answered
+                by the glossary pre-pass instead of the model
             
         Returns:
             A dictionary containing the simplified text and metadata
         """
-        # Create the prompt with specific instructions for radiology report simplification
-        prompt = f"""
-        You are a medical translator assistant specialized in converting complex radiology reports into 
-        easy-to-understand language. I will provide you with a radiology report, and your task is to:
+        route = self._route(text, language, allow_local)
+        if "template" in route:
+            return self._local_result(text, route["template"], target_audience, grade_level, language, False)
 
-        1. Simplify the medical terminology while preserving the important clinical information
-        2. Target a {grade_level}th grade reading level
-        3. Organize the information in a clear, structured way
-        4. Explain key medical terms when they first appear
-        5. Focus on what would be most important for a {target_audience} audience to understand
-        6. Respond in {language}
+        cache_key = self._simplify_cache_key(text, target_audience, grade_level, language)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {"original_text": text, **cached, "cached": True}
 
-        Here is the radiology report to simplify:
-        ```
-        {text}
-        ```
-
-        Please provide ONLY the simplified version, without any introduction or explanatory notes.
-        """
-        
+        prompt = self._build_simplify_prompt(text, target_audience, grade_level, language,
+                                             glossary=route["glossary"])
         try:
             # Generate the simplified text
-            response = self.model.generate_content(prompt)
+            started = time.perf_counter()
+            response = self.client.generate(prompt)
             simplified_text = response.text.strip()
             
-            return {
-                "original_text": text,
+            result = {
                 "simplified_text": simplified_text,
                 "target_audience": target_audience,
                 "grade_level": grade_level,
                 "language": language,
                 "success": True
             }
+            self._store_result(cache_key, result, started)
+            return {"original_text": text, **result, "cached": False}
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
                 "original_text": text
             }
+
+    def analyze_report(self,
+                       text: str,
+                       target_audience: str = "general",
+                       grade_level: int = 6,
+                       language: str = "English",
+                       allow_local: bool = True) -> Dict[str, Any]:
+        """
+        Simplify a radiology report and extract its key findings in one model call.
+        
+        Args:
+            text: The radiology report text
+            target_audience: The target audience for the simplified text
+            grade_level: Target reading grade level (e.g., 6 for 6th grade)
+            language: The language for the simplified text
+            allow_local: Whether a normal template report may be answered
+                by the glossary pre-pass instead of the model
+            
+        Returns:
+            The same dictionary as simplify_text plus a "key_findings" list
+        """
+        route = self._route(text, language, allow_local)
+        if "template" in route:
+            return self._local_result(text, route["template"], target_audience, grade_level, language, True)
+
+        cache_key = self._simplify_cache_key(text, target_audience, grade_level, language, task="analyze")
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {"original_text": text, **cached, "cached": True}
+
+        prompt = self._build_simplify_prompt(text, target_audience, grade_level, language,
+                                             output_instructions=JSON_OUTPUT_INSTRUCTIONS,
+                                             glossary=route["glossary"])
+        try:
+            started = time.perf_counter()
+            response = self.client.generate(prompt)
+            analysis = parse_analysis(response.text)
+            if not analysis["simplified_text"]:
+                raise ValueError("Model returned an empty simplification")
+
+            result = {
+                "simplified_text": analysis["simplified_text"],
+                "key_findings": analysis["key_findings"],
+                "target_audience": target_audience,
+                "grade_level": grade_level,
+                "language": language,
+                "success": True
+            }
+            self._store_result(cache_key, result, started)
+            return {"original_text": text, **result, "cached": False}
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "original_text": text
+            }
+
+    def stream_simplify_text(self,
+                             text: str,
+                             target_audience: str = "general",
+                             grade_level: int = 6,
+                             language: str = "English",
+                             include_findings: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Simplify radiology report text, yielding text as the model generates it.
+        
+        Args:
+            text: The radiology report text to simplify
+            target_audience: The target audience for the simplified text
+            grade_level: Target reading grade level (e.g., 6 for 6th grade)
+            language: The language for the simplified text
+            include_findings: Also extract key findings in the same call, as
+                analyze_report does; only the simplified text is streamed
+            
+        Yields:
+            {"chunk": str} for each piece of generated text, then a final
+            {"result": dict} with the same shape simplify_text (or
+            analyze_report) returns
+        """
+        route = self._route(text, language)
+        if "template" in route:
+            result = self._local_result(text, route["template"], target_audience, grade_level,
+                                        language, include_findings)
+            yield {"chunk": result["simplified_text"]}
+            yield {"result": result}
+            return
+
+        task = "analyze" if include_findings else "simplify"
+        cache_key = self._simplify_cache_key(text, target_audience, grade_level, language, task=task)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield {"chunk": cached["simplified_text"]}
+                yield {"result": {"original_text": text, **cached, "cached": True}}
+                return
+
+        if include_findings:
+            prompt = self._build_simplify_prompt(text, target_audience, grade_level, language,
+                                                 output_instructions=MARKER_OUTPUT_INSTRUCTIONS,
+                                                 glossary=route["glossary"])
+        else:
+            prompt = self._build_simplify_prompt(text, target_audience, grade_level, language,
+                                                 glossary=route["glossary"])
+        parts = []
+        # Text not yet forwarded: the tail may be the start of the findings marker
+        pending = ""
+        marker_seen = False
+        try:
+            started = time.perf_counter()
+            for response_chunk in self.client.stream(prompt):
+                chunk_text = response_chunk.text
+                if not chunk_text:
+                    continue
+                # Drop the leading whitespace the final strip() would remove
+                if not parts:
+                    chunk_text = chunk_text.lstrip()
+                    if not chunk_text:
+                        continue
+                parts.append(chunk_text)
+                if not include_findings:
+                    yield {"chunk": chunk_text}
+                    continue
+                if marker_seen:
+                    continue
+                pending += chunk_text
+                index = pending.find(FINDINGS_MARKER)
+                if index >= 0:
+                    marker_seen = True
+                    forward, pending = pending[:index].rstrip(), ""
+                else:
+                    keep = len(FINDINGS_MARKER) - 1
+                    forward, pending = pending[:-keep], pending[-keep:]
+                if forward:
+                    yield {"chunk": forward}
+            if pending and not marker_seen:
+                yield {"chunk": pending.rstrip()}
+
+            result = {
+                "simplified_text": "".join(parts).strip(),
+                "target_audience": target_audience,
+                "grade_level": grade_level,
+                "language": language,
+                "success": True
+            }
+            if include_findings:
+                analysis = parse_analysis(result["simplified_text"])
+                result["simplified_text"] = analysis["simplified_text"]
+                result["key_findings"] = analysis["key_findings"]
+            self._store_result(cache_key, result, started)
+            yield {"result": {"original_text": text, **result, "cached": False}}
+        except Exception as e:
+            yield {"result": {
+                "success": False,
+                "error": str(e),
+                "original_text": text
+            }}
+    
+    def stream_segmented_report(self,
+                                text: str,
+                                target_audience: str = "general",
+                                grade_level: int = 6,
+                                language: str = "English",
+                                skip_sections: frozenset = frozenset({"technique"})) -> Iterator[Dict[str, Any]]:
+        """
+        Simplify a long report section by section, concurrently, yielding
+        each simplified section in report order as soon as it and all
+        earlier sections are done.
+        
+        Boilerplate sections listed in skip_sections are answered from a
+        template (English) or left out, instead of calling the model. Key
+        findings come from the IMPRESSION (or last FINDINGS) section, which
+        is processed with analyze_report.
+        
+        Args:
+            text: The radiology report text
+            target_audience: The target audience for the simplified text
+            grade_level: Target reading grade level (e.g., 6 for 6th grade)
+            language: The language for the simplified text
+            skip_sections: Section kinds that are not sent to the model
+            
+        Yields:
+            {"chunk": str} for each simplified section, then a final
+            {"result": dict} with the same shape analyze_report returns
+        """
+        segments = merge_short_segments(segment_report(text), skip_kinds=skip_sections)
+        summary_index = summary_segment_index(segments)
+        english = language.lower() == "english"
+
+        def process(index, segment):
+            if segment.kind in skip_sections:
+                template = SECTION_TEMPLATES.get(segment.kind) if english else None
+                return {"success": True, "simplified_text": template or "", "cached": True}
+            method = self.analyze_report if index == summary_index else self.simplify_text
+            # A normal-looking section of a longer report is not a normal report
+            return method(text=segment.text, target_audience=target_audience,
+                          grade_level=grade_level, language=language, allow_local=False)
+
+        futures = [self._segment_executor.submit(process, index, segment)
+                   for index, segment in enumerate(segments)]
+        parts = []
+        key_findings = []
+        all_cached = True
+        titled = set()
+        try:
+            for index, (segment, future) in enumerate(zip(segments, futures)):
+                result = future.result()
+                if not result.get("success"):
+                    raise RuntimeError(result.get("error") or f"Failed to simplify {segment.title or 'report'}")
+                all_cached = all_cached and result.get("cached", False)
+                if index == summary_index:
+                    key_findings = result.get("key_findings", [])
+                section_text = result["simplified_text"].strip()
+                if not section_text:
+                    continue
+                if english and segment.kind in SECTION_TITLES and segment.kind not in titled:
+                    titled.add(segment.kind)
+                    section_text = f"{SECTION_TITLES[segment.kind]}:\n{section_text}"
+                chunk = section_text if not parts else "\n\n" + section_text
+                parts.append(chunk)
+                yield {"chunk": chunk}
+
+            yield {"result": {
+                "original_text": text,
+                "simplified_text": "".join(parts).strip(),
+                "key_findings": key_findings,
+                "target_audience": target_audience,
+                "grade_level": grade_level,
+                "language": language,
+                "sections": len(segments),
+                "success": True,
+                "cached": all_cached
+            }}
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            yield {"result": {
+                "success": False,
+                "error": str(e),
+                "original_text": text
+            }}
+
+    def analyze_segmented_report(self, text: str, **options) -> Dict[str, Any]:
+        """
+        Section-by-section counterpart of analyze_report for long reports.
+        
+        Args:
+            text: The radiology report text
+            **options: target_audience, grade_level, language, skip_sections
+            
+        Returns:
+            The same dictionary as analyze_report
+        """
+        for event in self.stream_segmented_report(text, **options):
+            if "result" in event:
+                return event["result"]
     
+    def _build_translate_prompt(self, simplified_text: str, key_findings: List[str],
+                                grade_level: int, language: str) -> str:
+        findings = "\n".join(f"- {finding}" for finding in key_findings) or "(none)"
+        return f"""
+        Translate this patient-friendly summary of a radiology report into {language}.
+        Keep its meaning, structure and {grade_level}th grade reading level, without adding or
+        leaving out any information.
+
+        Here is the summary:
+        ```
+        {simplified_text}
+        ```
+
+        Here are its key findings:
+        {findings}
+
+        First write ONLY the translated summary, without any introduction or explanatory notes.
+        Then write a line containing exactly {FINDINGS_MARKER} followed by the translated key
+        findings, one per line starting with "- ".
+        """
+
+    def translate_analysis(self, analysis: Dict[str, Any], language: str) -> Dict[str, Any]:
+        """
+        Translate a simplified report and its key findings into another language.
+        
+        Only the short simplified text goes to the model, not the original
+        report, so this is much cheaper than simplifying again.
+        
+        Args:
+            analysis: A successful analyze_report (or analyze_segmented_report) result
+            language: The language to translate into
+            
+        Returns:
+            The same dictionary as analyze_report, in the new language, plus
+            "translated_from" with the source language
+        """
+        target_audience = analysis.get("target_audience", "general")
+        grade_level = analysis.get("grade_level", 6)
+        key_findings = analysis.get("key_findings", [])
+        # Keyed on the simplified text, so each language is cached on its own
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(
+                "\n".join([analysis["simplified_text"], *key_findings]),
+                task="translate",
+                model=self.model_name,
+                source_language=analysis.get("language"),
+                grade_level=grade_level,
+                language=language
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {"original_text": analysis.get("original_text", ""), **cached, "cached": True}
+
+        prompt = self._build_translate_prompt(analysis["simplified_text"], key_findings, grade_level, language)
+        try:
+            started = time.perf_counter()
+            response = self.client.generate(prompt)
+            translation = parse_analysis(response.text)
+            if not translation["simplified_text"]:
+                raise ValueError("Model returned an empty translation")
+
+            result = {
+                "simplified_text": translation["simplified_text"],
+                "key_findings": translation["key_findings"],
+                "target_audience": target_audience,
+                "grade_level": grade_level,
+                "language": language,
+                "translated_from": analysis.get("language"),
+                "success": True
+            }
+            self._store_result(cache_key, result, started)
+            return {"original_text": analysis.get("original_text", ""), **result, "cached": False}
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "original_text": analysis.get("original_text", "")
+            }
+
+    def translate_analyses(self, analysis: Dict[str, Any], languages: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Translate a simplified report into several languages concurrently.
+        
+        Args:
+            analysis: A successful analyze_report (or analyze_segmented_report) result
+            languages: The languages to translate into
+            
+        Returns:
+            Each language's translate_analysis result, in the order given
+        """
+        futures = {language: self._segment_executor.submit(self.translate_analysis, analysis, language)
+                   for language in languages}
+        return {language: future.result() for language, future in futures.items()}
+
     def identify_key_findings(self, text: str) -> Dict[str, Any]:
         """
         Identify and extract key findings from a radiology report.
@@ -100,7 +664,7 @@ class RadiologyTextSimplifier:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self.client.generate(prompt)
             findings = response.text.strip()
             
             return {
@@ -0,0 +1,389 @@
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class PageImage(NamedTuple):
+    """
+    Raw pixel data for one rendered page, cheap to pickle to a worker process.
+    """
+    page_number: int
+    width: int
+    height: int
+    channels: int
+    samples: bytes
+    zoom: float = 2.0
+
+
+def render_page(page, zoom: float = 2.0, grayscale: bool = True) -> PageImage:
+    """
+    Rasterize a PyMuPDF page to raw samples without any image encoding.
+
+    Args:
+        page: A fitz.Page
+        zoom: Scale factor applied to the page (2 gives roughly 144 DPI)
+        grayscale: Render a single gray channel (a third of the bytes of RGB)
+
+    Returns:
+        The rendered PageImage
+    """
+    import fitz
+
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+    return PageImage(page.number, pix.width, pix.height, pix.n, pix.samples, zoom)
+
+
+def _write_pnm(path: str, image: PageImage) -> None:
+    # PNM is a plain header followed by the raw samples, so there is no
+    # compression step on our side and Leptonica reads it back directly.
+    magic = b'P5' if image.channels == 1 else b'P6'
+    with open(path, 'wb') as f:
+        f.write(b'%s\n%d %d\n255\n' % (magic, image.width, image.height))
+        f.write(image.samples)
+
+
+# Per-worker Tesseract state, set up once by _init_worker
+_worker_api = None
+_worker_lang = 'eng'
+_worker_cmd: Optional[str] = None
+_worker_preprocess = True
+
+
+def _init_worker(lang: str, tesseract_cmd: Optional[str], preprocess: bool = True,
+                 tessdata: Optional[str] = None) -> None:
+    """
+    Pool initializer: load the language data once per worker process.
+
+    Uses tesserocr's in-process API, so pages are recognized without
+    starting a tesseract process each time; falls back to pytesseract when
+    tesserocr or its language data is missing.
+    """
+    global _worker_api, _worker_lang, _worker_cmd, _worker_preprocess
+    # Each worker already owns a core; keep Tesseract's OpenMP from
+    # oversubscribing the machine.
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    _worker_lang = lang
+    _worker_cmd = tesseract_cmd
+    _worker_preprocess = preprocess
+    try:
+        import tesserocr
+
+        _worker_api = (tesserocr.PyTessBaseAPI(path=tessdata, lang=lang) if tessdata
+                       else tesserocr.PyTessBaseAPI(lang=lang))
+    except (ImportError, RuntimeError):
+        _worker_api = None
+
+
+def _ping() -> Dict[str, Any]:
+    """
+    Health probe executed inside a pool worker.
+    """
+    return {"pid": os.getpid(), "engine": "tesserocr" if _worker_api is not None else "pytesseract"}
+
+
+def _prepare(image: PageImage) -> Tuple[Optional[PageImage], Dict[str, Any]]:
+    """
+    Binarize, deskew and crop a grayscale page; other images pass through.
+    """
+    if not _worker_preprocess or image.channels != 1:
+        return image, {}
+    try:
+        from utils.ocr_preprocess import preprocess
+    except ImportError:
+        return image, {}
+    cleaned, info = preprocess(image.samples, image.width, image.height)
+    if cleaned is None:
+        return None, info
+    height, width = cleaned.shape
+    return image._replace(width=width, height=height, samples=cleaned.tobytes()), info
+
+
+def _recognize(image: PageImage) -> str:
+    dpi = int(round(72 * image.zoom))
+    if _worker_api is not None:
+        _worker_api.SetImageBytes(image.samples, image.width, image.height,
+                                  image.channels, image.width * image.channels)
+        _worker_api.SetSourceResolution(dpi)
+        try:
+            return _worker_api.GetUTF8Text()
+        finally:
+            _worker_api.Clear()
+
+    import pytesseract
+
+    if _worker_cmd:
+        pytesseract.pytesseract.tesseract_cmd = _worker_cmd
+    fd, path = tempfile.mkstemp(suffix='.pnm')
+    os.close(fd)
+    try:
+        _write_pnm(path, image)
+        return pytesseract.image_to_string(path, lang=_worker_lang, config=f'--dpi {dpi}')
+    finally:
+        os.remove(path)
+
+
+def _ocr_page(image: PageImage) -> Dict[str, Any]:
+    """
+    Clean up and recognize one page image. Executed inside a pool worker.
+
+    Returns:
+        The text plus the preprocessing settings and timings for the page
+    """
+    prepared, info = _prepare(image)
+    started = time.perf_counter()
+    text = _recognize(prepared) if prepared is not None else ""
+    return {"text": text, **info, "ocr_seconds": round(time.perf_counter() - started, 4)}
+
+
+class OCREngine:
+    """
+    Page-parallel OCR backed by a bounded pool of long-lived worker
+    processes shared across requests. Each worker keeps its Tesseract engine
+    loaded; a pool broken by a crashed worker is replaced and the affected
+    pages are retried once.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 per_document: Optional[int] = None,
+                 lang: str = 'eng',
+                 tesseract_cmd: Optional[str] = None,
+                 tessdata: Optional[str] = None,
+                 preprocess: bool = True,
+                 zoom: Optional[float] = None):
+        """
+        Initialize the OCREngine.
+
+        Args:
+            max_workers: Maximum concurrent Tesseract processes across all requests
+            per_document: Maximum pages of one document in flight at once, so a
+                large upload leaves workers free for other requests
+            lang: Tesseract language
+            tesseract_cmd: Path to the tesseract executable, if not on PATH
+            tessdata: Directory of the language data for tesserocr, if not its default
+            preprocess: Binarize, deskew and crop grayscale pages before recognition
+            zoom: Fixed rasterization scale factor for every page; chosen per
+                page from the detected text size when None
+        """
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.per_document = per_document or max(1, (self.max_workers + 1) // 2)
+        self.lang = lang
+        self.tesseract_cmd = tesseract_cmd
+        self.tessdata = tessdata
+        self.preprocess = preprocess
+        self.zoom = zoom
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.restarts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self.lang, self.tesseract_cmd, self.preprocess, self.tessdata)
+                )
+            return self._pool
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """
+        Replace the pool if it is still the broken one (another thread may
+        have restarted it already).
+        """
+        with self._pool_lock:
+            if self._pool is not broken:
+                return
+            self._pool = None
+            self.restarts += 1
+        broken.shutdown(wait=False)
+
+    def _submit(self, image: PageImage):
+        """
+        Submit one page, returning the pool it went to and its future.
+        """
+        self._slots.acquire()
+        try:
+            pool = self._get_pool()
+            try:
+                future = pool.submit(_ocr_page, image)
+            except BrokenProcessPool:
+                self._restart(pool)
+                pool = self._get_pool()
+                future = pool.submit(_ocr_page, image)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return pool, future
+
+    def _result(self, image: PageImage, submitted) -> Dict[str, Any]:
+        pool, future = submitted
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed or crashed in Tesseract); retry once on a fresh pool
+            self._restart(pool)
+            pool, future = self._submit(image)
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                # The page itself kills workers; leave a fresh pool for the next request
+                self._restart(pool)
+                raise
+
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Start every worker now so the first request does not pay for process
+        start-up and language data loading.
+        """
+        return self.health()
+
+    def health(self, timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        Ping the workers, restarting the pool if it is broken.
+
+        Returns:
+            Whether the pool answered, the engine in use and the worker pids
+        """
+        pool = self._get_pool()
+        try:
+            futures = [pool.submit(_ping) for _ in range(self.max_workers)]
+            done, not_done = wait(futures, timeout=timeout)
+            pings = [future.result() for future in done]
+        except BrokenProcessPool as e:
+            self._restart(pool)
+            return {"healthy": False, "error": str(e) or "OCR worker pool was broken", "restarts": self.restarts}
+        if not_done:
+            # Busy or hung workers: report it, but do not discard in-flight pages
+            return {"healthy": False, "error": f"OCR workers did not answer within {timeout}s",
+                    "restarts": self.restarts}
+        return {
+            "healthy": True,
+            "engine": pings[0]["engine"],
+            "workers": sorted({ping["pid"] for ping in pings}),
+            "restarts": self.restarts
+        }
+
+    def ocr_images(self, images: Sequence[PageImage]) -> List[str]:
+        """
+        OCR a sequence of page images in parallel.
+
+        Args:
+            images: Rendered pages
+
+        Returns:
+            Recognized text for each image, in input order
+        """
+        return [page["text"] for page in self._run(iter(images), len(images))]
+
+    def ocr_document(self,
+                     doc,
+                     page_numbers: Optional[Sequence[int]] = None,
+                     zoom: Optional[float] = None) -> List[str]:
+        """
+        Render and OCR pages of an open PyMuPDF document.
+
+        Args:
+            doc: An open fitz.Document
+            page_numbers: Pages to OCR (all pages if omitted)
+            zoom: Fixed rasterization scale factor; chosen per page from the
+                detected text size if omitted
+
+        Returns:
+            Recognized text for each requested page, in page order
+        """
+        texts, _ = self.ocr_document_report(doc, page_numbers, zoom)
+        return texts
+
+    def ocr_document_report(self,
+                            doc,
+                            page_numbers: Optional[Sequence[int]] = None,
+                            zoom: Optional[float] = None) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Like ocr_document, but also report the settings chosen for each page
+        (zoom, DPI, detected line height, threshold, deskew angle, crop box)
+        and its render, preprocess and recognition times.
+
+        Rendering happens in the calling thread and overlaps with recognition
+        of pages already submitted.
+        """
+        if page_numbers is None:
+            page_numbers = range(len(doc))
+        rendering: Dict[int, Dict[str, Any]] = {}
+
+        def images():
+            for n in page_numbers:
+                started = time.perf_counter()
+                page = doc.load_page(n)
+                settings = {"page": n + 1}
+                page_zoom = zoom if zoom is not None else self.zoom
+                if page_zoom is None:
+                    from utils.ocr_preprocess import choose_zoom
+
+                    page_zoom, line_height, source = choose_zoom(page)
+                    settings.update(line_height_pt=line_height, zoom_source=source)
+                image = render_page(page, page_zoom, grayscale=self.preprocess)
+                settings.update(zoom=page_zoom, dpi=int(round(72 * page_zoom)),
+                                render_seconds=round(time.perf_counter() - started, 4))
+                rendering[n] = settings
+                yield image
+
+        pages = self._run(images(), len(page_numbers))
+        report = [{**rendering[n], **{k: v for k, v in page.items() if k != "text"}}
+                  for n, page in zip(page_numbers, pages)]
+        return [page["text"] for page in pages], report
+
+    def _run(self, images, count: int) -> List[Dict[str, Any]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * count
+        pending = deque()
+        for index, image in enumerate(images):
+            if len(pending) >= self.per_document:
+                done_index, done_image, submitted = pending.popleft()
+                results[done_index] = self._result(done_image, submitted)
+            pending.append((index, image, self._submit(image)))
+        for done_index, done_image, submitted in pending:
+            results[done_index] = self._result(done_image, submitted)
+        return results
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+_default_engine: Optional[OCREngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """
+    Return the process-wide OCREngine, creating it on first use.
+
+    Worker count and per-document window come from the OCR_WORKERS and
+    OCR_PAGES_PER_DOCUMENT environment variables; OCR_PREPROCESS=0 turns
+    off page cleanup and OCR_ZOOM fixes the rasterization scale.
+    """
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            from utils.capabilities import probe_ocr
+
+            probe = probe_ocr()
+            _default_engine = OCREngine(
+                max_workers=int(os.environ.get('OCR_WORKERS', 0)) or None,
+                per_document=int(os.environ.get('OCR_PAGES_PER_DOCUMENT', 0)) or None,
+                tesseract_cmd=probe['tesseract_cmd'],
+                tessdata=probe['tessdata'],
+                preprocess=os.environ.get('OCR_PREPROCESS', '1') != '0',
+                zoom=float(os.environ.get('OCR_ZOOM', 0)) or None
+            )
+        return _default_engine
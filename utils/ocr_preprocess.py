@@ -0,0 +1,197 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Tesseract is most accurate when a line of text is roughly this many pixels tall
+TARGET_LINE_PIXELS = 32
+MIN_ZOOM = 1.0
+MAX_ZOOM = 4.0
+DEFAULT_ZOOM = 2.0
+# Preview used to measure line height on pages without a text layer
+PREVIEW_ZOOM = 1.0
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.25
+CROP_MARGIN = 12
+
+
+def text_layer_line_height(page) -> Optional[float]:
+    """
+    Median font size (in points) of a page's text layer, if it has one.
+    """
+    sizes = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            sizes.extend(span["size"] for span in line["spans"] if span["text"].strip())
+    if not sizes:
+        return None
+    sizes.sort()
+    return sizes[len(sizes) // 2]
+
+
+def measure_line_height(gray, strips: int = 8) -> Optional[float]:
+    """
+    Estimate the typical text line height, in pixels, from horizontal
+    projection profiles of a grayscale image.
+
+    Profiles are taken over narrow vertical strips so that slightly skewed
+    lines do not smear into one another.
+    """
+    import numpy as np
+
+    ink = gray <= otsu_threshold(gray)
+    runs = []
+    for strip in np.array_split(ink, strips, axis=1):
+        rows = strip.mean(axis=1) > 0.02
+        # Lengths of consecutive runs of inked rows
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+        runs.append(edges[1::2] - edges[::2])
+    runs = np.concatenate(runs)
+    runs = runs[runs >= 2]
+    if not len(runs):
+        return None
+    return float(np.median(runs))
+
+
+def choose_zoom(page) -> Tuple[float, Optional[float], str]:
+    """
+    Pick a rasterization zoom so text lines come out about
+    TARGET_LINE_PIXELS tall, instead of rendering every page at one scale.
+
+    Returns:
+        The zoom, the detected line height in points (None if unknown) and
+        where it came from ("text_layer", "preview" or "default")
+    """
+    line_height = text_layer_line_height(page)
+    source = "text_layer"
+    if line_height is None:
+        import fitz
+
+        pix = page.get_pixmap(matrix=fitz.Matrix(PREVIEW_ZOOM, PREVIEW_ZOOM), colorspace=fitz.csGRAY, alpha=False)
+        preview = _as_array(pix.samples, pix.width, pix.height)
+        measured = measure_line_height(preview)
+        line_height = measured / PREVIEW_ZOOM if measured else None
+        source = "preview"
+    if not line_height:
+        return DEFAULT_ZOOM, None, "default"
+    zoom = min(MAX_ZOOM, max(MIN_ZOOM, TARGET_LINE_PIXELS / line_height))
+    return round(zoom, 2), round(line_height, 1), source
+
+
+def _as_array(samples: bytes, width: int, height: int):
+    import numpy as np
+
+    return np.frombuffer(samples, dtype=np.uint8).reshape(height, width)
+
+
+def otsu_threshold(gray) -> int:
+    """
+    Otsu's global threshold, computed for all 256 levels at once.
+    """
+    import numpy as np
+
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    if not total:
+        return 127
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_bg = cum_mean / weight_bg
+        mean_fg = (cum_mean[-1] - cum_mean) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    if np.isnan(variance).all():
+        # A single gray level: nothing to separate
+        return 127
+    return int(np.nanargmax(variance))
+
+
+def estimate_skew(ink, max_degrees: float = MAX_SKEW_DEGREES, step: float = SKEW_STEP_DEGREES) -> float:
+    """
+    Estimate, from a boolean ink mask, the counter-clockwise rotation in
+    degrees that levels the text lines.
+
+    For each candidate angle the ink pixels are sheared onto rows; the
+    angle whose row histogram is sharpest (text lines line up) wins. All
+    angles are scored with a single bincount.
+    """
+    import numpy as np
+
+    # A sparse sample of ink pixels is plenty for a projection profile
+    ys, xs = np.nonzero(ink[::2, ::2])
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > 200000:
+        keep = np.random.default_rng(0).choice(len(ys), 200000, replace=False)
+        ys, xs = ys[keep], xs[keep]
+    angles = np.arange(-max_degrees, max_degrees + step / 2, step)
+    slopes = np.tan(np.radians(angles))
+    shifted = np.rint(ys[None, :] - xs[None, :] * slopes[:, None]).astype(np.int64)
+    shifted -= shifted.min()
+    span = int(shifted.max()) + 1
+    offsets = (np.arange(len(angles)) * span)[:, None]
+    hist = np.bincount((shifted + offsets).ravel(), minlength=span * len(angles)).reshape(len(angles), span)
+    scores = (hist.astype(np.float64) ** 2).sum(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+
+def crop_to_text(binary, margin: int = CROP_MARGIN):
+    """
+    Crop a binarized image (0 = ink, 255 = paper) to the region holding ink,
+    ignoring isolated specks along the edges.
+
+    Returns:
+        The cropped image and its (left, top, right, bottom) box, or
+        (None, None) when the page is blank
+    """
+    import numpy as np
+
+    ink = binary == 0
+    height, width = ink.shape
+    rows = np.flatnonzero(ink.sum(axis=1) > max(2, width // 500))
+    cols = np.flatnonzero(ink.sum(axis=0) > max(2, height // 500))
+    if not len(rows) or not len(cols):
+        return None, None
+    top, bottom = max(0, rows[0] - margin), min(height, rows[-1] + margin + 1)
+    left, right = max(0, cols[0] - margin), min(width, cols[-1] + margin + 1)
+    return binary[top:bottom, left:right], (int(left), int(top), int(right), int(bottom))
+
+
+def preprocess(samples: bytes, width: int, height: int) -> Tuple[Optional[Any], Dict[str, Any]]:
+    """
+    Binarize, deskew and crop a grayscale page for OCR.
+
+    Args:
+        samples: 8-bit grayscale pixels
+        width: Image width
+        height: Image height
+
+    Returns:
+        The cleaned image as a contiguous uint8 array (None for a blank page)
+        and a dictionary describing what was done
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    gray = _as_array(samples, width, height)
+    threshold = otsu_threshold(gray)
+    ink = gray <= threshold
+    skew = estimate_skew(ink)
+    binary = np.where(ink, 0, 255).astype(np.uint8)
+    if skew:
+        from PIL import Image
+
+        # The winning angle is the rotation that levels the text lines
+        binary = np.asarray(Image.fromarray(binary).rotate(
+            skew, resample=Image.NEAREST, expand=True, fillcolor=255))
+    cropped, box = crop_to_text(binary)
+    info = {
+        "threshold": threshold,
+        "deskew_degrees": skew,
+        "crop": box,
+        "size": [width, height],
+        "preprocess_seconds": round(time.perf_counter() - started, 4)
+    }
+    if cropped is None:
+        return None, info
+    return np.ascontiguousarray(cropped), info
@@ -2,10 +2,9 @@
 # Add this to your app.py or create a separate utils/pdf_processor.py
 
 import os
-import fitz  # PyMuPDF
-from PIL import Image
-import io
-import tempfile
+
+from utils.compaction import PAGE_BREAK
+from utils.metrics import REPORT_PAGES, record_stage
 
 def extract_text_from_file_enhanced(file_path):
     """
@@ -37,47 +36,109 @@ def extract_text_from_file_enhanced(file_path):
     except Exception as e:
         raise ValueError(f"Failed to extract text from {extension.upper()} file: {str(e)}")
 
-def extract_pdf_text_with_ocr(file_path):
+# Pages with fewer native characters than this are treated as scanned,
+# provided images cover at least MIN_SCAN_COVERAGE of them; a short or blank
+# page without a sizeable image has nothing for OCR to read
+MIN_TEXT_CHARS = 50
+MIN_SCAN_COVERAGE = 0.1
+# Pages mostly covered by images are OCR'd unless they carry a substantial text layer
+IMAGE_COVERAGE_THRESHOLD = 0.6
+IMAGE_PAGE_MIN_TEXT_CHARS = 200
+
+def page_image_coverage(page):
     """
-    Extract text from PDF with OCR fallback for image-based PDFs.
+    Fraction of the page area covered by embedded images (0.0 - 1.0).
     """
-    text = ""
-    
-    # Method 1: Try standard text extraction first
-    try:
-        from PyPDF2 import PdfReader
-        reader = PdfReader(file_path)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        
-        if text.strip():
-            print("✓ Successfully extracted text using PyPDF2")
-            return text.strip()
-    except Exception as e:
-        print(f"PyPDF2 extraction failed: {e}")
-    
-    # Method 2: Try pdfplumber
+    import fitz  # PyMuPDF
+
+    page_rect = page.rect
+    page_area = abs(page_rect)
+    if not page_area:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        covered += abs(fitz.Rect(info["bbox"]) & page_rect)
+    return min(covered / page_area, 1.0)
+
+def page_needs_ocr(page, text):
+    """
+    Decide whether a page should be OCR'd instead of using its text layer.
+    """
+    chars = len(text.strip())
+    if chars >= IMAGE_PAGE_MIN_TEXT_CHARS:
+        return False
+    coverage = page_image_coverage(page)
+    if chars < MIN_TEXT_CHARS:
+        return coverage >= MIN_SCAN_COVERAGE
+    return coverage >= IMAGE_COVERAGE_THRESHOLD
+
+def open_pdf(source):
+    """
+    Open a PDF from a path, its bytes or a binary file object.
+    """
+    import fitz  # PyMuPDF
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    if hasattr(source, 'read'):
+        return fitz.open(stream=source.read(), filetype="pdf")
+    return fitz.open(source)
+
+def extract_pdf_pages(source, ocr=True, report=None):
+    """
+    Extract text per page, reading the native text layer where it is usable
+    and OCR'ing only the pages that look scanned.
+
+    Args:
+        source: Path to the PDF, or its bytes (no temp file needed)
+        ocr: Whether OCR may be used for scanned pages
+        report: Optional list extended with the settings and timings of
+            each OCR'd page
+
+    Returns:
+        A list with the text of each page, in page order
+    """
+    doc = open_pdf(source)
     try:
-        import pdfplumber
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        
-        if text.strip():
-            print("✓ Successfully extracted text using pdfplumber")
-            return text.strip()
-    except ImportError:
-        print("pdfplumber not installed")
-    except Exception as e:
-        print(f"pdfplumber extraction failed: {e}")
-    
-    # Method 3: OCR fallback using PyMuPDF + Tesseract
-    print("Standard PDF extraction failed, attempting OCR...")
-    return extract_pdf_with_ocr(file_path)
+        pages = []
+        scanned = []
+        for page in doc:
+            page_text = page.get_text()
+            if ocr and page_needs_ocr(page, page_text):
+                scanned.append(page.number)
+            pages.append(page_text)
+
+        if scanned:
+            from utils.ocr import get_ocr_engine
+
+            texts, ocr_report = get_ocr_engine().ocr_document_report(doc, scanned)
+            for page_num, page_text in zip(scanned, texts):
+                pages[page_num] = page_text
+            print(f"✓ Text layer used for {len(pages) - len(scanned)} page(s), OCR for {len(scanned)} page(s)")
+            for page in ocr_report:
+                record_stage('ocr_page', page['render_seconds'] + page.get('preprocess_seconds', 0) + page['ocr_seconds'])
+                print(f"  page {page['page']}: {page['dpi']} DPI, "
+                      f"deskew {page.get('deskew_degrees', 0)}°, "
+                      f"render {page['render_seconds']}s, "
+                      f"preprocess {page.get('preprocess_seconds', 0)}s, "
+                      f"OCR {page['ocr_seconds']}s")
+            if report is not None:
+                report.extend(ocr_report)
+        REPORT_PAGES.observe(len(pages) - len(scanned), source='text_layer')
+        REPORT_PAGES.observe(len(scanned), source='ocr')
+    finally:
+        doc.close()
+    return [page_text.strip() for page_text in pages]
+
+def extract_pdf_text_with_ocr(source, ocr=True):
+    """
+    Extract text from PDF (a path or bytes) with per-page OCR fallback for
+    image-based pages.
+    """
+    text = PAGE_BREAK.join(page_text for page_text in extract_pdf_pages(source, ocr=ocr) if page_text)
+    if not text:
+        raise ValueError("No text could be extracted from the PDF")
+    return text
 
 def extract_pdf_with_ocr(file_path):
     """
@@ -86,32 +147,27 @@ def extract_pdf_with_ocr(file_path):
     And Tesseract OCR installed on system.
     """
     try:
+        import fitz  # PyMuPDF
         import pytesseract
         
         # For Windows, you might need to specify tesseract path
         # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
         
-        # Open PDF with PyMuPDF
+        from utils.ocr import get_ocr_engine
+        
+        # Open PDF with PyMuPDF and OCR all pages in parallel
         doc = fitz.open(file_path)
         text = ""
         
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            
-            # Convert page to image
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better OCR
-            img_data = pix.tobytes("png")
-            
-            # Convert to PIL Image
-            img = Image.open(io.BytesIO(img_data))
-            
-            # Perform OCR
-            page_text = pytesseract.image_to_string(img, lang='eng')
+        try:
+            pages = get_ocr_engine().ocr_document(doc)
+        finally:
+            doc.close()
+        
+        for page_num, page_text in enumerate(pages):
             text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
-            
-            print(f"✓ OCR completed for page {page_num + 1}")
         
-        doc.close()
+        print(f"✓ OCR completed for {len(pages)} page(s)")
         
         if text.strip():
             print("✓ Successfully extracted text using OCR")
@@ -164,6 +220,7 @@ def extract_pdf_with_google_vision(file_path, credentials_path=None):
     Requires: pip install google-cloud-vision
     """
     try:
+        import fitz  # PyMuPDF
         from google.cloud import vision
         import os
         
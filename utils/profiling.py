@@ -0,0 +1,95 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+
+class _Session:
+    __slots__ = ('thread_id', 'stacks', 'stop', 'sampler')
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.stop = threading.Event()
+        self.sampler: Optional[threading.Thread] = None
+
+
+class SlowRequestProfiler:
+    """
+    Sampling profiler for slow requests: while a sampled request runs, a
+    helper thread records its call stack every interval. If the request
+    turns out slower than the threshold, the stacks are written in the
+    collapsed format read by flamegraph.pl and speedscope; otherwise they
+    are discarded.
+    """
+
+    def __init__(self,
+                 threshold: float,
+                 sample_rate: float = 1.0,
+                 interval: float = 0.005,
+                 output_dir: str = 'profiles',
+                 on_slow: Optional[Callable[[str, float, str], None]] = None):
+        """
+        Initialize the SlowRequestProfiler.
+
+        Args:
+            threshold: Seconds above which a request's profile is kept
+            sample_rate: Fraction of requests profiled
+            interval: Seconds between stack samples
+            output_dir: Where profiles are written
+            on_slow: Optional callback(path, seconds, label) for each kept profile
+        """
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.output_dir = output_dir
+        self.on_slow = on_slow
+
+    def start(self) -> Optional[_Session]:
+        """
+        Start sampling the calling thread, if this request is sampled.
+        """
+        if random.random() >= self.sample_rate:
+            return None
+        session = _Session(threading.get_ident())
+        session.sampler = threading.Thread(target=self._sample, args=(session,), name='profiler', daemon=True)
+        session.sampler.start()
+        return session
+
+    def _sample(self, session: _Session) -> None:
+        while not session.stop.wait(self.interval):
+            frame = sys._current_frames().get(session.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            session.stacks[';'.join(reversed(stack))] += 1
+
+    def finish(self, session: Optional[_Session], seconds: float, label: str) -> Optional[str]:
+        """
+        Stop sampling and keep the profile if the request was slow.
+
+        Returns:
+            Path of the written profile, or None
+        """
+        if session is None:
+            return None
+        session.stop.set()
+        session.sampler.join()
+        if seconds < self.threshold or not session.stacks:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in label)
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{int(seconds * 1000)}ms.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in session.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        if self.on_slow:
+            self.on_slow(path, seconds, label)
+        return path
@@ -0,0 +1,149 @@
+import math
+import os
+from concurrent.futures import Executor
+from typing import Optional, Sequence, Tuple, Union
+
+ImageSource = Union[str, bytes]
+
+
+def decode_image(image: ImageSource):
+    """
+    Decode an image file path or encoded bytes to an RGB uint8 array.
+    """
+    import cv2
+    import numpy as np
+
+    if isinstance(image, str):
+        if not os.path.exists(image):
+            raise FileNotFoundError(f"File not found: {image}")
+        decoded = cv2.imread(image, cv2.IMREAD_COLOR)
+    else:
+        decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if decoded is None:
+        raise ValueError("Could not read image")
+    return cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB)
+
+
+def letterbox_geometry(height: int, width: int, target_height: int, target_width: int) -> Tuple[int, int, int, int]:
+    """
+    Resized size and top/left padding exactly as tf.image.resize_with_pad
+    computes them.
+
+    Returns:
+        (resized_height, resized_width, pad_top, pad_left)
+    """
+    import numpy as np
+
+    # TensorFlow does this arithmetic in float32; doing the same keeps the
+    # floor() below landing on the same pixel
+    f32 = np.float32
+    ratio = max(f32(width) / f32(target_width), f32(height) / f32(target_height))
+    resized_height_float = f32(height) / ratio
+    resized_width_float = f32(width) / ratio
+    resized_height = int(math.floor(resized_height_float))
+    resized_width = int(math.floor(resized_width_float))
+    pad_top = max(0, int(math.floor((f32(target_height) - resized_height_float) / f32(2))))
+    pad_left = max(0, int(math.floor((f32(target_width) - resized_width_float) / f32(2))))
+    return resized_height, resized_width, pad_top, pad_left
+
+
+def letterbox_into(image, out) -> None:
+    """
+    Aspect-safe resize of an RGB uint8 image into out, a preallocated
+    float32 (height, width, 3) buffer, zero-padded and scaled to [0, 1].
+
+    Matches tf.image.resize_with_pad (bilinear, half-pixel centers, no
+    antialiasing) followed by division by 255.
+    """
+    import cv2
+    import numpy as np
+
+    target_height, target_width = out.shape[:2]
+    resized_height, resized_width, top, left = letterbox_geometry(
+        image.shape[0], image.shape[1], target_height, target_width)
+    out.fill(0.0)
+    if not resized_height or not resized_width:
+        # A sliver thinner than one output pixel: nothing but padding
+        return
+    # Resizing in float32 avoids the rounding cv2 applies to uint8 output
+    resized = cv2.resize(image.astype(np.float32), (resized_width, resized_height),
+                         interpolation=cv2.INTER_LINEAR)
+    np.multiply(resized, np.float32(1.0 / 255.0),
+                out=out[top:top + resized_height, left:left + resized_width])
+
+
+def preprocess_image(image: ImageSource, size: Tuple[int, int] = (224, 224), out=None):
+    """
+    Decode and letterbox one image.
+
+    Args:
+        image: File path or encoded bytes
+        size: (height, width) of the model input
+        out: Optional float32 buffer of shape (height, width, 3) to fill
+
+    Returns:
+        The filled float32 (height, width, 3) array
+    """
+    import numpy as np
+
+    if out is None:
+        out = np.empty((size[0], size[1], 3), dtype=np.float32)
+    letterbox_into(decode_image(image), out)
+    return out
+
+
+def preprocess_batch(images: Sequence[ImageSource],
+                     size: Tuple[int, int] = (224, 224),
+                     out=None,
+                     executor: Optional[Executor] = None):
+    """
+    Decode and letterbox many images straight into one batch buffer.
+
+    OpenCV releases the GIL while decoding and resizing, so passing a
+    thread pool executor processes images in parallel.
+
+    Args:
+        images: File paths or encoded bytes
+        size: (height, width) of the model input
+        out: Optional float32 buffer with at least len(images) rows
+        executor: Optional executor to spread the work over
+
+    Returns:
+        The (len(images), height, width, 3) float32 batch (a view of out)
+    """
+    import numpy as np
+
+    if out is None:
+        out = np.empty((len(images), size[0], size[1], 3), dtype=np.float32)
+    batch = out[:len(images)]
+    if executor is None:
+        for index, image in enumerate(images):
+            preprocess_image(image, size, out=batch[index])
+    else:
+        futures = [executor.submit(preprocess_image, image, size, batch[index])
+                   for index, image in enumerate(images)]
+        for future in futures:
+            future.result()
+    return batch
+
+
+def reference_preprocess(image: ImageSource, size: Tuple[int, int] = (224, 224)):
+    """
+    The original TensorFlow preprocessing, kept to check the NumPy/OpenCV
+    path against (see max_preprocess_difference).
+    """
+    import tensorflow as tf
+
+    tensor = tf.convert_to_tensor(decode_image(image), dtype=tf.float32)
+    tensor = tf.image.resize_with_pad(tensor, size[0], size[1])
+    return (tensor / 255.0).numpy()
+
+
+def max_preprocess_difference(image: ImageSource, size: Tuple[int, int] = (224, 224)) -> float:
+    """
+    Largest absolute difference between preprocess_image and the original
+    TensorFlow path for one image.
+    """
+    import numpy as np
+
+    return float(np.abs(preprocess_image(image, size) - reference_preprocess(image, size)).max())
@@ -0,0 +1,147 @@
+import re
+from typing import List, NamedTuple, Optional
+
+# Standard radiology report sections and the headings that introduce them
+SECTION_ALIASES = {
+    "history": ["CLINICAL HISTORY", "CLINICAL INDICATION", "CLINICAL INFORMATION", "HISTORY",
+                "INDICATION", "INDICATIONS", "REASON FOR EXAM", "REASON FOR EXAMINATION"],
+    "technique": ["TECHNIQUE", "PROCEDURE", "PROTOCOL"],
+    "comparison": ["COMPARISON", "COMPARISONS", "PRIOR STUDIES", "PRIORS"],
+    "findings": ["FINDINGS", "FINDING", "REPORT", "DESCRIPTION"],
+    "impression": ["IMPRESSION", "IMPRESSIONS", "CONCLUSION", "CONCLUSIONS", "SUMMARY",
+                   "OPINION", "RECOMMENDATION", "RECOMMENDATIONS"],
+    # The study name and contrast use; kept with the next section so the model knows what was scanned
+    "other": ["EXAMINATION", "EXAM", "CONTRAST"],
+}
+SECTION_BY_HEADING = {alias: kind for kind, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+SECTION_HEADING = re.compile(
+    r'^\s*(' + '|'.join(sorted((re.escape(a) for a in SECTION_BY_HEADING), key=len, reverse=True)) +
+    r')\s*(?::|-|$)\s*(.*)$',
+    re.IGNORECASE
+)
+# "Lungs:", "LIVER:", "Abdomen/Pelvis -" style organ or region labels inside FINDINGS
+SUBSECTION_HEADING = re.compile(r'^\s*([A-Za-z][A-Za-z /&,()-]{1,40}?)\s*:\s*(.*)$')
+
+# Reports shorter than this are simplified in one call
+DEFAULT_MIN_SEGMENT_CHARS = 1500
+# Adjacent sections of the same kind are merged into one model call up to this size
+DEFAULT_MAX_SEGMENT_CHARS = 1200
+
+
+class Segment(NamedTuple):
+    """
+    A contiguous part of a report.
+    """
+    kind: str
+    title: str
+    text: str
+
+
+def segment_report(text: str, split_findings: bool = True) -> List[Segment]:
+    """
+    Split a radiology report into its standard sections, and FINDINGS into
+    per-organ subsections.
+
+    Text before the first recognized heading becomes an "other" segment.
+
+    Args:
+        text: The report text
+        split_findings: Whether to split FINDINGS at organ/region labels
+
+    Returns:
+        Segments in report order (a single "other" segment if no headings match)
+    """
+    segments: List[Segment] = []
+    kind, title, lines = "other", "", []
+    has_body = False
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            segments.append(Segment(kind, title, body))
+
+    for line in text.splitlines():
+        match = SECTION_HEADING.match(line)
+        if match:
+            flush()
+            kind = SECTION_BY_HEADING[match.group(1).upper()]
+            title, lines = match.group(1).upper(), [line.strip()]
+            has_body = bool(match.group(2).strip())
+            continue
+        sub = SUBSECTION_HEADING.match(line) if split_findings and kind == "findings" else None
+        if sub:
+            # A label straight after the FINDINGS heading keeps the heading with it
+            if has_body:
+                flush()
+                lines = []
+            title = f"FINDINGS - {sub.group(1).strip().upper()}"
+        lines.append(line)
+        has_body = has_body or bool(line.strip())
+    flush()
+    return segments
+
+
+def merge_short_segments(segments: List[Segment], min_chars: int = 80,
+                         skip_kinds: frozenset = frozenset(),
+                         max_chars: int = DEFAULT_MAX_SEGMENT_CHARS) -> List[Segment]:
+    """
+    Reduce the number of model calls for a segmented report:
+
+    - "other" segments that are very short or start with a heading (an
+      exam title line, "EXAM: CT CHEST") are folded into the next segment
+      that will actually be simplified
+    - adjacent segments of the same kind, such as one-line organ
+      subsections of FINDINGS, are merged while the result stays within
+      max_chars
+
+    Args:
+        segments: Segments from segment_report
+        min_chars: "other" segments shorter than this are folded forward
+        skip_kinds: Section kinds that are not sent to the model, never merged
+        max_chars: Size budget for a merged segment
+
+    Returns:
+        The merged segments in report order
+    """
+    merged: List[Segment] = []
+    carry = ""
+    for segment in segments:
+        if segment.kind == "other" and (segment.title or len(segment.text) < min_chars):
+            carry = f"{carry}\n{segment.text}".strip()
+            continue
+        if carry and segment.kind not in skip_kinds:
+            segment = segment._replace(text=f"{carry}\n{segment.text}")
+            carry = ""
+        previous = merged[-1] if merged else None
+        if (previous and previous.kind == segment.kind and segment.kind not in skip_kinds
+                and len(previous.text) + 1 + len(segment.text) <= max_chars):
+            title = previous.title if previous.title == segment.title else previous.title.split(" - ")[0]
+            merged[-1] = Segment(previous.kind, title, f"{previous.text}\n{segment.text}")
+            continue
+        merged.append(segment)
+    if carry:
+        merged.append(Segment("other", "", carry))
+    return merged
+
+
+def is_long_report(text: str, min_chars: int = DEFAULT_MIN_SEGMENT_CHARS) -> bool:
+    """
+    Whether a report is long enough, and structured enough, to be worth
+    simplifying section by section.
+    """
+    if len(text) < min_chars:
+        return False
+    return len(segment_report(text)) > 1
+
+
+def summary_segment_index(segments: List[Segment]) -> Optional[int]:
+    """
+    Index of the segment that best summarizes the report (the last
+    IMPRESSION, else the last FINDINGS segment), used for key findings.
+    """
+    for wanted in ("impression", "findings"):
+        for index in range(len(segments) - 1, -1, -1):
+            if segments[index].kind == wanted:
+                return index
+    return None
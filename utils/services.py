@@ -0,0 +1,124 @@
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class _Service:
+    __slots__ = ('factory', 'warm_up', 'shutdown', 'instance', 'created', 'error', 'seconds', 'warm_up_seconds', 'lock')
+
+    def __init__(self, factory: Callable[[], Any], warm_up: Optional[Callable[[Any], Any]],
+                 shutdown: Optional[Callable[[Any], Any]]):
+        self.factory = factory
+        self.warm_up = warm_up
+        self.shutdown = shutdown
+        self.instance = None
+        self.created = False
+        self.error = None
+        self.seconds = None
+        self.warm_up_seconds = None
+        self.lock = threading.Lock()
+
+
+class ServiceRegistry:
+    """
+    Creates heavy services (and imports their dependencies) on first use
+    instead of at import time, with optional warm-up hooks that a server
+    can run explicitly, e.g. once per worker after it starts.
+
+    A factory may return None when its service is unavailable; a factory
+    that raises is recorded as failed and not retried.
+    """
+
+    def __init__(self):
+        self._services: Dict[str, _Service] = {}
+        self._created_at = time.perf_counter()
+
+    def register(self, name: str, factory: Callable[[], Any],
+                 warm_up: Optional[Callable[[Any], Any]] = None,
+                 shutdown: Optional[Callable[[Any], Any]] = None) -> None:
+        """
+        Register a service.
+
+        Args:
+            name: Service name
+            factory: Builds the service (imports go inside it)
+            warm_up: Optional hook run on the instance by warm_up()
+            shutdown: Optional hook run on the instance by shutdown()
+        """
+        self._services[name] = _Service(factory, warm_up, shutdown)
+
+    def get(self, name: str) -> Any:
+        """
+        Return the service, creating it on first use.
+        """
+        service = self._services[name]
+        if service.created:
+            return service.instance
+        with service.lock:
+            if not service.created:
+                started = time.perf_counter()
+                try:
+                    service.instance = service.factory()
+                except Exception as e:
+                    service.error = f"{type(e).__name__}: {e}"
+                    print(f"⚠️ Service '{name}' unavailable: {service.error}")
+                    if not isinstance(e, ImportError):
+                        traceback.print_exc()
+                service.seconds = time.perf_counter() - started
+                service.created = True
+        return service.instance
+
+    def loaded(self, name: str) -> bool:
+        return self._services[name].created
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Create the named services (all of them if names is None) and run
+        their warm-up hooks.
+
+        Returns:
+            The startup report
+        """
+        for name in (names if names is not None else list(self._services)):
+            service = self._services[name]
+            instance = self.get(name)
+            if instance is None or service.warm_up is None or service.warm_up_seconds is not None:
+                continue
+            started = time.perf_counter()
+            try:
+                service.warm_up(instance)
+            except Exception as e:
+                print(f"⚠️ Warm-up of '{name}' failed: {e}")
+            service.warm_up_seconds = time.perf_counter() - started
+        return self.report()
+
+    def shutdown(self) -> None:
+        """
+        Release every service that was created, in reverse registration
+        order. Services are created afresh if used again afterwards.
+        """
+        for name, service in reversed(list(self._services.items())):
+            with service.lock:
+                instance, service.instance, service.created = service.instance, None, False
+                service.warm_up_seconds = None
+            if instance is None or service.shutdown is None:
+                continue
+            try:
+                service.shutdown(instance)
+            except Exception as e:
+                print(f"⚠️ Shutdown of '{name}' failed: {e}")
+
+    def report(self) -> Dict[str, Any]:
+        """
+        What has been loaded so far and how long each step took.
+        """
+        services = {}
+        for name, service in self._services.items():
+            services[name] = {
+                "loaded": service.created and service.instance is not None,
+                "seconds": round(service.seconds, 3) if service.seconds is not None else None,
+                "warm_up_seconds": round(service.warm_up_seconds, 3) if service.warm_up_seconds is not None else None,
+                "error": service.error
+            }
+        return {"services": services, "uptime_seconds": round(time.perf_counter() - self._created_at, 3)}
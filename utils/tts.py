@@ -1,29 +1,222 @@
+import contextvars
 import os
-from gtts import gTTS
-from typing import Dict, Any, Optional
-import uuid
+import queue
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional
+
+from utils.audio_store import AudioStore, audio_key
+from utils.tts_backends import GTTSBackend, SpeechBackend
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+SECTION_BREAK = re.compile(r'\n\s*\n')
+
+class SpeechChunker:
+    """
+    Incremental form of split_text_for_speech: text is fed as it is
+    generated and each chunk is returned once it can no longer grow, so
+    fed pieces produce exactly the chunks the whole text would.
+    """
+
+    def __init__(self, max_chars: int = 400, first_chars: int = 150):
+        self.max_chars = max_chars
+        self.first_chars = first_chars
+        self.chunks: List[str] = []
+        self._current = ''
+        self._pending = ''
+
+    def _add(self, sentence: Optional[str], ready: List[str]) -> None:
+        # None marks the end of a section
+        limit = self.first_chars if not self.chunks else self.max_chars
+        if sentence is None or (self._current and len(self._current) + len(sentence) + 1 > limit):
+            if self._current:
+                self.chunks.append(self._current)
+                ready.append(self._current)
+            self._current = ''
+        if sentence:
+            self._current = f"{self._current} {sentence}" if self._current else sentence
+
+    def _add_line(self, line: str, ready: List[str]) -> None:
+        for sentence in SENTENCE_BOUNDARY.split(line.strip()):
+            if sentence:
+                self._add(sentence, ready)
+
+    def _add_block(self, block: str, ready: List[str]) -> None:
+        for line in block.splitlines():
+            self._add_line(line, ready)
+        # Never merge across sections (blank-line separated blocks)
+        self._add(None, ready)
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add generated text.
+
+        Returns:
+            The chunks completed by it, in reading order
+        """
+        ready: List[str] = []
+        self._pending += text
+        match = SECTION_BREAK.search(self._pending)
+        while match:
+            self._add_block(self._pending[:match.start()], ready)
+            self._pending = self._pending[match.end():]
+            match = SECTION_BREAK.search(self._pending)
+
+        # Whole lines are complete; the newline before the last line is
+        # kept in case it turns out to start a section break
+        newline = self._pending.rfind('\n')
+        if newline >= 0:
+            for line in self._pending[:newline].splitlines():
+                self._add_line(line, ready)
+            self._pending = self._pending[newline:]
+
+        # So is every sentence of the last line followed by whitespace
+        line_start = 1 if self._pending.startswith('\n') else 0
+        boundaries = list(SENTENCE_BOUNDARY.finditer(self._pending, line_start))
+        if boundaries:
+            self._add_line(self._pending[line_start:boundaries[-1].end()], ready)
+            self._pending = self._pending[boundaries[-1].end():]
+        return ready
+
+    def flush(self) -> List[str]:
+        """
+        End the text.
+
+        Returns:
+            The remaining chunks, in reading order
+        """
+        ready: List[str] = []
+        self._add_block(self._pending, ready)
+        self._pending = ''
+        return ready
+
+
+def split_text_for_speech(text: str, max_chars: int = 400, first_chars: int = 150) -> List[str]:
+    """
+    Split text into speakable chunks at section and sentence boundaries.
+
+    The first chunk is kept short so playback can begin quickly; later
+    chunks pack whole sentences up to max_chars.
+
+    Args:
+        text: The text to split
+        max_chars: Target maximum length of a chunk
+        first_chars: Target maximum length of the first chunk
+
+    Returns:
+        The chunks, in reading order
+    """
+    chunker = SpeechChunker(max_chars=max_chars, first_chars=first_chars)
+    return chunker.feed(text) + chunker.flush()
+
+class SpeechSession:
+    """
+    Synthesizes chunks concurrently as they are added, reporting each audio
+    segment through on_segment in playback order as soon as it and all
+    earlier segments are ready.
+    """
+
+    def __init__(self, converter: 'TextToSpeechConverter', language: str, slow: bool,
+                 on_segment: Callable[[Dict[str, Any]], None]):
+        self.converter = converter
+        self.language = language
+        self.slow = slow
+        self.on_segment = on_segment
+        self.chunks: List[str] = []
+        self._futures: List[Future] = []
+        self._filenames: Dict[int, str] = {}
+        self._next = 0
+        self._cancelled = False
+        self._lock = threading.Condition()
+
+    def add(self, chunk: str) -> None:
+        """Queue a chunk for synthesis after the ones already added."""
+        with self._lock:
+            index = len(self.chunks)
+            self.chunks.append(chunk)
+        future = self.converter._executor.submit(
+            self.converter._synthesize_cached, chunk, self.language, self.slow)
+        self._futures.append(future)
+        future.add_done_callback(lambda done, index=index: self._done(index, done))
+
+    def _done(self, index: int, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._lock:
+            self._filenames[index] = future.result()
+            while not self._cancelled and self._next in self._filenames:
+                self.on_segment({"index": self._next, "filename": self._filenames[self._next],
+                                 "text": self.chunks[self._next]})
+                self._next += 1
+            self._lock.notify_all()
+
+    def cancel(self) -> None:
+        """Drop chunks not yet synthesized and stop reporting segments."""
+        with self._lock:
+            self._cancelled = True
+        for future in self._futures:
+            future.cancel()
+
+    def finish(self, text: str) -> Dict[str, Any]:
+        """
+        Wait for every chunk and join them into a single file.
+
+        Returns:
+            The same dictionary stream_speech ends with
+        """
+        try:
+            if not self._futures:
+                raise ValueError("No text to convert to speech")
+            filenames = [future.result() for future in self._futures]
+            # Done callbacks may still be reporting the last segments
+            with self._lock:
+                self._lock.wait_for(lambda: self._next == len(self.chunks))
+            return self.converter._combine(filenames, text, self.language)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "text": text
+            }
+
 
 class TextToSpeechConverter:
     """
-    A class to convert text to speech using gTTS.
+    A class to convert text to speech using a pluggable engine (gTTS by default).
     """
     
-    def __init__(self, output_dir: str = "static/audio"):
+    def __init__(self, output_dir: str = "static/audio", max_workers: int = 4,
+                 store: Optional[AudioStore] = None,
+                 backend: Optional[SpeechBackend] = None):
         """
         Initialize the TextToSpeechConverter.
         
         Args:
             output_dir: Directory to save the generated audio files
+            max_workers: Maximum chunks synthesized concurrently in chunked mode
+            store: Content-addressed storage for the audio files (one without
+                eviction limits over output_dir if omitted)
+            backend: Speech engine, loaded and reused for every request
+                (gTTS if omitted)
         """
+        self.backend = backend if backend is not None else GTTSBackend()
         self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
+        self.store = store if store is not None else AudioStore(output_dir, max_bytes=None, max_age=None)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
     
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the synthesis threads. The backend is left open, as converters may share it.
+        """
+        self._executor.shutdown(wait=wait)
+
     def convert_to_speech(self, 
                          text: str, 
                          language: str = "en",
                          slow: bool = False) -> Dict[str, Any]:
         """
-        Convert text to speech using gTTS and save to an audio file.
+        Convert text to speech and save to an audio file.
         
         Args:
             text: The text to convert to speech
@@ -34,20 +227,12 @@ class TextToSpeechConverter:
             A dictionary with information about the generated audio
         """
         try:
-            # Generate a unique filename
-            filename = f"{uuid.uuid4()}.mp3"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Create gTTS object
-            tts = gTTS(text=text, lang=language, slow=slow)
-            
-            # Save to file
-            tts.save(filepath)
+            filename = self._synthesize_cached(text, language, slow)
             
             return {
                 "success": True,
                 "filename": filename,
-                "filepath": filepath,
+                "filepath": self.store.path(filename),
                 "text": text,
                 "language": language
             }
@@ -57,3 +242,195 @@ class TextToSpeechConverter:
                 "error": str(e),
                 "text": text
             }
+
+    def _synthesize_cached(self, text: str, language: str, slow: bool) -> str:
+        # Identical text/language/speed/engine always maps to the same file,
+        # so repeated phrases are synthesized once
+        filename = audio_key(text=text, lang=language, slow=slow, engine=self.backend.name) + "." + self.backend.extension
+        self.store.get_or_create(
+            filename,
+            lambda filepath: self.backend.synthesize(text, language, slow, filepath)
+        )
+        return filename
+
+    def _combine(self, filenames: List[str], text: str, language: str) -> Dict[str, Any]:
+        # Keep a single file for download
+        filename = audio_key(segments=filenames) + "." + self.backend.extension
+        filepath = self.store.path(filename)
+        self.store.get_or_create(
+            filename,
+            lambda tmp_path: self.backend.concatenate([self.store.path(f) for f in filenames], tmp_path)
+        )
+        return {
+            "success": True,
+            "filename": filename,
+            "filepath": filepath,
+            "segments": filenames,
+            "text": text,
+            "language": language
+        }
+
+    def stream_speech(self,
+                      text: str,
+                      language: str = "en",
+                      slow: bool = False,
+                      max_chars: int = 400) -> Iterator[Dict[str, Any]]:
+        """
+        Synthesize text in sentence-sized chunks concurrently, yielding each
+        audio segment in playback order as soon as it and all earlier
+        segments are ready.
+        
+        Args:
+            text: The text to convert to speech
+            language: The language code for the speech (e.g., 'en' for English)
+            slow: Whether to speak slowly
+            max_chars: Target maximum characters per chunk
+            
+        Yields:
+            {"segment": dict} for each segment in order, then a final
+            {"result": dict} whose "filename" is the concatenated MP3 and
+            whose "segments" list is the ordered playlist
+        """
+        try:
+            chunks = split_text_for_speech(text, max_chars=max_chars)
+            if not chunks:
+                raise ValueError("No text to convert to speech")
+            futures = [
+                self._executor.submit(self._synthesize_cached, chunk, language, slow)
+                for chunk in chunks
+            ]
+            filenames = []
+            for index, (chunk, future) in enumerate(zip(chunks, futures)):
+                filenames.append(future.result())
+                yield {"segment": {"index": index, "filename": filenames[-1], "text": chunk}}
+
+            yield {"result": self._combine(filenames, text, language)}
+        except Exception as e:
+            yield {"result": {
+                "success": False,
+                "error": str(e),
+                "text": text
+            }}
+
+    def start_speech(self,
+                     text: str,
+                     language: str = "en",
+                     slow: bool = False,
+                     max_chars: int = 400) -> SpeechSession:
+        """
+        Start synthesizing text in chunks without waiting for it, e.g. to
+        voice several texts at once on the shared workers.
+        
+        Args:
+            text: The text to convert to speech
+            language: The language code for the speech (e.g., 'en' for English)
+            slow: Whether to speak slowly
+            max_chars: Target maximum characters per chunk
+            
+        Returns:
+            The session; its finish(text) returns what stream_speech ends with
+        """
+        session = SpeechSession(self, language, slow, lambda segment: None)
+        for chunk in split_text_for_speech(text, max_chars=max_chars):
+            session.add(chunk)
+        return session
+
+    def speak_while_generating(self,
+                               events: Iterable[Dict[str, Any]],
+                               language: str = "en",
+                               slow: bool = False,
+                               max_chars: int = 400) -> Iterator[Dict[str, Any]]:
+        """
+        Synthesize text while it is still being generated: each chunk goes
+        to the speech engine as soon as its last sentence is complete, so
+        speech finishes shortly after the text instead of starting then.
+
+        Args:
+            events: A text stream as stream_simplify_text yields it,
+                {"chunk": str} events then a final {"result": dict}
+            language: The language code for the speech (e.g., 'en' for English)
+            slow: Whether to speak slowly
+            max_chars: Target maximum characters per chunk
+
+        Yields:
+            The input events as they arrive, interleaved with {"segment": dict}
+            events in playback order, then {"speech": dict} with what
+            stream_speech ends with. There is no speech if the result is a
+            failure. If the final text differs from the streamed text (e.g. a
+            reply that had to be reparsed), {"speech_reset": True} discards
+            the segments so far and the final text is spoken instead.
+        """
+        output: queue.Queue = queue.Queue()
+        finished = object()
+        stopped = threading.Event()
+
+        def produce():
+            session = SpeechSession(self, language, slow, lambda segment: output.put({"segment": segment}))
+            chunker = SpeechChunker(max_chars=max_chars)
+            try:
+                for event in events:
+                    if stopped.is_set():
+                        session.cancel()
+                        return
+                    output.put(event)
+                    if "chunk" in event:
+                        for chunk in chunker.feed(event["chunk"]):
+                            session.add(chunk)
+                        continue
+                    result = event["result"]
+                    if not result.get("success"):
+                        session.cancel()
+                        continue
+                    for chunk in chunker.flush():
+                        session.add(chunk)
+                    text = result["simplified_text"]
+                    chunks = split_text_for_speech(text, max_chars=max_chars)
+                    if chunks != chunker.chunks:
+                        session.cancel()
+                        output.put({"speech_reset": True})
+                        session = SpeechSession(self, language, slow, lambda segment: output.put({"segment": segment}))
+                        for chunk in chunks:
+                            session.add(chunk)
+                    output.put({"speech": session.finish(text)})
+            except Exception as e:
+                session.cancel()
+                output.put(e)
+            finally:
+                output.put(finished)
+
+        # Run in the caller's context so context-local state (e.g. request
+        # timing) covers the text generation too
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(produce,), name="tts-pipeline", daemon=True).start()
+        try:
+            while True:
+                item = output.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+
+    def convert_to_speech_chunked(self,
+                                  text: str,
+                                  language: str = "en",
+                                  slow: bool = False,
+                                  max_chars: int = 400) -> Dict[str, Any]:
+        """
+        Convert text to speech in concurrently synthesized chunks.
+        
+        Args:
+            text: The text to convert to speech
+            language: The language code for the speech (e.g., 'en' for English)
+            slow: Whether to speak slowly
+            max_chars: Target maximum characters per chunk
+            
+        Returns:
+            The same dictionary as convert_to_speech, plus an ordered
+            "segments" playlist
+        """
+        for event in self.stream_speech(text, language, slow, max_chars):
+            if "result" in event:
+                return event["result"]
@@ -0,0 +1,272 @@
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from typing import Dict, List, Optional
+
+
+class SpeechBackend:
+    """
+    Base interface for speech synthesis engines.
+    """
+
+    name = "base"
+    extension = "mp3"
+
+    def load(self) -> None:
+        """
+        Load models or start helper processes. Called once at startup.
+        """
+
+    def synthesize(self, text: str, language: str, slow: bool, filepath: str) -> None:
+        """
+        Synthesize text and write the audio to filepath.
+        """
+        raise NotImplementedError
+
+    def concatenate(self, filepaths: List[str], output_path: str) -> None:
+        """
+        Join audio files produced by this backend into one file.
+        """
+        # MP3 frames are self-delimiting, so byte concatenation plays back cleanly
+        with open(output_path, 'wb') as combined:
+            for filepath in filepaths:
+                with open(filepath, 'rb') as f:
+                    shutil.copyfileobj(f, combined)
+
+    def duration(self, filepath: str) -> Optional[float]:
+        """
+        Length in seconds of an audio file produced by this backend, if known.
+        """
+        return None
+
+    def close(self) -> None:
+        """
+        Release any resources held by the backend.
+        """
+
+
+class WaveBackend(SpeechBackend):
+    """
+    Base for engines that write WAV files.
+    """
+
+    extension = "wav"
+
+    def concatenate(self, filepaths: List[str], output_path: str) -> None:
+        with wave.open(output_path, 'wb') as combined:
+            for index, filepath in enumerate(filepaths):
+                with wave.open(filepath, 'rb') as segment:
+                    if index == 0:
+                        combined.setparams(segment.getparams())
+                    combined.writeframes(segment.readframes(segment.getnframes()))
+
+    def duration(self, filepath: str) -> Optional[float]:
+        with wave.open(filepath, 'rb') as f:
+            return f.getnframes() / f.getframerate()
+
+
+class GTTSBackend(SpeechBackend):
+    """
+    Google Translate TTS (requires network access).
+    """
+
+    name = "gtts"
+    extension = "mp3"
+
+    def synthesize(self, text: str, language: str, slow: bool, filepath: str) -> None:
+        from gtts import gTTS
+
+        gTTS(text=text, lang=language, slow=slow).save(filepath)
+
+    def duration(self, filepath: str) -> Optional[float]:
+        # gTTS returns constant 32 kbps MP3, so the size gives the length
+        return os.path.getsize(filepath) * 8 / 32000
+
+
+class EspeakBackend(WaveBackend):
+    """
+    Offline synthesis with espeak-ng. Each call is a short-lived process
+    whose startup cost is a few milliseconds.
+    """
+
+    name = "espeak"
+    # gTTS language codes that espeak-ng names differently
+    VOICES = {"zh-CN": "cmn", "zh-TW": "cmn", "zh": "cmn"}
+
+    def __init__(self, executable: str = "espeak-ng", speed: int = 160, slow_speed: int = 120):
+        """
+        Initialize the EspeakBackend.
+
+        Args:
+            executable: espeak-ng (or espeak) binary
+            speed: Words per minute at normal speed
+            slow_speed: Words per minute when slow speech is requested
+        """
+        self.executable = executable
+        self.speed = speed
+        self.slow_speed = slow_speed
+
+    def load(self) -> None:
+        if shutil.which(self.executable) is None:
+            raise RuntimeError(f"{self.executable} not found on PATH")
+
+    def synthesize(self, text: str, language: str, slow: bool, filepath: str) -> None:
+        subprocess.run(
+            [self.executable,
+             "-v", self.VOICES.get(language, language),
+             "-s", str(self.slow_speed if slow else self.speed),
+             "-w", filepath,
+             "--stdin"],
+            input=text.encode('utf-8'),
+            check=True,
+            capture_output=True,
+            timeout=60
+        )
+
+
+class _PiperProcess:
+    """
+    One long-running piper process with its voice model loaded.
+    """
+
+    def __init__(self, executable: str, model: str):
+        self.output_dir = tempfile.mkdtemp(prefix="piper_")
+        self.process = subprocess.Popen(
+            [executable, "--model", model, "--output_dir", self.output_dir],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def synthesize(self, text: str, filepath: str) -> None:
+        # piper reads one utterance per line and prints the path of the WAV it wrote
+        self.process.stdin.write(' '.join(text.split()) + "\n")
+        self.process.stdin.flush()
+        output = self.process.stdout.readline().strip()
+        if not output:
+            raise RuntimeError("piper exited without producing audio")
+        shutil.move(output, filepath)
+
+    def close(self) -> None:
+        if self.alive():
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+
+class PiperBackend(WaveBackend):
+    """
+    Offline neural synthesis with piper. Voice models are loaded once into
+    persistent processes that are reused across requests.
+    """
+
+    name = "piper"
+
+    def __init__(self, voices: Dict[str, str], executable: str = "piper", processes: int = 2):
+        """
+        Initialize the PiperBackend.
+
+        Args:
+            voices: Mapping of language code to piper voice model path
+            executable: piper binary
+            processes: Persistent processes kept per voice
+        """
+        self.voices = voices
+        self.executable = executable
+        self.processes = processes
+        self._pools: Dict[str, "queue.Queue[_PiperProcess]"] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        if shutil.which(self.executable) is None:
+            raise RuntimeError(f"{self.executable} not found on PATH")
+        for language in self.voices:
+            self._pool(language)
+
+    def _model_for(self, language: str) -> str:
+        model = self.voices.get(language) or self.voices.get(language.split('-')[0])
+        if model is None:
+            raise ValueError(f"No piper voice configured for language '{language}'")
+        return model
+
+    def _pool(self, language: str) -> "queue.Queue[_PiperProcess]":
+        with self._lock:
+            pool = self._pools.get(language)
+            if pool is None:
+                model = self._model_for(language)
+                pool = queue.Queue()
+                for _ in range(self.processes):
+                    pool.put(_PiperProcess(self.executable, model))
+                self._pools[language] = pool
+            return pool
+
+    def synthesize(self, text: str, language: str, slow: bool, filepath: str) -> None:
+        pool = self._pool(language)
+        process = pool.get()
+        try:
+            if not process.alive():
+                # Replace a crashed process so the pool keeps its size
+                process.close()
+                process = _PiperProcess(self.executable, self._model_for(language))
+            process.synthesize(text, filepath)
+        finally:
+            pool.put(process)
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in self._pools.values():
+                while not pool.empty():
+                    pool.get_nowait().close()
+            self._pools.clear()
+
+
+def parse_voices(spec: str) -> Dict[str, str]:
+    """
+    Parse a "en=/path/en.onnx,es=/path/es.onnx" voice mapping.
+    """
+    voices = {}
+    for item in spec.split(','):
+        if '=' in item:
+            language, model = item.split('=', 1)
+            voices[language.strip()] = model.strip()
+    return voices
+
+
+def create_backend(name: Optional[str] = None) -> SpeechBackend:
+    """
+    Build and load the speech backend selected by name or the TTS_ENGINE
+    environment variable.
+
+    Args:
+        name: "gtts", "espeak" or "piper" (defaults to TTS_ENGINE, then "gtts")
+
+    Returns:
+        A loaded SpeechBackend
+    """
+    name = (name or os.environ.get('TTS_ENGINE', 'gtts')).lower()
+    if name == "gtts":
+        backend = GTTSBackend()
+    elif name == "espeak":
+        backend = EspeakBackend(executable=os.environ.get('ESPEAK_PATH', 'espeak-ng'))
+    elif name == "piper":
+        backend = PiperBackend(
+            voices=parse_voices(os.environ.get('PIPER_VOICES', '')),
+            executable=os.environ.get('PIPER_PATH', 'piper'),
+            processes=int(os.environ.get('PIPER_PROCESSES', 2))
+        )
+    else:
+        raise ValueError(f"Unknown TTS engine: {name}")
+    backend.load()
+    return backend
@@ -0,0 +1,79 @@
+import io
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+# Uploads up to this size are kept in memory; larger ones spill to a temp file
+DEFAULT_SPILL_BYTES = 4 * 1024 * 1024
+
+
+class Upload:
+    """
+    An uploaded report, held in memory or, when large, in a temp file with a
+    unique name so concurrent uploads never collide.
+    """
+
+    def __init__(self, filename: str, data: Optional[bytes] = None, path: Optional[str] = None):
+        self.filename = filename
+        self.data = data
+        self.path = path
+
+    @property
+    def extension(self) -> str:
+        return self.filename.rsplit('.', 1)[-1].lower() if '.' in self.filename else ''
+
+    @property
+    def size(self) -> int:
+        return len(self.data) if self.data is not None else os.path.getsize(self.path)
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """
+        The bytes, or the spill file path, for readers that accept either.
+        """
+        return self.data if self.data is not None else self.path
+
+    def open(self) -> BinaryIO:
+        return io.BytesIO(self.data) if self.data is not None else open(self.path, 'rb')
+
+    def discard(self) -> None:
+        """
+        Release the buffer and remove the spill file, if any.
+        """
+        self.data = None
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+def read_upload(file, spill_bytes: int = DEFAULT_SPILL_BYTES, spill_dir: Optional[str] = None) -> Upload:
+    """
+    Read an uploaded file from its stream, spilling to a uniquely named temp
+    file only when it is larger than spill_bytes.
+
+    Args:
+        file: A werkzeug FileStorage (anything with .filename and .stream)
+        spill_bytes: Largest upload kept in memory
+        spill_dir: Directory for spill files (the system temp dir if None)
+
+    Returns:
+        An Upload; call discard() when done with it
+    """
+    head = file.stream.read(spill_bytes + 1)
+    if len(head) <= spill_bytes:
+        return Upload(file.filename, data=head)
+
+    suffix = '.' + file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+    fd, path = tempfile.mkstemp(prefix='upload_', suffix=suffix, dir=spill_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(head)
+            shutil.copyfileobj(file.stream, out)
+    except Exception:
+        os.remove(path)
+        raise
+    return Upload(file.filename, path=path)
@@ -0,0 +1,19 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+With WEB_WORKER_CLASS=uvicorn.workers.UvicornWorker, serve wsgi:asgi_application
+instead (requires asgiref).
+"""
+from app import app
+
+application = app
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+
+    # Runs the Flask app in a thread pool behind an ASGI server
+    asgi_application = WsgiToAsgi(app)
+except ImportError:
+    asgi_application = None